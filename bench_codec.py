@@ -0,0 +1,37 @@
+import json
+import time
+from block import Block
+from codec import decode_block, encode_block
+from user import User
+
+BLOCK_SIZE = 1000
+ROUNDS = 20
+
+def build_block():
+    sender, receiver = User(), User()
+    txs = [sender.start_transaction(receiver.get_address(), i + 1) for i in range(BLOCK_SIZE)]
+    block = Block(1, txs, time.time(), "0" * 64)
+    block.mine(2)
+    return block
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = fn()
+    return (time.perf_counter() - start) / ROUNDS, result
+
+def main():
+    block = build_block()
+
+    json_encode, json_bytes = timed(lambda: json.dumps(block.to_dict()).encode())
+    json_decode, _ = timed(lambda: Block.from_dict(json.loads(json_bytes)))
+    bin_encode, bin_bytes = timed(lambda: encode_block(block))
+    bin_decode, _ = timed(lambda: decode_block(memoryview(bin_bytes)))
+
+    print(f"Block of {BLOCK_SIZE} signed transactions, mean of {ROUNDS} rounds\n")
+    print(f"{'format':<8} {'bytes':>10} {'encode ms':>10} {'decode ms':>10}")
+    print(f"{'json':<8} {len(json_bytes):>10} {json_encode * 1000:>10.2f} {json_decode * 1000:>10.2f}")
+    print(f"{'binary':<8} {len(bin_bytes):>10} {bin_encode * 1000:>10.2f} {bin_decode * 1000:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import random
+import sys
+import time
+from block import Block
+from columnar import ColumnarStore, np
+from state import AccountState
+from transaction import Transaction
+
+BLOCKS = 2000
+TXS_PER_BLOCK = 100
+ADDRESSES = 10000
+
+def build_chain():
+    rng = random.Random(1)
+    addresses = [f"0x{i:040x}" for i in range(ADDRESSES)]
+    chain = []
+    for height in range(BLOCKS):
+        txs = [Transaction(rng.choice(addresses), rng.choice(addresses), rng.randrange(1, 100))
+               for _ in range(TXS_PER_BLOCK)]
+        chain.append(Block(height, txs, 1_700_000_000 + height * 60.0, "0"))
+    return chain
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<36} {(time.perf_counter() - start) * 1000:>10.1f} ms")
+    return result
+
+def main():
+    if np is None:
+        print("numpy is not installed")
+        return 1
+    chain = build_chain()
+    print(f"{BLOCKS} blocks x {TXS_PER_BLOCK} transactions, {ADDRESSES} addresses\n")
+    columns = timed("build columns", lambda: ColumnarStore.from_chain(chain))
+    replayed = timed("all balances (replay AccountState)", lambda: AccountState.from_chain(chain).balances)
+    vectorized = timed("all balances (columnar)", columns.balances)
+    assert replayed == vectorized
+    timed("top 10 holders (columnar)", lambda: columns.top_holders(10))
+    timed("volume per hour (columnar)", lambda: columns.volume_by_period(3600, chain[0].timestamp))
+    timed("volume per hour (python loop)", lambda: [
+        sum(tx.amount for block in chain if start <= block.timestamp < start + 3600 for tx in block.transactions)
+        for start in range(int(chain[0].timestamp), int(chain[-1].timestamp) + 1, 3600)
+    ])
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
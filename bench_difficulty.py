@@ -0,0 +1,52 @@
+import hashlib
+import time
+from blockchain import Blockchain
+from constant import DIFFICULTY, SYSTEM
+from difficulty import Retargeting, meets_target, target_bytes, target_from_zeros
+from transaction import Transaction
+
+ATTEMPTS = 500000
+RETARGET_INTERVAL = 10
+BLOCK_INTERVAL = 0.05
+WINDOWS = 8
+
+def per_attempt(label, check):
+    midstate = hashlib.sha256(b"header prefix")
+    start = time.perf_counter()
+    for nonce in range(ATTEMPTS):
+        attempt = midstate.copy()
+        attempt.update(str(nonce).encode())
+        check(attempt)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed / ATTEMPTS * 1e9:>8.0f} ns/attempt")
+
+def main():
+    prefix = '0' * DIFFICULTY
+    target = target_from_zeros(DIFFICULTY)
+    limit = target_bytes(target)
+    print(f"Mining loop, {ATTEMPTS} attempts\n")
+    per_attempt("hexdigest().startswith (before)", lambda a: a.hexdigest().startswith(prefix))
+    per_attempt("digest() <= target bytes", lambda a: a.digest() <= limit)
+    block_hash = hashlib.sha256(b"x").hexdigest()
+    start = time.perf_counter()
+    for _ in range(ATTEMPTS):
+        meets_target(block_hash, target)
+    print(f"{'meets_target (header check)':<34} {(time.perf_counter() - start) / ATTEMPTS * 1e9:>8.0f} ns/check")
+
+    rules = Retargeting(interval=RETARGET_INTERVAL, block_interval=BLOCK_INTERVAL)
+    blockchain = Blockchain(retargeting=rules)
+    print(f"\nRetargeting every {RETARGET_INTERVAL} blocks towards {BLOCK_INTERVAL * 1000:.0f} ms per block\n")
+    print(f"{'blocks':>9} {'work/block':>11} {'ms/block':>9}")
+    for window in range(WINDOWS):
+        first = len(blockchain.chain)
+        start = time.perf_counter()
+        for _ in range(RETARGET_INTERVAL):
+            blockchain.pending_transactions.append(Transaction(SYSTEM, "miner", 1))
+            blockchain.mine_pending_transactions()
+        elapsed = time.perf_counter() - start
+        tip = blockchain.get_last_block()
+        work = (blockchain.tree.work(tip.hash) - blockchain.tree.work(blockchain.chain[first - 1].hash)) // RETARGET_INTERVAL
+        print(f"{first:>4}-{tip.index:<4} {work:>11} {elapsed / RETARGET_INTERVAL * 1000:>9.1f}")
+
+if __name__ == "__main__":
+    main()
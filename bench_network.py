@@ -0,0 +1,69 @@
+import asyncio
+import statistics
+import time
+from blockchain import Blockchain
+from node import MSG_TRANSACTION, Node
+from user import User
+
+NODES = 8
+TRANSACTIONS = 500
+SENDERS = 10
+
+async def main():
+    users = [User() for _ in range(SENDERS + 1)]
+    registry = {user.address: user for user in users}
+    nodes = []
+    for _ in range(NODES):
+        blockchain = Blockchain()
+        blockchain.user_registry = registry
+        node = Node(blockchain)
+        await node.start()
+        nodes.append(node)
+    # ring plus chords to the opposite node
+    for i, node in enumerate(nodes):
+        await node.connect(nodes[(i + 1) % NODES].host, nodes[(i + 1) % NODES].port)
+        if i < NODES // 2:
+            await node.connect(nodes[i + NODES // 2].host, nodes[i + NODES // 2].port)
+
+    origin = nodes[0].blockchain
+    for user in users[:SENDERS]:
+        origin.register_user(user)
+    origin.mine_pending_transactions()
+    await nodes[0].broadcast_block(origin.get_last_block())
+    while not all(len(node.blockchain.chain) == 2 for node in nodes):
+        await asyncio.sleep(0.01)
+
+    arrivals = {}
+    for node in nodes[1:]:
+        def record(kind, tx):
+            if kind == MSG_TRANSACTION:
+                arrivals.setdefault(tx.transaction_id, []).append(time.perf_counter())
+        node.listeners.append(record)
+
+    txs = [users[i % SENDERS].start_transaction(users[-1].get_address(), 1) for i in range(TRANSACTIONS)]
+    received_before = sum(node.messages_received for node in nodes)
+    submitted = {}
+    start = time.perf_counter()
+    for tx in txs:
+        submitted[tx.transaction_id] = time.perf_counter()
+        await nodes[0].broadcast_transaction(tx)
+    while sum(len(times) for times in arrivals.values()) < TRANSACTIONS * (NODES - 1):
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(max(arrivals[txid]) - submitted[txid] for txid in submitted)
+    messages = sum(node.messages_received for node in nodes) - received_before
+    frames = sum(node.frames_sent for node in nodes)
+    print(f"{NODES} nodes, {TRANSACTIONS} transactions gossiped from one node\n")
+    print(f"propagation to all nodes  p50 {statistics.median(latencies) * 1000:.1f} ms"
+          f"  p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+    print(f"messages/s                {messages / elapsed:.0f}")
+    print(f"messages per frame        {sum(node.messages_sent for node in nodes) / frames:.1f}")
+    print(f"duplicates dropped        {sum(node.duplicates_dropped for node in nodes)}")
+    print(f"messages dropped          {sum(node.messages_dropped for node in nodes)}")
+
+    for node in nodes:
+        await node.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+import os
+import time
+from block import Block
+from blockchain import Blockchain
+from codec import decode_block, encode_block
+from pipeline import BlockPipeline
+from user import User
+from verifier import SignatureVerifier
+import consensus
+
+CHAIN_HEIGHT = 60
+TXS_PER_BLOCK = 100
+USERS = 10
+
+def build_source(users):
+    blockchain = Blockchain()
+    for user in users:
+        blockchain.register_user(user)
+    blockchain.mine_pending_transactions()
+    for _ in range(CHAIN_HEIGHT):
+        for i in range(TXS_PER_BLOCK):
+            sender, receiver = users[i % USERS], users[(i + 1) % USERS]
+            blockchain.prove_transaction(sender.start_transaction(receiver.get_address(), 1))
+        blockchain.mine_pending_transactions()
+    return blockchain
+
+def received_blocks(source):
+    """Fresh copies of the source's blocks, as a syncing node decodes them"""
+    blocks = []
+    for height in range(1, len(source.chain)):
+        block, _ = decode_block(encode_block(source.chain[height]))
+        for tx in block.transactions:
+            consensus.receive(tx)
+        blocks.append(block)
+    return blocks
+
+def ingest(source, workers, pipelined):
+    verifier = SignatureVerifier(workers=workers)
+    node = Blockchain(verifier=verifier)
+    node.user_registry = dict(source.user_registry)
+    blocks = received_blocks(source)
+    start = time.perf_counter()
+    if pipelined:
+        pipeline = BlockPipeline(node)
+        accepted = pipeline.add_blocks(blocks)
+        pipeline.shutdown()
+    else:
+        accepted = sum(node.add_block(block) for block in blocks)
+    elapsed = time.perf_counter() - start
+    verifier.shutdown()
+    assert accepted == len(blocks) and node.get_last_block().hash == source.get_last_block().hash
+    return len(blocks) / elapsed
+
+def main():
+    users = [User() for _ in range(USERS)]
+    source = build_source(users)
+    print(f"Ingesting {CHAIN_HEIGHT + 1} blocks x {TXS_PER_BLOCK} transactions "
+          f"(cold signature cache, {os.cpu_count()} CPUs)\n")
+    print(f"{'verifier workers':>16} {'sequential blocks/s':>20} {'pipelined blocks/s':>19}")
+    for workers in sorted({1, os.cpu_count() or 1, 4}):
+        sequential = ingest(source, workers, pipelined=False)
+        pipelined = ingest(source, workers, pipelined=True)
+        print(f"{workers:>16} {sequential:>20.1f} {pipelined:>19.1f}")
+
+    # accepting a block this node just mined: before, add_block revalidated
+    # it fully; now only the checks that depend on the chain run
+    for i in range(TXS_PER_BLOCK):
+        source.prove_transaction(users[i % USERS].start_transaction(users[(i + 1) % USERS].get_address(), 1))
+    block = Block(len(source.chain), source.template.transactions(), time.time(),
+                  source.get_last_block().hash)
+    block.mine(target=source.next_target(source.get_last_block()))
+    rounds = 50
+    start = time.perf_counter()
+    for _ in range(rounds):
+        source.prepare_block(block)
+    full = (time.perf_counter() - start) / rounds
+    start = time.perf_counter()
+    for _ in range(rounds):
+        source.prepare_block(block, prechecked=True)
+    prechecked = (time.perf_counter() - start) / rounds
+    print(f"\nSelf-mined block of {TXS_PER_BLOCK} transactions: full validation "
+          f"{full * 1000:.2f} ms, chain-dependent checks only {prechecked * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
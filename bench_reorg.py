@@ -0,0 +1,51 @@
+import time
+from block import Block
+from blockchain import Blockchain
+from constant import DIFFICULTY, SYSTEM
+from transaction import Transaction
+from user import User
+
+DEPTHS = [1, 5, 20, 50]
+CHAIN_HEIGHT = 60
+TXS_PER_BLOCK = 20
+
+def mine_on(parent, transactions):
+    block = Block(parent.index + 1, transactions, time.time(), parent.hash)
+    block.mine(DIFFICULTY)
+    return block
+
+def build_chain(users):
+    blockchain = Blockchain()
+    for user in users:
+        blockchain.register_user(user)
+    blockchain.mine_pending_transactions()
+    for height in range(CHAIN_HEIGHT):
+        for i in range(TXS_PER_BLOCK):
+            sender = users[i % len(users)]
+            receiver = users[(i + 1) % len(users)]
+            blockchain.pending_transactions.append(sender.start_transaction(receiver.get_address(), 1))
+        blockchain.mine_pending_transactions()
+    return blockchain
+
+def main():
+    users = [User() for _ in range(10)]
+    print(f"Chain of {CHAIN_HEIGHT} blocks x {TXS_PER_BLOCK} transactions\n")
+    print(f"{'depth':>6} {'reorg ms':>10}")
+    for depth in DEPTHS:
+        blockchain = build_chain(users)
+        parent = blockchain.chain[len(blockchain.chain) - 1 - depth]
+        side = []
+        for i in range(depth + 1):
+            parent = mine_on(parent, [Transaction(SYSTEM, f"miner{i}", 1) for _ in range(TXS_PER_BLOCK)])
+            side.append(parent)
+        for block in side[:-1]:
+            blockchain.add_block(block)
+
+        start = time.perf_counter()
+        blockchain.add_block(side[-1])
+        elapsed = time.perf_counter() - start
+        assert blockchain.get_last_block().hash == side[-1].hash
+        print(f"{depth:>6} {elapsed * 1000:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import time
+from signatures import SCHEMES
+
+ROUNDS = {"keygen": 20, "sign": 500, "verify": 500}
+
+def rate(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return rounds / (time.perf_counter() - start)
+
+def main():
+    message = b"0xsender0xreceiver1002025-01-01 00:00:00.000000"
+    print(f"{'scheme':<10} {'keygen/s':>12} {'sign/s':>12} {'verify/s':>12}")
+    for name, scheme in SCHEMES.items():
+        private_key = scheme.generate_private_key()
+        public_key = private_key.public_key()
+        signature = scheme.sign(private_key, message)
+        keygen = rate(scheme.generate_private_key, ROUNDS["keygen"])
+        sign = rate(lambda: scheme.sign(private_key, message), ROUNDS["sign"])
+        verify = rate(lambda: scheme.verify(public_key, signature, message), ROUNDS["verify"])
+        print(f"{name:<10} {keygen:>12.0f} {sign:>12.0f} {verify:>12.0f}")
+
+if __name__ == "__main__":
+    main()
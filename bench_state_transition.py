@@ -0,0 +1,31 @@
+import time
+from block import Block
+from blockchain import Blockchain
+from constant import DIFFICULTY
+from user import User
+
+BLOCK_SIZES = [100, 200, 400, 800, 1600]
+SENDERS = 20
+
+def main():
+    users = [User() for _ in range(SENDERS)]
+    blockchain = Blockchain()
+    for user in users:
+        blockchain.register_user(user)
+    blockchain.mine_pending_transactions()
+
+    print("validate_block with a warm signature cache (state transition only)\n")
+    print(f"{'transactions':>12} {'ms':>10} {'us/tx':>10}")
+    for size in BLOCK_SIZES:
+        txs = [users[i % SENDERS].start_transaction(users[(i + 1) % SENDERS].get_address(), 1)
+               for i in range(size)]
+        block = Block(len(blockchain.chain), txs, time.time(), blockchain.get_last_block().hash)
+        block.mine(DIFFICULTY)
+        assert blockchain.validate_block(block)  # warms the verifier cache
+        start = time.perf_counter()
+        assert blockchain.validate_block(block)
+        elapsed = time.perf_counter() - start
+        print(f"{size:>12} {elapsed * 1000:>10.2f} {elapsed / size * 1e6:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import tempfile
+import time
+from block import Block
+from storage import BlockStore
+from transaction import Transaction
+
+HEIGHTS = [1000, 10000, 50000]
+
+def fill(store, height):
+    previous_hash = "0"
+    for i in range(height):
+        block = Block(i, [Transaction("alice", "bob", i)], time.time(), previous_hash)
+        store.append(block)
+        previous_hash = block.hash
+
+def main():
+    print(f"{'height':>8} {'append/s':>10} {'reopen ms':>10} {'get tip ms':>11}")
+    for height in HEIGHTS:
+        with tempfile.TemporaryDirectory() as path:
+            store = BlockStore(path)
+            start = time.perf_counter()
+            fill(store, height)
+            append_rate = height / (time.perf_counter() - start)
+            store.close()
+
+            start = time.perf_counter()
+            store = BlockStore(path)
+            reopen = time.perf_counter() - start
+            start = time.perf_counter()
+            store.get(height - 1)
+            get_tip = time.perf_counter() - start
+            store.close()
+        print(f"{height:>8} {append_rate:>10.0f} {reopen * 1000:>10.2f} {get_tip * 1000:>11.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Benchmark suite for the core operations on a synthetic chain.
+
+    python bench_suite.py --height 50 --block-size 200 --output results.json
+    python bench_suite.py --baseline bench_baseline.json --threshold 0.2
+
+Every benchmark reports the median time per operation over --rounds runs.
+Proof of work is timed per hash attempt (mine_attempt), and
+mine_pending_transactions runs against a target every hash meets, so no
+result depends on how lucky a nonce search was. Chains keep the initial
+target (difficulty) at every height, and every timed block must be
+accepted, so validate_block measures the accepting path. With --baseline, results
+are compared against a previous JSON result and the run exits with status
+1 if any benchmark got slower by more than --threshold (0.2 = 20%).
+bench_baseline.json holds a run with the default options; record a new
+one on the machine that runs the comparison.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from block import Block
+from blockchain import Blockchain
+from constant import DIFFICULTY
+from difficulty import MAX_TARGET, Retargeting, target_from_zeros
+from user import User
+from verifier import SignatureVerifier
+
+# leading zero hex digits of the target mine_attempt is timed at: enough
+# attempts per run (16 ** 4 on average) to make the block's fixed setup negligible
+MINE_ZEROS = 4
+# keys generated per user_keygen run
+KEYGEN_BATCH = 10
+
+def build_chain(users: List[User], height: int, block_size: int,
+                retargeting: Optional[Retargeting] = None) -> Blockchain:
+    """
+    A chain of `height` blocks of `block_size` transfers between the users;
+    without retargeting rules, the initial target is kept at every height,
+    as blocks are mined far faster than BLOCK_INTERVAL
+    """
+    blockchain = Blockchain(retargeting=retargeting or Retargeting(interval=0))
+    for user in users:
+        blockchain.register_user(user)
+    blockchain.mine_pending_transactions()
+    for _ in range(height):
+        fill_mempool(blockchain, users, block_size)
+        blockchain.mine_pending_transactions()
+    return blockchain
+
+def make_transactions(users: List[User], count: int) -> list:
+    """Signed transfers of 1 passed around the users, so no balance runs out"""
+    return [
+        users[i % len(users)].start_transaction(users[(i + 1) % len(users)].get_address(), 1)
+        for i in range(count)
+    ]
+
+def fill_mempool(blockchain: Blockchain, users: List[User], count: int) -> None:
+    for tx in make_transactions(users, count):
+        blockchain.pending_transactions.append(tx)
+
+def accepted(valid: bool) -> None:
+    """Fail the run if a timed block was rejected, which would time the wrong path"""
+    if not valid:
+        raise RuntimeError("benchmark block was rejected")
+
+Ops = Union[int, Callable[[object], int]]
+
+def measure(rounds: int, ops: Ops, setup: Callable, run: Callable) -> float:
+    """
+    Median seconds per operation; setup() is untimed and its result is passed
+    to run(). `ops` is the number of operations per run, or a function of the
+    setup result giving the number done once run() returns.
+    """
+    samples = []
+    for _ in range(rounds):
+        arg = setup()
+        start = time.perf_counter()
+        run(arg)
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed / (ops(arg) if callable(ops) else ops))
+    return statistics.median(samples)
+
+def run_suite(height: int, block_size: int, users_count: int, rounds: int) -> Dict[str, dict]:
+    users = [User() for _ in range(users_count)]
+    blockchain = build_chain(users, height, block_size)
+    results: Dict[str, dict] = {}
+
+    def record(name: str, ops: Ops, setup: Callable, run: Callable) -> None:
+        seconds = measure(rounds, ops, setup, run)
+        results[name] = {"seconds": seconds, "ops": None if callable(ops) else ops}
+        print(f"{name:<28} {seconds * 1e6:>14.1f} us/op", file=sys.stderr)
+
+    def next_block() -> Block:
+        parent = blockchain.get_last_block()
+        block = Block(len(blockchain.chain), make_transactions(users, block_size),
+                      time.time(), parent.hash)
+        block.mine(target=blockchain.next_target(parent))
+        return block
+
+    def cold(setup: Callable) -> Callable:
+        # a fresh verifier, so signatures are really checked rather than cache hits
+        def wrapped():
+            blockchain.verifier = SignatureVerifier()
+            return setup()
+        return wrapped
+
+    # a key's generation time depends on how soon a prime turns up, so
+    # several keys are timed per run
+    record("user_keygen", KEYGEN_BATCH, lambda: None, lambda _: [User() for _ in range(KEYGEN_BATCH)])
+    signer, receiver = users[0], users[1].get_address()
+    record("sign_transaction", block_size, lambda: None,
+           lambda _: [signer.start_transaction(receiver, 1) for _ in range(block_size)])
+    # per hash attempt: Block.mine counts nonces up from 0
+    record("mine_attempt", lambda block: max(block.nonce, 1),
+           lambda: Block(len(blockchain.chain), make_transactions(users, block_size),
+                         time.time(), blockchain.get_last_block().hash),
+           lambda block: block.mine(target=target_from_zeros(MINE_ZEROS)))
+    record("validate_block", 1, cold(next_block), lambda block: accepted(blockchain.validate_block(block)))
+
+    def warmed_block() -> Block:
+        block = next_block()
+        accepted(blockchain.validate_block(block))
+        return block
+
+    record("validate_block_cached", 1, warmed_block,
+           lambda block: accepted(blockchain.validate_block(block)))
+    record("validate_transaction", block_size, cold(lambda: make_transactions(users, block_size)),
+           lambda txs: [blockchain.validate_transaction(tx) for tx in txs])
+    addresses = [user.get_address() for user in users] * 100
+    record("get_balance", len(addresses), lambda: None,
+           lambda _: [blockchain.get_balance(address) for address in addresses])
+    # a target every hash meets: template, signature checks and block
+    # acceptance without the nonce search
+    no_work = build_chain(users, 0, block_size, Retargeting(initial_target=MAX_TARGET, interval=0))
+    def fill_no_work() -> int:
+        fill_mempool(no_work, users, block_size)
+        return len(no_work.chain)
+
+    def mine_no_work(height: int) -> None:
+        no_work.mine_pending_transactions()
+        accepted(len(no_work.chain) > height)
+
+    record("mine_pending_transactions", 1, fill_no_work, mine_no_work)
+    return results
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict],
+            threshold: float) -> List[Tuple[str, float, float, float]]:
+    """(name, baseline seconds, current seconds, ratio) of every benchmark slower than allowed"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None or base["seconds"] <= 0:
+            continue
+        ratio = current["seconds"] / base["seconds"]
+        if ratio > 1 + threshold:
+            regressions.append((name, base["seconds"], current["seconds"], ratio))
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--height", type=int, default=20, help="blocks in the synthetic chain")
+    parser.add_argument("--block-size", type=int, default=100, help="transactions per block")
+    parser.add_argument("--users", type=int, default=10, help="distinct senders/receivers")
+    parser.add_argument("--rounds", type=int, default=5, help="runs per benchmark (median is kept)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown against the baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    print(f"Chain of {args.height} blocks x {args.block_size} transactions, "
+          f"{args.users} users, difficulty {DIFFICULTY}\n", file=sys.stderr)
+    report = {
+        "config": {
+            "height": args.height,
+            "block_size": args.block_size,
+            "users": args.users,
+            "rounds": args.rounds,
+            "difficulty": DIFFICULTY,
+            "mine_zeros": MINE_ZEROS,
+            "python": platform.python_version(),
+        },
+        "results": run_suite(args.height, args.block_size, args.users, args.rounds),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print("\nwarning: baseline was recorded with a different configuration", file=sys.stderr)
+        regressions = compare(report["results"], baseline["results"], args.threshold)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSION {name}: {before * 1e6:.1f} -> {after * 1e6:.1f} us/op "
+                  f"({(ratio - 1) * 100:+.0f}%)", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"\nno regressions beyond {args.threshold:.0%}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+import asyncio
+from blockchain import Blockchain
+from difficulty import Retargeting
+from sync import ChainSync, LocalPeer
+from user import User
+
+CHAIN_HEIGHT = 300
+TXS_PER_BLOCK = 5
+PEER_DELAY = 0.005
+# blocks are mined far faster than BLOCK_INTERVAL; keep mining cost flat along the chain
+RULES = Retargeting(interval=0)
+
+def build_source():
+    blockchain = Blockchain(retargeting=RULES)
+    users = [User() for _ in range(5)]
+    for user in users:
+        blockchain.register_user(user)
+    blockchain.mine_pending_transactions()
+    for height in range(CHAIN_HEIGHT):
+        for i in range(TXS_PER_BLOCK):
+            sender, receiver = users[i], users[(i + 1) % len(users)]
+            blockchain.pending_transactions.append(sender.start_transaction(receiver.get_address(), 1))
+        blockchain.mine_pending_transactions()
+    return blockchain
+
+async def run(source, peer_count, window):
+    node = Blockchain(retargeting=RULES)
+    node.user_registry = dict(source.user_registry)
+    peers = [LocalPeer(source, delay=PEER_DELAY) for _ in range(peer_count)]
+    result = await ChainSync(node, peers, chunk_size=8, window=window).run()
+    assert node.get_last_block().hash == source.get_last_block().hash
+    return result
+
+def main():
+    source = build_source()
+    print(f"Syncing {CHAIN_HEIGHT} blocks x {TXS_PER_BLOCK} transactions, "
+          f"{PEER_DELAY * 1000:.0f} ms simulated latency per request\n")
+    print(f"{'peers':>5} {'window':>7} {'headers ms':>11} {'blocks/s':>9}")
+    for peer_count, window in [(1, 1), (1, 8), (4, 8), (4, 16)]:
+        result = asyncio.run(run(source, peer_count, window))
+        print(f"{peer_count:>5} {window:>7} {result.headers_elapsed * 1000:>11.1f} {result.blocks_per_second:>9.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import random
+import time
+from mempool import Mempool
+from template import BlockTemplate
+from transaction import Transaction
+
+MEMPOOL_SIZE = 20000
+SENDERS = 2000
+ARRIVALS = 2000
+
+def main():
+    rng = random.Random(1)
+    mempool = Mempool(max_size=MEMPOOL_SIZE * 2, max_bytes=1 << 30)
+    template = BlockTemplate(mempool, lambda address: 10 ** 9)
+    for i in range(MEMPOOL_SIZE):
+        mempool.add(Transaction(f"sender{rng.randrange(SENDERS)}", "receiver", i + 1, rng.randrange(100)))
+
+    start = time.perf_counter()
+    template.refresh()
+    rebuild = time.perf_counter() - start
+    print(f"Mempool of {MEMPOOL_SIZE} transactions, template of {len(template)} "
+          f"({template.size_bytes} bytes)\n")
+    print(f"{'full rebuild':<32} {rebuild * 1000:>10.2f} ms")
+
+    rebuilds = template.rebuilds
+    start = time.perf_counter()
+    for i in range(ARRIVALS):
+        mempool.add(Transaction(f"sender{rng.randrange(SENDERS)}", "receiver", i + 1, rng.randrange(100)))
+        template.transactions()
+    elapsed = time.perf_counter() - start
+    print(f"{'per arrival (incremental)':<32} {elapsed / ARRIVALS * 1e6:>10.1f} us "
+          f"({template.rebuilds - rebuilds} rebuilds for {ARRIVALS} arrivals)")
+
+if __name__ == "__main__":
+    main()
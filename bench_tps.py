@@ -0,0 +1,57 @@
+"""
+Sustained TPS and confirmation latency under a given transaction load.
+
+    python bench_tps.py --rate 50 100 200 --duration 10 --nodes 3 --output tps.json
+
+One run per --rate, each printed as a report (see simulation.py). User keys
+are cached in --keys, so only the first run with a given --users pays for
+key generation.
+"""
+import argparse
+import json
+import sys
+import time
+from constant import DEFAULT_SIGNATURE_SCHEME
+from simulation import LoadConfig, load_users, simulate
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, nargs="+", default=[100.0],
+                        help="offered transactions per second; one run per value")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of submissions per run")
+    parser.add_argument("--nodes", type=int, default=1, help="in-process nodes gossiping over localhost")
+    parser.add_argument("--users", type=int, default=50, help="distinct senders/receivers")
+    parser.add_argument("--block-interval", type=float, default=1.0, help="seconds between mined blocks")
+    parser.add_argument("--max-block-transactions", type=int, help="cap on transactions per block")
+    parser.add_argument("--arrival", choices=("poisson", "constant"), default="poisson")
+    parser.add_argument("--drain", type=float, default=30.0,
+                        help="seconds to wait for confirmations after the last submission")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scheme", default=DEFAULT_SIGNATURE_SCHEME, help="signature scheme of the users")
+    parser.add_argument("--keys", default="simulation_keys.json", help="user key cache file")
+    parser.add_argument("--output", help="write the reports as JSON to this file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    users = load_users(args.keys, args.users, args.scheme)
+    print(f"{args.users} users loaded in {time.perf_counter() - start:.2f} s\n", file=sys.stderr)
+
+    reports = []
+    for rate in args.rate:
+        config = LoadConfig(rate=rate, duration=args.duration, nodes=args.nodes,
+                            block_interval=args.block_interval,
+                            max_block_transactions=args.max_block_transactions,
+                            arrival=args.arrival, drain=args.drain, seed=args.seed)
+        report = simulate(config, users)
+        print(report.format() + "\n", file=sys.stderr)
+        reports.append(report.to_dict())
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+    else:
+        print(json.dumps(reports, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
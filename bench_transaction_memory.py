@@ -0,0 +1,53 @@
+import gc
+import hashlib
+import tracemalloc
+from datetime import datetime
+from constant import TransactionState
+from mempool import Mempool
+from transaction import Transaction
+
+COUNT = 100000
+
+class DictTransaction:
+    """The previous __dict__-based layout, kept here for comparison"""
+    def __init__(self, sender, receiver, amount):
+        self.timestamp = datetime.now()
+        self.transaction_id = hashlib.sha256(f"{sender}{receiver}{amount}{self.timestamp}".encode()).hexdigest()
+        self.sender = sender
+        self.receiver = receiver
+        self.amount = amount
+        self.state = TransactionState.STARTED
+        self.signature = None
+
+def use(tx):
+    """What mempool admission and signature verification ask of a transaction"""
+    Mempool.transaction_size(tx)
+    tx.has_valid_id()
+    tx.signing_message()
+
+def measure(cls, used=False):
+    # addresses are shared between transactions, as they are on a real chain
+    senders = [f"0x{i:040x}" for i in range(100)]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    txs = [cls(senders[i % 100], senders[(i + 1) % 100], i) for i in range(COUNT)]
+    if used:
+        # anything a transaction keeps from being used stays allocated here
+        for tx in txs:
+            use(tx)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(txs)
+
+def main():
+    legacy = measure(DictTransaction)
+    slotted = measure(Transaction)
+    used = measure(Transaction, used=True)
+    print(f"{COUNT} transactions, bytes per transaction (including id, timestamp and amount)\n")
+    print(f"{'__dict__':<24} {legacy:>8.0f}")
+    print(f"{'__slots__':<24} {slotted:>8.0f}  ({(1 - slotted / legacy) * 100:.0f}% less)")
+    print(f"{'__slots__, after use':<24} {used:>8.0f}  ({(1 - used / legacy) * 100:.0f}% less)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import os
+from blockchain import Blockchain
+from user import User
+from verifier import SignatureVerifier
+
+CHAIN_HEIGHT = 100
+TXS_PER_BLOCK = 50
+
+def build_chain(users):
+    blockchain = Blockchain()
+    for user in users:
+        blockchain.register_user(user)
+    blockchain.mine_pending_transactions()
+    for _ in range(CHAIN_HEIGHT):
+        for i in range(TXS_PER_BLOCK):
+            sender = users[i % len(users)]
+            receiver = users[(i + 1) % len(users)]
+            blockchain.pending_transactions.append(sender.start_transaction(receiver.get_address(), 1))
+        blockchain.mine_pending_transactions()
+    return blockchain
+
+def bench(label, blockchain, workers, assume_valid=None):
+    verifier = SignatureVerifier(workers=workers)
+    try:
+        result = blockchain.validate_chain(assume_valid=assume_valid, verifier=verifier)
+    finally:
+        verifier.shutdown()
+    assert result.valid, result.error
+    print(f"{label:<34} {result.elapsed * 1000:>10.1f} ms {result.blocks_per_second:>10.0f} blocks/s")
+
+def main():
+    blockchain = build_chain([User() for _ in range(10)])
+    print(f"Validating a chain of {CHAIN_HEIGHT} blocks x {TXS_PER_BLOCK} transactions\n")
+    workers = os.cpu_count() or 1
+    checkpoint = blockchain.chain[len(blockchain.chain) - 10].hash
+    bench("full, 1 worker", blockchain, 1)
+    bench("assume-valid tip-10, 1 worker", blockchain, 1, checkpoint)
+    if workers > 1:
+        bench(f"full, {workers} workers", blockchain, workers)
+        bench(f"assume-valid tip-10, {workers} workers", blockchain, workers, checkpoint)
+
+if __name__ == "__main__":
+    main()
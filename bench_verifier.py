@@ -0,0 +1,42 @@
+import os
+import time
+from user import User
+from verifier import SignatureVerifier
+
+BLOCK_SIZE = 2000
+SENDERS = 20
+
+def build_block():
+    senders = [User() for _ in range(SENDERS)]
+    receiver = User()
+    return [
+        (senders[i % SENDERS].start_transaction(receiver.get_address(), i + 1),
+         senders[i % SENDERS]._public_key)
+        for i in range(BLOCK_SIZE)
+    ]
+
+def bench(label, verifier, items):
+    start = time.perf_counter()
+    results = verifier.verify_batch(items)
+    elapsed = time.perf_counter() - start
+    assert all(results)
+    print(f"{label:<28} {len(items) / elapsed:>12.0f} verifications/s")
+
+def main():
+    print(f"Verifying a block of {BLOCK_SIZE} transactions from {SENDERS} senders\n")
+    items = build_block()
+
+    sequential = SignatureVerifier(workers=1)
+    bench("sequential (cold cache)", sequential, items)
+    bench("sequential (warm cache)", sequential, items)
+
+    workers = os.cpu_count() or 1
+    parallel = SignatureVerifier(workers=workers)
+    try:
+        bench(f"{workers} workers (cold cache)", parallel, items)
+        bench(f"{workers} workers (warm cache)", parallel, items)
+    finally:
+        parallel.shutdown()
+
+if __name__ == "__main__":
+    main()
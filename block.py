@@ -1,33 +1,160 @@
 import json
 import hashlib
+import time
+from transaction import Transaction
+from difficulty import meets_target, target_bytes, target_from_zeros
+import merkle
+import metrics
 
-class Block:
-    def __init__(self, index, transactions, timestamp, previous_hash, nonce=0):
+def serialize_header_prefix(index, merkle_root, timestamp, previous_hash):
+    """
+    Serializes the header fields that stay fixed while mining (all but the nonce).
+    """
+    return json.dumps({
+        'index': index,
+        'merkle_root': merkle_root,
+        'timestamp': timestamp,
+        'previous_hash': previous_hash,
+    }, sort_keys=True).encode()
+
+class BlockHeader:
+    """
+    A block without its transactions, which are committed to by merkle_root.
+    """
+    def __init__(self, index, merkle_root, timestamp, previous_hash, nonce, block_hash):
         self.index = index
-        self.transactions = transactions
+        self.merkle_root = merkle_root
         self.timestamp = timestamp
         self.previous_hash = previous_hash
         self.nonce = nonce
-        self.hash = self.compute_hash()
+        self.hash = block_hash
 
     def compute_hash(self):
         """
-        Returns the SHA-256 hash of the block's contents.
+        Returns the SHA-256 hash of the header, equal to the full block's hash.
         """
-        block_string = json.dumps({
+        prefix = serialize_header_prefix(
+            self.index, self.merkle_root, self.timestamp, self.previous_hash
+        )
+        return hashlib.sha256(prefix + str(self.nonce).encode()).hexdigest()
+
+class Block:
+    def __init__(self, index, transactions, timestamp, previous_hash, nonce=0):
+        self.index = index
+        # keep our own copy so later changes to the caller's list (e.g. the
+        # mempool) cannot alter a block that is already on the chain
+        self.transactions = list(transactions)
+        self.timestamp = timestamp
+        self.previous_hash = previous_hash
+        self.nonce = nonce
+        self.hash = self.compute_hash()
+
+    def to_dict(self):
+        return {
             'index': self.index,
             'transactions': [tx.to_dict() for tx in self.transactions],
             'timestamp': self.timestamp,
             'previous_hash': self.previous_hash,
             'nonce': self.nonce,
-        }, sort_keys=True)
-        return hashlib.sha256(block_string.encode()).hexdigest()
+            'hash': self.hash,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuilds a block from its to_dict() form, keeping the stored hash.
+        """
+        return cls.restore(
+            data['index'],
+            [Transaction.from_dict(tx) for tx in data['transactions']],
+            data['timestamp'],
+            data['previous_hash'],
+            data['nonce'],
+            data['hash'],
+        )
+
+    @classmethod
+    def restore(cls, index, transactions, timestamp, previous_hash, nonce, block_hash):
+        """
+        Recreates a stored or received block with its recorded hash (not recomputed).
+        """
+        block = cls.__new__(cls)
+        block.index = index
+        block.transactions = transactions
+        block.timestamp = timestamp
+        block.previous_hash = previous_hash
+        block.nonce = nonce
+        block.hash = block_hash
+        return block
+
+    def compute_merkle_root(self):
+        """
+        Returns the Merkle root of the block's transactions (see merkle.py).
+        """
+        return merkle.merkle_root([merkle.transaction_leaf(tx) for tx in self.transactions])
+
+    def merkle_proof(self, transaction_id):
+        """
+        Returns the inclusion proof of a transaction in this block, or None.
+        """
+        leaves = []
+        index = None
+        for position, tx in enumerate(self.transactions):
+            if tx.transaction_id == transaction_id:
+                index = position
+            leaves.append(merkle.transaction_leaf(tx))
+        return None if index is None else merkle.merkle_proof(leaves, index)
+
+    def header_prefix(self):
+        """
+        Returns the serialized fixed part of the header: everything but the nonce.
+        The block hash is SHA-256(header_prefix + nonce).
+        """
+        return serialize_header_prefix(
+            self.index, self.compute_merkle_root(), self.timestamp, self.previous_hash
+        )
 
-    def mine(self, difficulty):
+    def header(self):
         """
-        Mines the block by adjusting the nonce until the hash satisfies the difficulty.
+        Returns the block's header (everything needed to check its hash and PoW).
         """
-        target = '0' * difficulty
-        while not self.hash.startswith(target):
-            self.nonce += 1
-            self.hash = self.compute_hash()
+        return BlockHeader(
+            self.index, self.compute_merkle_root(), self.timestamp,
+            self.previous_hash, self.nonce, self.hash
+        )
+
+    def compute_hash(self):
+        """
+        Returns the SHA-256 hash of the block's contents.
+        """
+        return hashlib.sha256(self.header_prefix() + str(self.nonce).encode()).hexdigest()
+
+    def mine(self, difficulty=None, target=None):
+        """
+        Mines the block by adjusting the nonce until the hash meets the target
+        (see difficulty.py), given directly or as `difficulty` leading hex zeros.
+        The header prefix is serialized and absorbed into a SHA-256 midstate once;
+        each attempt only copies that state, hashes the nonce and compares the
+        raw digest with the target's bytes.
+        """
+        if target is None:
+            target = target_from_zeros(difficulty)
+        if meets_target(self.hash, target):
+            return
+        start = metrics.start_timer()
+        limit = target_bytes(target)
+        midstate = hashlib.sha256(self.header_prefix())
+        nonce = self.nonce
+        while True:
+            nonce += 1
+            attempt = midstate.copy()
+            attempt.update(str(nonce).encode())
+            if attempt.digest() <= limit:
+                break
+        if metrics.is_enabled():
+            attempts, elapsed = nonce - self.nonce, time.perf_counter() - start
+            metrics.MINE_HASHES.inc(attempts)
+            metrics.MINE_SECONDS.observe(elapsed)
+            metrics.MINE_HASHRATE.set(attempts / elapsed if elapsed else 0.0)
+        self.nonce = nonce
+        self.hash = attempt.hexdigest()
@@ -1,158 +1,742 @@
 # blockchain.py
-from typing import List, Optional, Dict
-from block import Block
+from typing import Callable, List, Optional, Dict, Tuple
+from block import Block, BlockHeader
 from user import User
 from transaction import Transaction
-from constant import SYSTEM, DIFFICULTY, TransactionState
+from constant import REWARD, SYSTEM, GENESIS_TIMESTAMP, PRUNE_INTERVAL, STORE_CHECKPOINT_INTERVAL, TransactionState
+from state import AccountState, StateTransition
+from mempool import Mempool
+from miner import ParallelMiner
+from verifier import SignatureVerifier
+from storage import BlockStore, StoredChain
+from txindex import TransactionIndex, Location
+from confirmation import ConfirmationTracker
+from blocktree import BlockTree
+from difficulty import Retargeting, meets_target
+from merkle import ProofStep
+from validation import ChainValidator, ValidationResult, reward_error
+from template import BlockTemplate
+from columnar import ColumnarStore
+from snapshot import StateSnapshot
+from signatures import address_from_public_key, load_public_key
+import consensus
+import metrics
 import time
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import padding
+import hashlib
+from datetime import datetime
 
 class Blockchain:
-    def __init__(self):
-        self.chain: List[Block] = []
+    def __init__(self, verifier: Optional[SignatureVerifier] = None,
+                 store: Optional[BlockStore] = None,
+                 prune_depth: Optional[int] = None,
+                 snapshot_path: Optional[str] = None,
+                 retargeting: Optional[Retargeting] = None):
+        if prune_depth is not None and store is not None:
+            raise ValueError("Pruning applies to in-memory chains; a BlockStore keeps blocks on disk")
+        # with a store, blocks live on disk and are loaded on access
+        self.store = store
+        # blocks up to pruned_height are kept as headers only (see prune)
+        self.chain: List[Block] = [] if store is None else StoredChain(store)
+        self.prune_depth = prune_depth
+        self.snapshot_path = snapshot_path
+        self.snapshot: Optional[StateSnapshot] = None
+        self.pruned_height = -1
         self.user_registry: Dict[str, User] = {}
+        # address -> public key object, filled from user_registry on first use
+        # or from register_public_key, so keys are deserialized only once
+        self._public_keys: Dict[str, object] = {}
         # mempool of pending transactions
-        self.pending_transactions: List[Transaction] = []
+        self.pending_transactions: Mempool = Mempool()
+        # balance index, updated block by block in add_block/remove_last_block
+        self.state = AccountState()
+        # transactions for the next mined block, kept up to date as the mempool changes
+        self.template = BlockTemplate(self.pending_transactions, self.get_balance)
+        # transaction/address lookups; built lazily for a chain loaded from a
+        # store (which answers lookups by transaction id itself)
+        self._tx_index: Optional[TransactionIndex] = None
+        if store is None or len(store) == 0:
+            self._tx_index = TransactionIndex()
+        # columnar copy for bulk queries; only built (and then maintained) on first use
+        self._columns: Optional[ColumnarStore] = None
+        # moves transactions to FULLY_CONFIRMED as blocks are built on top
+        self.confirmations = ConfirmationTracker()
+        # signature checks are cached, so a transaction is verified only once
+        self.verifier = verifier or SignatureVerifier()
+        # proof-of-work target rules; every node of a network must use the same
+        self.retargeting = retargeting or Retargeting()
+        # (height, target) of a main-chain block whose target is known, e.g.
+        # from the store's checkpoint, so the tip's target need not be
+        # replayed from genesis
+        self._known_target: Optional[Tuple[int, int]] = None
 
         # make sure there is at least one block in the chain
-        self.create_genesis_block()
+        if len(self.chain) == 0:
+            self.create_genesis_block()
+        else:
+            self._load_state()
+        # recent main-chain blocks and competing branches, for fork choice
+        self.tree = self._new_tree()
+        if prune_depth is not None and prune_depth < self.tree.max_depth:
+            raise ValueError("prune_depth must cover the blocks a reorganization may undo")
 
     def create_genesis_block(self) -> None:
         """Create the genesis block of the blockchain"""
-        genesis_transaction = Transaction("genesis", "genesis", 0)
-        genesis_block = Block(0, [genesis_transaction], time.time(), "0")
+        # fixed contents, so that every node starts from the same genesis hash
+        timestamp = datetime.fromtimestamp(GENESIS_TIMESTAMP)
+        genesis_transaction = Transaction.restore(
+            transaction_id=hashlib.sha256(f"genesisgenesis0{timestamp}".encode()).hexdigest(),
+            timestamp=timestamp,
+            sender="genesis",
+            receiver="genesis",
+            amount=0,
+            state=TransactionState.STARTED,
+            signature=None
+        )
+        genesis_block = Block(0, [genesis_transaction], GENESIS_TIMESTAMP, "0")
         self.chain.append(genesis_block)
+        self.state.apply_block(genesis_block)
+        self._tx_index.add_block(genesis_block)
+
+    def _new_tree(self) -> BlockTree:
+        """A block tree rooted at the tip, whose target is replayed from the chain"""
+        tip = self.get_last_block()
+        known_height, known_target = 0, None
+        if self._known_target is not None and self._known_target[0] <= tip.index:
+            known_height, known_target = self._known_target
+        return BlockTree(tip, root_target=self.retargeting.target_at(
+            tip.index, lambda height: self.chain[height].timestamp, known_height, known_target))
+
+    def _load_state(self) -> None:
+        """Restore balances of a stored chain from the last checkpoint plus the blocks after it"""
+        checkpoint = self.store.load_state()
+        start = 0
+        if checkpoint is not None:
+            height, balances, target = checkpoint
+            self.state.balances = dict(balances)
+            start = height + 1
+            if target is not None:
+                self._known_target = (height, target)
+        for height in range(start, len(self.chain)):
+            self.state.apply_block(self.chain[height])
+        # re-queue the blocks that have not reached confirmation depth yet
+        for height in range(max(1, len(self.chain) - self.confirmations.depth), len(self.chain)):
+            self.confirmations.track(self.chain[height])
 
     def register_user(self, user: User) -> None:
         """Register a new user in the blockchain"""
         self.pending_transactions.append(Transaction(SYSTEM, user.address, 100))
         self.user_registry[user.address] = user
 
+    def register_public_key(self, address: str, public_key_der: bytes) -> None:
+        """Make a key known without its User, e.g. one announced by another node"""
+        public_key = load_public_key(public_key_der)
+        if address_from_public_key(public_key) != address:
+            raise ValueError(f"Public key does not belong to {address}")
+        self._public_keys[address] = public_key
+
+    def public_key_of(self, address: str):
+        """The public key object of an address, or None if unknown"""
+        public_key = self._public_keys.get(address)
+        if public_key is None:
+            user = self.user_registry.get(address)
+            if user is None:
+                return None
+            public_key = self._public_keys[address] = user._public_key
+        return public_key
+
     def get_balance(self, address: str) -> int:
         """Get the balance of a user by their address"""
-        balance = 0
-        for block in self.chain:
-            for transaction in block.transactions:
-                if transaction.sender == address:
-                    balance -= transaction.amount
-                if transaction.receiver == address:
-                    balance += transaction.amount
-        return balance
+        return self.state.get_balance(address)
+
+    def verify_state(self) -> bool:
+        """Check the maintained balance index against a rebuild from the chain (or the last snapshot)"""
+        state = AccountState()
+        start = 0
+        if self.snapshot is not None:
+            state.balances = dict(self.snapshot.balances)
+            start = self.snapshot.height + 1
+        for height in range(start, len(self.chain)):
+            state.apply_block(self.chain[height])
+        return state.balances == self.state.balances
+
+    def validate_chain(self, assume_valid: Optional[str] = None,
+                       verifier: Optional[SignatureVerifier] = None) -> ValidationResult:
+        """
+        Re-validate the whole chain in one streaming pass (see ChainValidator)
+        and check the balance index against the rebuilt state
+        Args:
+            assume_valid: Hash of a block whose signatures (and those below it) are trusted
+            verifier: Verifier to use, e.g. one with several workers; defaults to self.verifier
+        """
+        validator = ChainValidator(self.public_key_of, verifier or self.verifier, assume_valid,
+                                   retargeting=self.retargeting)
+        result = validator.validate(self.chain, self.snapshot)
+        if result.valid and result.state.balances != self.state.balances:
+            result.valid = False
+            result.error = "balance index does not match the chain"
+        return result
 
     def get_last_block(self) -> Block:
         """Get the last block in the chain"""
         return self.chain[-1]
 
-    def add_block(self, block: Block) -> bool:
-        """Validate and add a new block to the chain"""
-        if not self.validate_block(block):
+    def add_block(self, block: Block, prechecked: bool = False) -> bool:
+        """
+        Validate and add a new block. A block extending the tip is appended;
+        a block on a side branch is kept in the block tree and, if its branch
+        now has the most work, the chain reorganizes onto it.
+        Args:
+            block: The block to add
+            prechecked: precheck_block(block) already passed, so a block
+                extending the tip skips its hash and signature checks
+        Returns:
+            True if the block was accepted (on the main chain or a side branch)
+        """
+        start = metrics.start_timer()
+        accepted = self._add_block(block, prechecked)
+        metrics.ADD_BLOCK_SECONDS.observe_since(start)
+        if accepted:
+            metrics.BLOCKS_ADDED.inc()
+            metrics.CHAIN_HEIGHT.set(len(self.chain) - 1)
+            if self.prune_depth is not None and block.index % PRUNE_INTERVAL == 0:
+                self.prune()
+        return accepted
+
+    def _add_block(self, block: Block, prechecked: bool) -> bool:
+        if block.hash in self.tree:
             return False
-            
-        # Update transaction states
-        for tx in block.transactions:
-            tx.state = TransactionState.FULLY_CONFIRMED
-            
+
+        if block.previous_hash == self.get_last_block().hash:
+            start = metrics.start_timer()
+            transition = self.prepare_block(block, prechecked)
+            metrics.ADD_BLOCK_VALIDATE_SECONDS.observe_since(start)
+            if transition is None:
+                return False
+            start = metrics.start_timer()
+            self.tree.add(block, self.next_target(self.get_last_block()))
+            self._connect_block(block, transition)
+            self.tree.prune(block.hash)
+            metrics.ADD_BLOCK_CONNECT_SECONDS.observe_since(start)
+            return True
+
+        start = metrics.start_timer()
+        parent = self.tree.get(block.previous_hash)
+        target = None if parent is None else self.next_target(parent)
+        valid = parent is not None and self.validate_header(block, parent, target)
+        metrics.ADD_BLOCK_VALIDATE_SECONDS.observe_since(start)
+        if not valid:
+            return False
+        self.tree.add(block, target)
+        if self.tree.work(block.hash) > self.tree.work(self.get_last_block().hash):
+            start = metrics.start_timer()
+            reorganized = self._reorganize(block)
+            metrics.ADD_BLOCK_REORG_SECONDS.observe_since(start)
+            return reorganized
+        return True
+
+    def _connect_block(self, block: Block, transition: Optional[StateTransition] = None) -> None:
+        """Append an already validated block and apply its state changes (from prepare_block, if given)"""
         self.chain.append(block)
+        if transition is not None:
+            transition.commit()
+        else:
+            self.state.apply_block(block)
+        self.template.invalidate()
+        if self._tx_index is not None:
+            self._tx_index.add_block(block)
+        if self._columns is not None:
+            self._columns.add_block(block)
+        # first-confirm this block's transactions and fully confirm those now deep enough
+        self.confirmations.block_added(block)
+        if self.store is not None and block.index % STORE_CHECKPOINT_INTERVAL == 0:
+            target = self.tree.target(block.hash)
+            self.store.save_state(block.index, self.state.balances, target)
+            self._known_target = (block.index, target)
+
+        # transactions in the block are no longer pending
+        self.pending_transactions.remove_many(tx.transaction_id for tx in block.transactions)
+
+    def _disconnect_tip(self, reopen: bool = False) -> Block:
+        """Remove the tip and undo its state changes"""
+        block = self.chain.pop()
+        self.state.revert_block(block)
+        if self._known_target is not None and block.index <= self._known_target[0]:
+            # a block at that height may now have another target
+            self._known_target = None
+        self.template.invalidate()
+        self.confirmations.block_removed(block, reopen=reopen)
+        if self._tx_index is not None:
+            self._tx_index.remove_block(block)
+        if self._columns is not None:
+            self._columns.remove_block(block)
+        return block
+
+    def _reorganize(self, new_tip: Block) -> bool:
+        """
+        Switch the main chain to the branch ending at new_tip by undoing the
+        blocks above the fork point and applying the new branch's blocks.
+        """
+        fork = self.tree.fork_point(self.get_last_block().hash, new_tip.hash)
+        disconnected = []
+        while self.get_last_block().hash != fork.hash:
+            disconnected.append(self._disconnect_tip(reopen=True))
+
+        connected = self.tree.path(fork.hash, new_tip.hash)
+        for applied, block in enumerate(connected):
+            transition = self.prepare_block(block)
+            if transition is None:
+                self.tree.remove(block.hash)
+                # restore the previous branch, which was valid before
+                for _ in range(applied):
+                    self._disconnect_tip()
+                for old in reversed(disconnected):
+                    self._connect_block(old)
+                return False
+            self._connect_block(block, transition)
+
+        # rolled-back transactions that the new branch did not include go
+        # back to the mempool if they are still valid on top of it
+        included = {tx.transaction_id for block in connected for tx in block.transactions}
+        for old in reversed(disconnected):
+            for tx in old.transactions:
+                if tx.transaction_id in included:
+                    continue
+                if self.validate_transaction(tx):
+                    self.pending_transactions.add(tx)
+                else:
+                    self.confirmations.cancel(tx)
+        self.tree.prune(new_tip.hash)
         return True
 
-    def validate_block(self, block: Block) -> bool:
-        """Comprehensive block validation"""
-        # Basic block structure validation
-        if block.index != len(self.chain):
+    def remove_last_block(self) -> Optional[Block]:
+        """Remove the tip of the chain and roll back its state changes"""
+        if len(self.chain) <= 1 or len(self.chain) - 1 <= self.pruned_height:
+            # the genesis block is never removed, nor a pruned one (it cannot be reverted)
+            return None
+        block = self._disconnect_tip()
+        self.tree.remove(block.hash)
+        if self.get_last_block().hash not in self.tree:
+            # removed past the oldest block the tree knew about
+            self.tree = self._new_tree()
+        return block
+
+    @property
+    def tx_index(self) -> TransactionIndex:
+        if self._tx_index is None:
+            self._tx_index = TransactionIndex.from_chain(self.chain)
+        return self._tx_index
+
+    def _location_of(self, transaction_id: str) -> Optional[Location]:
+        """
+        (height, position) of a transaction on the main chain, unless pruned;
+        a stored chain uses the store's index rather than building tx_index
+        """
+        if self.store is not None:
+            return self.store.location_of(transaction_id)
+        return self.tx_index.get_location(transaction_id)
+
+    def _is_confirmed(self, transaction_id: str) -> bool:
+        """Whether a transaction is on the main chain, in a pruned block or not"""
+        if self.snapshot is not None and transaction_id in self.snapshot.transaction_ids:
+            return True
+        return self._location_of(transaction_id) is not None
+
+    def prune(self, depth: Optional[int] = None) -> Optional[StateSnapshot]:
+        """
+        Snapshot the balances at `depth` blocks below the tip and replace every
+        block up to there with its header, dropping the transactions (and their
+        transaction index entries; only their ids are kept, in the snapshot,
+        to refuse replays). The snapshot is also written to snapshot_path if
+        set.
+        Args:
+            depth: Blocks to keep whole below the tip (defaults to prune_depth)
+        Returns:
+            The latest snapshot, or None if nothing was ever pruned
+        """
+        depth = self.prune_depth if depth is None else depth
+        if depth is None:
+            raise ValueError("No pruning depth given")
+        if self.store is not None:
+            raise ValueError("Pruning applies to in-memory chains; a BlockStore keeps blocks on disk")
+        if depth < self.tree.max_depth:
+            raise ValueError("Cannot prune blocks a reorganization may still undo")
+        height = len(self.chain) - 1 - depth
+        if height <= self.pruned_height:
+            return self.snapshot
+
+        # balances after block `height`: undo the blocks above it on a copy
+        state = AccountState()
+        state.balances = dict(self.state.balances)
+        for above in range(len(self.chain) - 1, height, -1):
+            state.revert_block(self.chain[above])
+
+        pruned = range(self.pruned_height + 1, height + 1)
+        transaction_ids = set() if self.snapshot is None else set(self.snapshot.transaction_ids)
+        for h in pruned:
+            transaction_ids.update(tx.transaction_id for tx in self.chain[h].transactions)
+        if self._tx_index is not None:
+            self._tx_index.prune((self.chain[h] for h in pruned), height)
+        for h in pruned:
+            self.chain[h] = self.chain[h].header()
+        self.pruned_height = height
+        self.snapshot = StateSnapshot(height, self.chain[height].hash, state.balances, transaction_ids)
+        if self.snapshot_path is not None:
+            self.snapshot.save(self.snapshot_path)
+        return self.snapshot
+
+    @classmethod
+    def from_snapshot(cls, snapshot: StateSnapshot, headers: List[BlockHeader], blocks: List[Block],
+                      user_registry: Optional[Dict[str, User]] = None,
+                      verifier: Optional[SignatureVerifier] = None,
+                      prune_depth: Optional[int] = None,
+                      snapshot_path: Optional[str] = None) -> 'Blockchain':
+        """
+        Bootstrap a pruned node from a snapshot, the headers from genesis up to
+        the snapshot height, and the full blocks after it. The headers are
+        checked for linkage and proof of work and the blocks are fully
+        validated; the snapshot balances themselves are trusted.
+        """
+        blockchain = cls(verifier=verifier, prune_depth=prune_depth, snapshot_path=snapshot_path)
+        if user_registry:
+            blockchain.user_registry.update(user_registry)
+        if not headers or headers[0].hash != blockchain.chain[0].hash:
+            raise ValueError("Headers do not start at the genesis block")
+        target = blockchain.retargeting.initial_target
+        for parent, header in zip(headers, headers[1:]):
+            target = blockchain.retargeting.next_target(
+                target, header.index, lambda height: headers[height].timestamp)
+            if not blockchain.validate_header(header, parent, target,
+                                              timestamp_at=lambda height: headers[height].timestamp):
+                raise ValueError(f"Invalid header at height {header.index}")
+        last = headers[-1]
+        if last.index != snapshot.height or last.hash != snapshot.block_hash:
+            raise ValueError("Snapshot does not match the header chain")
+
+        blockchain.chain = list(headers)
+        blockchain.state.balances = dict(snapshot.balances)
+        blockchain.snapshot = snapshot
+        blockchain.pruned_height = snapshot.height
+        blockchain._tx_index = TransactionIndex()
+        blockchain.tree = BlockTree(last, root_target=target)
+        blockchain.template.invalidate()
+        for block in blocks:
+            for tx in block.transactions:
+                consensus.receive(tx)
+            if not blockchain.add_block(block):
+                raise ValueError(f"Block at height {block.index} failed validation")
+        return blockchain
+
+    @property
+    def columns(self) -> ColumnarStore:
+        """Columnar view of the chain for bulk balance and volume queries (requires numpy)"""
+        if self._columns is None:
+            if self.pruned_height >= 0:
+                raise ValueError("The columnar view needs the transactions of the whole chain")
+            self._columns = ColumnarStore.from_chain(self.chain)
+        return self._columns
+
+    def get_transaction(self, transaction_id: str) -> Optional[Tuple[Transaction, Location]]:
+        """Find a confirmed transaction and its (block height, position)"""
+        location = self._location_of(transaction_id)
+        if location is None:
+            return None
+        height, position = location
+        return self.chain[height].transactions[position], location
+
+    def get_inclusion_proof(self, transaction_id: str) -> Optional[Tuple[BlockHeader, List[ProofStep]]]:
+        """
+        Header of the block containing a confirmed transaction plus the Merkle
+        proof linking the transaction to it (check with merkle.verify_inclusion,
+        against the header's target)
+        """
+        location = self._location_of(transaction_id)
+        if location is None:
+            return None
+        block = self.chain[location[0]]
+        return block.header(), block.merkle_proof(transaction_id)
+
+    def get_history(self, address: str, cursor: Optional[Location] = None,
+                    limit: int = 50) -> Tuple[List[Tuple[Transaction, Location]], Optional[Location]]:
+        """
+        Page through the confirmed transactions of an address, oldest first
+        Args:
+            address: Address whose history to list
+            cursor: Location returned by the previous call (None for the first page)
+            limit: Maximum number of transactions in the page
+        Returns:
+            The (transaction, location) pairs and the cursor for the next page
+        """
+        page, next_cursor = self.tx_index.get_history(address, cursor, limit)
+        entries = [
+            (self.chain[height].transactions[position], (height, position))
+            for height, position in page
+        ]
+        return entries, next_cursor
+
+    def next_target(self, parent: Block) -> int:
+        """Proof-of-work target of a block built on parent, a block in the tree"""
+        return self.retargeting.next_target(self.tree.target(parent.hash), parent.index + 1,
+                                            self._timestamps(parent))
+
+    def _timestamps(self, parent: Block) -> Callable[[int], float]:
+        """timestamp_at (see Retargeting) of the branch ending at parent, a block in the tree"""
+        return lambda height: self._ancestor(parent, height).timestamp
+
+    def _ancestor(self, block: Block, height: int) -> Block:
+        """The block at `height` on the branch ending at block"""
+        while block.index > height:
+            parent = self.tree.get(block.previous_hash)
+            if parent is None:
+                # below the tree's root, which is on the main chain
+                return self.chain[height]
+            block = parent
+        return block
+
+    def validate_header(self, block: Block, parent: Block, target: Optional[int] = None,
+                        check_hash: bool = True,
+                        timestamp_at: Optional[Callable[[int], float]] = None) -> bool:
+        """
+        Check linkage to the parent, the timestamp against the blocks below
+        it and the clock, the block hash (unless check_hash is False) and
+        the proof of work against target. For a parent in the tree, target
+        and timestamp_at (the timestamps of the ancestors) default to those
+        of its branch.
+        """
+        if block.index != parent.index + 1:
             return False
-            
-        if block.previous_hash != self.get_last_block().hash:
+
+        if block.previous_hash != parent.hash:
             return False
-            
-        if block.compute_hash() != block.hash:
+
+        if timestamp_at is None:
+            timestamp_at = self._timestamps(parent)
+        if not self.retargeting.timestamp_valid(block.timestamp, block.index, timestamp_at):
             return False
-            
+
+        if check_hash and block.compute_hash() != block.hash:
+            return False
+
         # Proof-of-Work validation
-        if not block.hash.startswith('0'*DIFFICULTY):
+        if target is None:
+            target = self.next_target(parent)
+        if not meets_target(block.hash, target):
             return False
-            
-        # Transaction validation
-        for tx in block.transactions:
-            if tx.sender == SYSTEM:
-                continue
-            if not self.validate_transaction(tx):
-                return False
-            if tx.state != TransactionState.SIGNED:
-                return False
-                
+
         return True
+
+    def validate_block(self, block: Block) -> bool:
+        """Comprehensive block validation"""
+        return self.prepare_block(block) is not None
+
+    def precheck_block(self, block: Block) -> bool:
+        """
+        The checks of a block that do not depend on the chain: its hash
+        matches its contents, every transaction id matches its fields and
+        every transfer is validly signed by a known sender (verified in one
+        batch). Safe to run on another thread while blocks are being added,
+        e.g. for the blocks after the one being added (see BlockPipeline).
+        """
+        if block.compute_hash() != block.hash:
+            return False
+        if not all(tx.has_valid_id() for tx in block.transactions):
+            return False
+        return not self._invalid_signatures(block.transactions)
+
+    def _invalid_signatures(self, transactions: List[Transaction]) -> List[Transaction]:
+        """The non-system transactions that are unsigned, from an unknown sender or badly signed"""
+        signed, invalid = [], []
+        for tx in transactions:
+            if tx.sender in (SYSTEM, REWARD):
+                continue
+            public_key = self.public_key_of(tx.sender) if tx.state == TransactionState.SIGNED else None
+            if public_key is None:
+                invalid.append(tx)
+            else:
+                signed.append((tx, public_key))
+        start = metrics.start_timer()
+        results = self.verifier.verify_batch(signed)
+        metrics.SIGNATURE_BATCH_SECONDS.observe_since(start)
+        invalid.extend(tx for (tx, _), valid in zip(signed, results) if not valid)
+        return invalid
+
+    def prepare_block(self, block: Block, prechecked: bool = False) -> Optional[StateTransition]:
+        """
+        Validate a block on top of the tip and compute its state changes
+        without applying them
+        Args:
+            block: The block to validate
+            prechecked: precheck_block(block) already passed, so only the
+                checks that depend on the chain are made
+        Returns:
+            The state transition to commit, or None if the block is invalid
+        """
+        start = metrics.start_timer()
+        transition = self._prepare_block(block, prechecked)
+        metrics.VALIDATE_BLOCK_SECONDS.observe_since(start)
+        if transition is None:
+            metrics.BLOCKS_REJECTED.inc()
+        return transition
+
+    def _prepare_block(self, block: Block, prechecked: bool) -> Optional[StateTransition]:
+        # Basic block structure validation
+        if block.index != len(self.chain):
+            return None
+
+        if not self.validate_header(block, self.get_last_block(), check_hash=False):
+            return None
+
+        # Hash and signatures (all verified in one batch)
+        if not prechecked and not self.precheck_block(block):
+            return None
+
+        if reward_error(block.transactions) is not None:
+            return None
+
+        # Apply the transfers in one pass; the running balances include each
+        # sender's earlier spends in this block, so overdrafts are caught.
+        # A transaction may appear only once, in this block and on the chain.
+        transition = self.state.begin()
+        seen = set()
+        for tx in block.transactions:
+            if tx.transaction_id in seen or self._is_confirmed(tx.transaction_id):
+                return None
+            seen.add(tx.transaction_id)
+            if not transition.apply_transaction(tx, check_balance=tx.sender not in (SYSTEM, REWARD)):
+                return None
+        return transition
     
     """
     Below is the methods that interacts with transactions
     """
     def verify_transaction_signature(self, tx: Transaction) -> bool:
         """Cryptographic signature verification"""
-        if tx.sender not in self.user_registry:
+        public_key = self.public_key_of(tx.sender)
+        if public_key is None:
             return False
             
-        try:
-            public_key = self.user_registry[tx.sender]._public_key
-            message = f"{tx.sender}{tx.receiver}{tx.amount}{tx.timestamp}"
-            
-            public_key.verify(
-                bytes.fromhex(tx.signature),
-                message.encode(),
-                padding.PSS(
-                    mgf=padding.MGF1(hashes.SHA256()),
-                    salt_length=padding.PSS.MAX_LENGTH
-                ),
-                hashes.SHA256()
-            )
-            return True
-        except Exception as e:
-            print(f"Signature verification failed: {str(e)}")
+        start = metrics.start_timer()
+        valid = self.verifier.verify(tx, public_key)
+        metrics.SIGNATURE_VERIFY_SECONDS.observe_since(start)
+        if not valid:
+            metrics.SIGNATURE_FAILURES.inc()
+            print(f"Signature verification failed: {tx.transaction_id}")
             return False
+        return True
 
     def validate_transaction(self, transaction: Transaction) -> bool:
         """ Validate that the sender has enough balance for this transaction """
         if (transaction.sender is None):
             return False
+
+        if not transaction.has_valid_id():
+            return False
+
+        if not transaction.has_valid_amounts():
+            return False
         
         if (transaction.sender == SYSTEM):
             return True
+
+        if transaction.sender == REWARD:
+            # only ever created by a miner, inside its own block
+            return False
         
         if not self.verify_transaction_signature(transaction):
             return False
 
         sender_balance = self.get_balance(transaction.sender)
-        pending_spent = sum(
-            pt.amount for pt in self.pending_transactions 
-            if pt.sender == transaction.sender
-        )
+        pending_spent = self.pending_transactions.pending_spent(transaction.sender)
+        if transaction in self.pending_transactions:
+            # do not count the transaction against itself
+            pending_spent -= transaction.cost
         
-        return sender_balance - pending_spent >= transaction.amount
+        return sender_balance - pending_spent >= transaction.cost
     
     def prove_transaction(self, transaction: Transaction) -> None:
         """Allow full-node users to prove the transaction (and notify the miners)"""
-        if self.verify(transaction) and self.validate(transaction):
+        if (transaction in self.pending_transactions
+                or self._is_confirmed(transaction.transaction_id)):
+            # resubmission of a transaction we already hold or have confirmed
+            return
+        if self.validate_transaction(transaction):
             transaction.state = TransactionState.SIGNED
+            self.pending_transactions.add(transaction)
         else:
             transaction.state = TransactionState.FAILED
         return
 
+    def _with_reward(self, transactions: List[Transaction], miner_address: str) -> List[Transaction]:
+        """
+        The transactions preceded by a reward of their fees to miner_address,
+        dropping transactions from the end as needed to keep the block
+        within the template's byte and count limits (a prefix of the
+        template keeps every sender's transactions in order)
+        """
+        sizes = [self.pending_transactions.size_of(tx.transaction_id) for tx in transactions]
+        # the reward only shrinks as transactions are dropped
+        reward_size = Mempool.transaction_size(
+            Transaction(REWARD, miner_address, sum(tx.fee for tx in transactions)))
+        used = sum(sizes)
+        while transactions and (len(transactions) + 1 > self.template.max_transactions
+                                or used + reward_size > self.template.max_bytes):
+            transactions = transactions[:-1]
+            used -= sizes.pop()
+        fees = sum(tx.fee for tx in transactions)
+        if not fees:
+            return transactions
+        return [Transaction(REWARD, miner_address, fees)] + transactions
+
     def get_public_key_for_address(self, address: str) -> Optional[str]:
         """Get the public key for a given address"""
-        user = next((user for user in self.users if user.address == address), None)
+        user = self.user_registry.get(address)
         return user.get_public_key() if user else None
 
-    def mine_pending_transactions(self) -> None:
-        """Mine all pending transactions into a new block"""
-        if not self.pending_transactions:
+    def mine_pending_transactions(self, max_transactions: Optional[int] = None,
+                                  miner: Optional[ParallelMiner] = None,
+                                  miner_address: Optional[str] = None) -> None:
+        """
+        Mine the current block template (see BlockTemplate) into a new block
+        Args:
+            max_transactions: Further cap on the number of template transactions in the block
+            miner: Parallel miner to use instead of mining in this process
+            miner_address: Address credited with the block's fees, if any (the
+                reward transaction counts against the template's limits)
+        """
+        transactions = self.template.transactions()
+        if max_transactions is not None:
+            # a prefix of the template keeps every sender's transactions in order
+            transactions = transactions[:max_transactions]
+        # Signatures are checked before mining rather than in add_block (for
+        # transactions admitted through validate_transaction these are cache
+        # hits). A bad one can never become valid, so it leaves the mempool;
+        # later transactions of its sender then spend less and stay covered.
+        invalid = {tx.transaction_id for tx in self._invalid_signatures(transactions)}
+        if invalid:
+            self.pending_transactions.remove_many(invalid)
+            transactions = [tx for tx in transactions if tx.transaction_id not in invalid]
+        if miner_address is not None:
+            transactions = self._with_reward(transactions, miner_address)
+        if not transactions:
             return
-            
+
+        parent = self.get_last_block()
+        # later than the median time past even if recent blocks came from a
+        # clock running ahead of ours
+        median_time_past = self.retargeting.median_time_past(parent.index + 1, self._timestamps(parent))
         new_block = Block(
             index=len(self.chain),
-            transactions=self.pending_transactions,
-            timestamp=time.time(),
-            previous_hash=self.get_last_block().hash
+            transactions=transactions,
+            timestamp=max(time.time(), median_time_past + 0.001),
+            previous_hash=parent.hash
         )
-        
-        new_block.mine(DIFFICULTY)
-        self.add_block(new_block)
-        self.pending_transactions = []
\ No newline at end of file
+        target = self.next_target(parent)
+
+        if miner is None:
+            new_block.mine(target=target)
+        elif not miner.mine(new_block, target=target).found:
+            # mining was cancelled, e.g. because a competing block arrived
+            return
+        # the block was built on the tip from checked transactions, so only
+        # the checks that depend on the chain remain; add_block also removes
+        # the mined transactions from the mempool
+        self.add_block(new_block, prechecked=True)
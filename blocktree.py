@@ -0,0 +1,117 @@
+from typing import Dict, List, Optional, Set
+from block import Block
+from constant import DIFFICULTY, MAX_REORG_DEPTH
+from difficulty import block_work, target_from_zeros
+
+class BlockTree:
+    """
+    Recent blocks of the main chain and of competing side branches.
+
+    Every block stores its proof-of-work target and the cumulative work
+    from the root (the sum of block_work of the targets), so the heaviest
+    tip is a comparison and a fork point is found by walking both branches
+    back to a common ancestor. Blocks more than `max_depth` below the best
+    tip are pruned; branches forking below that are no longer accepted.
+    """
+
+    def __init__(self, root: Block, max_depth: int = MAX_REORG_DEPTH,
+                 root_target: int = target_from_zeros(DIFFICULTY)) -> None:
+        self.max_depth = max_depth
+        self._blocks: Dict[str, Block] = {root.hash: root}
+        self._targets: Dict[str, int] = {root.hash: root_target}
+        # cumulative work is relative to the root; only differences matter
+        self._work: Dict[str, int] = {root.hash: 0}
+        self._children: Dict[str, Set[str]] = {root.hash: set()}
+        self._by_height: Dict[int, Set[str]] = {root.index: {root.hash}}
+
+    def __contains__(self, block_hash: str) -> bool:
+        return block_hash in self._blocks
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def get(self, block_hash: str) -> Optional[Block]:
+        return self._blocks.get(block_hash)
+
+    def work(self, block_hash: str) -> int:
+        return self._work[block_hash]
+
+    def target(self, block_hash: str) -> int:
+        return self._targets[block_hash]
+
+    def add(self, block: Block, target: Optional[int] = None) -> bool:
+        """
+        Attach a block under its parent, with the target it was checked
+        against (default: the parent's); False if the parent is unknown
+        """
+        parent = self._blocks.get(block.previous_hash)
+        if parent is None or block.index != parent.index + 1 or block.hash in self._blocks:
+            return False
+        if target is None:
+            target = self._targets[parent.hash]
+        self._blocks[block.hash] = block
+        self._targets[block.hash] = target
+        self._work[block.hash] = self._work[parent.hash] + block_work(target)
+        self._children[block.hash] = set()
+        self._children[parent.hash].add(block.hash)
+        self._by_height.setdefault(block.index, set()).add(block.hash)
+        return True
+
+    def remove(self, block_hash: str) -> None:
+        """Drop a block and all of its descendants (e.g. because it is invalid)"""
+        block = self._blocks.get(block_hash)
+        if block is None:
+            return
+        for child in list(self._children[block_hash]):
+            self.remove(child)
+        del self._blocks[block_hash]
+        del self._targets[block_hash]
+        del self._work[block_hash]
+        del self._children[block_hash]
+        self._by_height[block.index].discard(block_hash)
+        if not self._by_height[block.index]:
+            del self._by_height[block.index]
+        siblings = self._children.get(block.previous_hash)
+        if siblings is not None:
+            siblings.discard(block_hash)
+
+    def fork_point(self, a: str, b: str) -> Block:
+        """The most recent common ancestor of two blocks in the tree"""
+        block_a, block_b = self._blocks[a], self._blocks[b]
+        while block_a.index > block_b.index:
+            block_a = self._blocks[block_a.previous_hash]
+        while block_b.index > block_a.index:
+            block_b = self._blocks[block_b.previous_hash]
+        while block_a.hash != block_b.hash:
+            block_a = self._blocks[block_a.previous_hash]
+            block_b = self._blocks[block_b.previous_hash]
+        return block_a
+
+    def path(self, ancestor: str, tip: str) -> List[Block]:
+        """Blocks after `ancestor` up to and including `tip`, in chain order"""
+        blocks = []
+        block = self._blocks[tip]
+        while block.hash != ancestor:
+            blocks.append(block)
+            block = self._blocks[block.previous_hash]
+        blocks.reverse()
+        return blocks
+
+    def prune(self, tip: str) -> None:
+        """Forget blocks more than max_depth below the tip and branches forking there"""
+        block = self._blocks[tip]
+        horizon = block.index - self.max_depth
+        if horizon <= min(self._by_height):
+            return
+        while block.index > horizon:
+            block = self._blocks[block.previous_hash]
+        # side branches whose fork point is about to be dropped go with it
+        for block_hash in list(self._by_height[horizon]):
+            if block_hash != block.hash:
+                self.remove(block_hash)
+        for height in [h for h in self._by_height if h < horizon]:
+            for block_hash in self._by_height.pop(height):
+                del self._blocks[block_hash]
+                del self._targets[block_hash]
+                del self._work[block_hash]
+                del self._children[block_hash]
@@ -0,0 +1,157 @@
+"""
+Compact, versioned binary encoding of transactions and blocks.
+
+All integers are little-endian and fixed width, signatures are stored as raw
+bytes instead of hex, and variable-length fields carry a length prefix.
+Decoders read straight from a memoryview (struct.unpack_from and slicing), so
+decoding a block out of a larger buffer does not copy it first.
+
+Transaction (version 2):
+    u8 version | 32B transaction_id | i64 timestamp (us since 1970-01-01)
+    | u8 state | i64 amount | i64 fee | str sender | str receiver
+    | u16 len + signature
+Block (version 2):
+    u8 version | u64 index | f64 timestamp | hash previous_hash | u64 nonce
+    | hash hash | u32 tx count | (u32 len + transaction) * count
+where str is u16 length + UTF-8 and hash is either tag 0 + 32 raw digest
+bytes or tag 1 + u8 length + ASCII (for non-digest values like genesis "0").
+Version 1 is the same without the fee, and is still decoded (as fee 0).
+"""
+import struct
+from datetime import datetime, timedelta
+from typing import Tuple, Union
+from block import Block
+from constant import TransactionState
+from transaction import Transaction
+
+CODEC_VERSION = 2
+
+_EPOCH = datetime(1970, 1, 1)
+_STATES = list(TransactionState)
+_STATE_CODES = {state: code for code, state in enumerate(_STATES)}
+
+_U8 = struct.Struct('<B')
+_U16 = struct.Struct('<H')
+_U32 = struct.Struct('<I')
+_TX_FIXED = struct.Struct('<B32sqBqq')
+_TX_FIXED_V1 = struct.Struct('<B32sqBq')
+_BLOCK_HEAD = struct.Struct('<BQd')
+_U64 = struct.Struct('<Q')
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+def _pack_str(value: str) -> bytes:
+    raw = value.encode()
+    return _U16.pack(len(raw)) + raw
+
+def _unpack_str(view: memoryview, offset: int) -> Tuple[str, int]:
+    (length,) = _U16.unpack_from(view, offset)
+    offset += _U16.size
+    return str(view[offset:offset + length], 'utf-8'), offset + length
+
+def _pack_hash(value: str) -> bytes:
+    if len(value) == 64:
+        try:
+            return b'\x00' + bytes.fromhex(value)
+        except ValueError:
+            pass
+    raw = value.encode('ascii')
+    return b'\x01' + _U8.pack(len(raw)) + raw
+
+def _unpack_hash(view: memoryview, offset: int) -> Tuple[str, int]:
+    tag = view[offset]
+    offset += 1
+    if tag == 0:
+        return view[offset:offset + 32].hex(), offset + 32
+    length = view[offset]
+    offset += 1
+    return str(view[offset:offset + length], 'ascii'), offset + length
+
+def _check_version(version: int) -> None:
+    if not 1 <= version <= CODEC_VERSION:
+        raise ValueError(f"Unsupported encoding version: {version}")
+
+def encode_transaction(tx: Transaction) -> bytes:
+    """Serialize a transaction to its canonical binary form"""
+    timestamp = (tx.timestamp - _EPOCH) // timedelta(microseconds=1)
+    signature = bytes.fromhex(tx.signature) if tx.signature else b''
+    return b''.join((
+        _TX_FIXED.pack(CODEC_VERSION, bytes.fromhex(tx.transaction_id), timestamp,
+                       _STATE_CODES[tx.state], tx.amount, tx.fee),
+        _pack_str(tx.sender),
+        _pack_str(tx.receiver),
+        _U16.pack(len(signature)),
+        signature,
+    ))
+
+def decode_transaction(buf: Buffer, offset: int = 0) -> Tuple[Transaction, int]:
+    """
+    Decode a transaction starting at offset.
+    Returns:
+        The transaction and the offset just past it
+    """
+    view = memoryview(buf)
+    version = view[offset]
+    _check_version(version)
+    if version == 1:
+        _, txid, timestamp, state, amount = _TX_FIXED_V1.unpack_from(view, offset)
+        fee = 0
+        offset += _TX_FIXED_V1.size
+    else:
+        _, txid, timestamp, state, amount, fee = _TX_FIXED.unpack_from(view, offset)
+        offset += _TX_FIXED.size
+    sender, offset = _unpack_str(view, offset)
+    receiver, offset = _unpack_str(view, offset)
+    (sig_length,) = _U16.unpack_from(view, offset)
+    offset += _U16.size
+    signature = view[offset:offset + sig_length].hex() if sig_length else None
+    offset += sig_length
+    tx = Transaction.restore(
+        transaction_id=txid.hex(),
+        timestamp=_EPOCH + timedelta(microseconds=timestamp),
+        sender=sender,
+        receiver=receiver,
+        amount=amount,
+        state=_STATES[state],
+        signature=signature,
+        fee=fee
+    )
+    return tx, offset
+
+def encode_block(block: Block) -> bytes:
+    """Serialize a block (header and transactions) to its canonical binary form"""
+    parts = [
+        _BLOCK_HEAD.pack(CODEC_VERSION, block.index, block.timestamp),
+        _pack_hash(block.previous_hash),
+        _U64.pack(block.nonce),
+        _pack_hash(block.hash),
+        _U32.pack(len(block.transactions)),
+    ]
+    for tx in block.transactions:
+        encoded = encode_transaction(tx)
+        parts.append(_U32.pack(len(encoded)))
+        parts.append(encoded)
+    return b''.join(parts)
+
+def decode_block(buf: Buffer, offset: int = 0) -> Tuple[Block, int]:
+    """
+    Decode a block starting at offset.
+    Returns:
+        The block and the offset just past it
+    """
+    view = memoryview(buf)
+    version, index, timestamp = _BLOCK_HEAD.unpack_from(view, offset)
+    _check_version(version)
+    offset += _BLOCK_HEAD.size
+    previous_hash, offset = _unpack_hash(view, offset)
+    (nonce,) = _U64.unpack_from(view, offset)
+    offset += _U64.size
+    block_hash, offset = _unpack_hash(view, offset)
+    (count,) = _U32.unpack_from(view, offset)
+    offset += _U32.size
+    transactions = []
+    for _ in range(count):
+        offset += _U32.size
+        tx, offset = decode_transaction(view, offset)
+        transactions.append(tx)
+    return Block.restore(index, transactions, timestamp, previous_hash, nonce, block_hash), offset
@@ -0,0 +1,156 @@
+"""
+Columnar view of the confirmed chain for bulk accounting queries.
+
+Every confirmed transaction is one row. Addresses are interned to integer
+ids; ids, amounts, fees, block heights and block timestamps are kept in
+growable NumPy arrays. All-address balances, top holders and volume over a
+time range are then single vectorized passes instead of one get_balance
+call per address.
+
+NumPy is optional for a node: this module imports without it, but
+ColumnarStore raises ImportError when constructed. requirements.txt pins
+it, with the test tooling, so that test_columnar runs.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from block import Block
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_INITIAL_CAPACITY = 1024
+
+class ColumnarStore:
+    """
+    Append-only (plus tip removal) columns over the main chain's
+    transactions, kept in step with it by Blockchain when enabled.
+    """
+
+    _COLUMNS = (
+        ('sender', 'int32'),
+        ('receiver', 'int32'),
+        ('amount', 'int64'),
+        ('fee', 'int64'),
+        ('height', 'int64'),
+        ('timestamp', 'float64'),
+    )
+
+    def __init__(self, capacity: int = _INITIAL_CAPACITY) -> None:
+        if np is None:
+            raise ImportError("ColumnarStore requires numpy")
+        self._ids: Dict[str, int] = {}
+        self._addresses: List[str] = []
+        self._size = 0
+        self._columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in self._COLUMNS}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def intern(self, address: str) -> int:
+        """Integer id of an address, assigning the next one on first use"""
+        address_id = self._ids.get(address)
+        if address_id is None:
+            address_id = self._ids[address] = len(self._addresses)
+            self._addresses.append(address)
+        return address_id
+
+    def address_of(self, address_id: int) -> str:
+        return self._addresses[address_id]
+
+    def column(self, name: str) -> 'np.ndarray':
+        """Read-only view of the filled part of a column"""
+        view = self._columns[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def _reserve(self, rows: int) -> None:
+        capacity = len(self._columns['amount'])
+        if self._size + rows <= capacity:
+            return
+        while capacity < self._size + rows:
+            capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+
+    def add_block(self, block: Block) -> None:
+        count = len(block.transactions)
+        self._reserve(count)
+        start, end = self._size, self._size + count
+        columns = self._columns
+        columns['sender'][start:end] = [self.intern(tx.sender) for tx in block.transactions]
+        columns['receiver'][start:end] = [self.intern(tx.receiver) for tx in block.transactions]
+        columns['amount'][start:end] = [tx.amount for tx in block.transactions]
+        columns['fee'][start:end] = [tx.fee for tx in block.transactions]
+        columns['height'][start:end] = block.index
+        columns['timestamp'][start:end] = block.timestamp
+        self._size = end
+
+    def remove_block(self, block: Block) -> None:
+        """Drop the rows of the tip block (interned ids are kept)"""
+        self._size -= len(block.transactions)
+
+    def balance_array(self) -> 'np.ndarray':
+        """Balance of every interned address, indexed by address id"""
+        balances = np.zeros(len(self._addresses), dtype=np.int64)
+        amount = self.column('amount')
+        # np.add.at accumulates repeated ids exactly in integer arithmetic
+        np.add.at(balances, self.column('receiver'), amount)
+        np.subtract.at(balances, self.column('sender'), amount + self.column('fee'))
+        return balances
+
+    def balances(self) -> Dict[str, int]:
+        """Non-zero balance of every address (same contents as AccountState.balances)"""
+        balances = self.balance_array()
+        nonzero = np.flatnonzero(balances)
+        return {self._addresses[i]: int(balances[i]) for i in nonzero}
+
+    def top_holders(self, n: int, exclude: Iterable[str] = ()) -> List[Tuple[str, int]]:
+        """The n addresses with the largest balances, largest first"""
+        balances = self.balance_array()
+        for address in exclude:
+            address_id = self._ids.get(address)
+            if address_id is not None:
+                balances[address_id] = np.iinfo(np.int64).min
+        n = min(n, len(balances))
+        if n <= 0:
+            return []
+        top = np.argpartition(balances, -n)[-n:]
+        top = top[np.argsort(balances[top])[::-1]]
+        return [(self._addresses[i], int(balances[i])) for i in top
+                if balances[i] != np.iinfo(np.int64).min]
+
+    def volume(self, start: Optional[float] = None, end: Optional[float] = None) -> int:
+        """Total amount transferred in blocks with start <= timestamp < end"""
+        timestamps = self.column('timestamp')
+        mask = np.ones(self._size, dtype=bool)
+        if start is not None:
+            mask &= timestamps >= start
+        if end is not None:
+            mask &= timestamps < end
+        return int(self.column('amount')[mask].sum())
+
+    def volume_by_period(self, period: float, start: float,
+                         end: Optional[float] = None) -> List[Tuple[float, int]]:
+        """(period start, total amount) for each `period` seconds from start up to end"""
+        timestamps = self.column('timestamp')
+        if end is None:
+            if not self._size:
+                return []
+            # up to and including the period of the latest block
+            end = start + ((float(timestamps.max()) - start) // period + 1) * period
+        periods = max(int(np.ceil((end - start) / period)), 0)
+        mask = (timestamps >= start) & (timestamps < end)
+        bins = ((timestamps[mask] - start) // period).astype(np.int64)
+        totals = np.zeros(periods, dtype=np.int64)
+        np.add.at(totals, bins, self.column('amount')[mask])
+        return [(start + i * period, int(total)) for i, total in enumerate(totals)]
+
+    @classmethod
+    def from_chain(cls, chain: Iterable[Block]) -> 'ColumnarStore':
+        store = cls()
+        for block in chain:
+            store.add_block(block)
+        return store
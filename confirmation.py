@@ -0,0 +1,77 @@
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from block import Block
+from constant import CONFIRMATION_DEPTH, TransactionState
+from transaction import Transaction
+import consensus
+
+# callback(transaction, old_state, new_state)
+StateListener = Callable[[Transaction, TransactionState, TransactionState], None]
+
+class ConfirmationTracker:
+    """
+    Drives transactions through FIRST_CONFIRMED -> FULLY_CONFIRMED by depth.
+
+    Transactions of each new block are first confirmed and queued in a bucket
+    for that height. When a block arrives, only the bucket that has just
+    reached `depth` confirmations is promoted, so the work per block is
+    proportional to the transactions whose state actually changes.
+    Transactions of a removed block are canceled (or reopened during a reorg).
+    """
+
+    def __init__(self, depth: int = CONFIRMATION_DEPTH) -> None:
+        self.depth = depth
+        self._buckets: Deque[Tuple[int, List[Transaction]]] = deque()
+        self._listeners: List[StateListener] = []
+        self._tx_listeners: Dict[str, List[StateListener]] = {}
+
+    def subscribe(self, listener: StateListener, transaction_id: Optional[str] = None) -> None:
+        """Call listener on state changes of one transaction, or of all if no id is given"""
+        if transaction_id is None:
+            self._listeners.append(listener)
+        else:
+            self._tx_listeners.setdefault(transaction_id, []).append(listener)
+
+    def unsubscribe(self, listener: StateListener, transaction_id: Optional[str] = None) -> None:
+        listeners = self._listeners if transaction_id is None else self._tx_listeners.get(transaction_id, [])
+        if listener in listeners:
+            listeners.remove(listener)
+        if transaction_id is not None and not listeners:
+            self._tx_listeners.pop(transaction_id, None)
+
+    def _transition(self, tx: Transaction, change: Callable[[Transaction], None]) -> None:
+        old_state = tx.state
+        change(tx)
+        if old_state == tx.state:
+            return
+        for listener in self._listeners + self._tx_listeners.get(tx.transaction_id, []):
+            listener(tx, old_state, tx.state)
+
+    def block_added(self, block: Block) -> None:
+        for tx in block.transactions:
+            self._transition(tx, consensus.first_confirm)
+        self._buckets.append((block.index, list(block.transactions)))
+
+        while self._buckets and self._buckets[0][0] <= block.index - self.depth:
+            _, txs = self._buckets.popleft()
+            for tx in txs:
+                self._transition(tx, consensus.fully_confirm)
+
+    def block_removed(self, block: Block, reopen: bool = False) -> None:
+        """
+        Unwind the tip block. Its transactions are canceled, or returned to
+        pending when reopen is set (a reorg that may include them again).
+        """
+        if self._buckets and self._buckets[-1][0] == block.index:
+            self._buckets.pop()
+        change = consensus.reopen if reopen else consensus.cancel
+        for tx in block.transactions:
+            self._transition(tx, change)
+
+    def cancel(self, tx: Transaction) -> None:
+        """Cancel a transaction that was dismissed outside of a block removal"""
+        self._transition(tx, consensus.cancel)
+
+    def track(self, block: Block) -> None:
+        """Queue an already first-confirmed block without changing states (used on restart)"""
+        self._buckets.append((block.index, list(block.transactions)))
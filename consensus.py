@@ -1,6 +1,6 @@
-import hashlib
 from constant import TransactionState
 from transaction import Transaction
+from signatures import scheme_for_key
 
 """
 Helper methods for signature and transactions    
@@ -23,13 +23,30 @@ def cancel(transaction: Transaction) -> None:
     transaction.state = TransactionState.CANCELED
     return
 
-def create_signature(txn_msg: str, private_key: str) -> str:
-    """Create a signature for a transaction"""
-    message_hash = hashlib.sha256(txn_msg.encode()).hexdigest()
-    signature = private_key.sign(message_hash)
-    return signature
+def reopen(transaction: Transaction) -> None:
+    """(A node, after rolling back the block of the txn during a reorg)
+    puts the transaction back to pending so it can be mined again"""
+    transaction.state = TransactionState.SIGNED
+    return
+
+def receive(transaction: Transaction) -> None:
+    """(A node) takes in a transaction relayed by another node; its lifecycle
+    state is local to each node, so it starts over as signed (or started, for
+    unsigned system rewards)"""
+    if transaction.signature:
+        transaction.state = TransactionState.SIGNED
+    else:
+        transaction.state = TransactionState.STARTED
+    return
+
+def create_signature(txn_msg: str, private_key) -> str:
+    """Create a signature (as hex) for a transaction message with the key's own scheme"""
+    return scheme_for_key(private_key).sign(private_key, txn_msg.encode()).hex()
 
-def verify_signature(signature: str, txn_msg: str, public_key: str) -> bool:
-    """Verify the signature of a transaction"""
-    message_hash = hashlib.sha256(txn_msg.encode()).hexdigest()
-    return public_key.verify(signature, message_hash)
\ No newline at end of file
+def verify_signature(signature: str, txn_msg: str, public_key) -> bool:
+    """Verify the hex signature of a transaction message"""
+    try:
+        return scheme_for_key(public_key).verify(public_key, bytes.fromhex(signature), txn_msg.encode())
+    except ValueError:
+        # malformed hex or an unsupported key type
+        return False
\ No newline at end of file
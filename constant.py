@@ -1,8 +1,13 @@
 # create an enum for the state of a transaction
 from enum import Enum
 
+# initial proof-of-work target: hashes starting with this many zero hex digits
 DIFFICULTY = 2
 SYSTEM="SYSTEM_ADDRESS"
+# sender of the fee reward a miner may put first in its block, for at most the block's fees
+REWARD = "REWARD_ADDRESS"
+# shared by every node so all chains start from the same genesis block
+GENESIS_TIMESTAMP = 1735689600.0
 
 class TransactionState(Enum):
     STARTED = 'started'
@@ -10,4 +15,51 @@ class TransactionState(Enum):
     FIRST_CONFIRMED = 'first_confirmed'
     FULLY_CONFIRMED = 'fully_confirmed'
     CANCELED = 'canceled'
-    FAILED = 'failed'
\ No newline at end of file
+    FAILED = 'failed'
+
+# mempool limits; the oldest transactions are evicted first when exceeded
+MEMPOOL_MAX_SIZE = 10000
+MEMPOOL_MAX_BYTES = 32 * 1024 * 1024
+
+# verified-signature LRU cache entries and verifier worker processes
+SIGNATURE_CACHE_SIZE = 100000
+# scheme of newly generated user keys ("ed25519" or "rsa", see signatures.py)
+DEFAULT_SIGNATURE_SCHEME = "rsa"
+SIGNATURE_WORKERS = 1
+
+# on-disk block store: segment file size, appends per fsync, blocks per state checkpoint
+STORE_SEGMENT_SIZE = 64 * 1024 * 1024
+STORE_SYNC_EVERY = 16
+STORE_CHECKPOINT_INTERVAL = 1000
+
+# a transaction is fully confirmed once this many blocks are built on top of its block
+CONFIRMATION_DEPTH = 5
+
+# side branches forking deeper than this below the tip are not kept
+MAX_REORG_DEPTH = 100
+
+# p2p gossip: remembered message ids, messages per frame, queued messages per peer
+SEEN_CAPACITY = 100000
+GOSSIP_BATCH_SIZE = 64
+PEER_QUEUE_SIZE = 1024
+
+# full-chain validation: signatures collected before each verification batch
+VALIDATION_BATCH_SIZE = 1024
+
+# block template limits: serialized transaction bytes and transaction count per block
+BLOCK_MAX_BYTES = 1024 * 1024
+BLOCK_MAX_TRANSACTIONS = 5000
+
+# pruning: blocks kept with their transactions below the tip, and blocks between prunes
+PRUNE_DEPTH = 1000
+PRUNE_INTERVAL = 100
+
+# difficulty retargeting (see difficulty.py): blocks between retargets, seconds
+# aimed for between blocks, and the largest change of the target per retarget
+RETARGET_INTERVAL = 100
+BLOCK_INTERVAL = 10.0
+MAX_RETARGET_FACTOR = 4
+# block timestamps: later than the median of this many previous blocks, and
+# at most this many seconds ahead of the validating node's clock
+MEDIAN_TIME_SPAN = 11
+MAX_FUTURE_BLOCK_TIME = 60.0
@@ -0,0 +1,107 @@
+"""
+Proof-of-work targets and difficulty retargeting.
+
+A block's hash, read as a 256-bit big-endian integer, must not exceed the
+block's target, so every halving of the target doubles the expected work
+(the former rule, `zeros` leading hex zeros, is target_from_zeros(zeros)).
+
+Targets are not stored in blocks; every node derives a block's target from
+its ancestors. Blocks start at the initial target. Every `interval` blocks
+the target is scaled by how long the previous window of blocks actually
+took over how long it should have taken at `block_interval` seconds per
+block, by at most a factor of `max_adjustment` either way. Between retargets
+a block has its parent's target.
+
+Since retargeting reads the timestamps miners put in their blocks, those
+are bounded too: a block's timestamp must be later than the median of the
+previous `median_time_span` blocks (the median time past) and at most
+`max_future_drift` seconds ahead of the validating node's clock. A miner can
+then stretch a window by little more than the drift rather than claim an
+arbitrarily slow window to loosen the target.
+"""
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+from constant import (BLOCK_INTERVAL, DIFFICULTY, MAX_FUTURE_BLOCK_TIME, MAX_RETARGET_FACTOR,
+                      MEDIAN_TIME_SPAN, RETARGET_INTERVAL)
+
+MAX_TARGET = (1 << 256) - 1
+
+def target_from_zeros(zeros: int) -> int:
+    """The target met by exactly the hashes starting with `zeros` zero hex digits"""
+    return (1 << (256 - 4 * zeros)) - 1
+
+def target_bytes(target: int) -> bytes:
+    """The target as 32 big-endian bytes, ordered like a SHA-256 digest"""
+    return min(target, MAX_TARGET).to_bytes(32, 'big')
+
+def meets_target(block_hash: str, target: int) -> bool:
+    return int(block_hash, 16) <= target
+
+def block_work(target: int) -> int:
+    """Expected number of hash attempts needed to meet the target"""
+    return (MAX_TARGET + 1) // (target + 1)
+
+def retarget(target: int, actual: float, expected: float,
+             max_adjustment: int = MAX_RETARGET_FACTOR) -> int:
+    """Scale target by actual / expected seconds, limited to max_adjustment either way"""
+    # whole milliseconds keep the scaling in exact integer arithmetic
+    expected_ms = max(round(expected * 1000), 1)
+    actual_ms = min(max(round(actual * 1000), expected_ms // max_adjustment),
+                    expected_ms * max_adjustment)
+    return min(max(target * actual_ms // expected_ms, 1), MAX_TARGET)
+
+@dataclass(frozen=True)
+class Retargeting:
+    """
+    Consensus rules for block targets and timestamps. Nodes following the same chain must
+    use the same rules. An interval of 0 keeps the initial target forever,
+    e.g. for synthetic benchmark chains.
+    """
+    initial_target: int = target_from_zeros(DIFFICULTY)
+    interval: int = RETARGET_INTERVAL
+    block_interval: float = BLOCK_INTERVAL
+    max_adjustment: int = MAX_RETARGET_FACTOR
+    median_time_span: int = MEDIAN_TIME_SPAN
+    max_future_drift: float = MAX_FUTURE_BLOCK_TIME
+
+    def next_target(self, parent_target: int, height: int,
+                    timestamp_at: Callable[[int], float]) -> int:
+        """
+        Target of the block at `height` whose parent has parent_target;
+        timestamp_at(h) is the timestamp of its ancestor at height h.
+        """
+        if not self.interval or height % self.interval or height == 0:
+            return parent_target
+        # the genesis timestamp is fixed, not mined, so it never starts a window
+        first, last = max(height - self.interval, 1), height - 1
+        if last <= first:
+            return parent_target
+        return retarget(parent_target, timestamp_at(last) - timestamp_at(first),
+                        (last - first) * self.block_interval, self.max_adjustment)
+
+    def target_at(self, height: int, timestamp_at: Callable[[int], float],
+                  known_height: int = 0, known_target: Optional[int] = None) -> int:
+        """
+        Target of the block at `height`, replayed from the initial target,
+        or from known_target, the target of the block at known_height
+        (at most `height`) on the same chain
+        """
+        target = self.initial_target if known_target is None else known_target
+        if self.interval:
+            first = (known_height // self.interval + 1) * self.interval
+            for boundary in range(first, height + 1, self.interval):
+                target = self.next_target(target, boundary, timestamp_at)
+        return target
+
+    def median_time_past(self, height: int, timestamp_at: Callable[[int], float]) -> float:
+        """Median timestamp of the (up to) median_time_span blocks below `height`"""
+        timestamps = sorted(timestamp_at(h) for h in range(max(height - self.median_time_span, 0), height))
+        return timestamps[len(timestamps) // 2]
+
+    def timestamp_valid(self, timestamp: float, height: int, timestamp_at: Callable[[int], float],
+                        now: Optional[float] = None) -> bool:
+        """Whether a block at `height` may carry `timestamp` (see the module docstring)"""
+        if now is None:
+            now = time.time()
+        return self.median_time_past(height, timestamp_at) < timestamp <= now + self.max_future_drift
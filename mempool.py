@@ -0,0 +1,153 @@
+import json
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+from transaction import Transaction
+from constant import MEMPOOL_MAX_SIZE, MEMPOOL_MAX_BYTES
+import metrics
+
+class Mempool:
+    """
+    Pending transactions indexed by transaction_id and by sender.
+
+    Transactions are kept in arrival order. Per-sender pending totals are
+    maintained on insert/remove so balance checks never scan the pool.
+    Listeners (see add_listener) are told about every admitted and removed
+    transaction, e.g. to keep a block template up to date.
+    """
+
+    def __init__(self, max_size: int = MEMPOOL_MAX_SIZE, max_bytes: int = MEMPOOL_MAX_BYTES) -> None:
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self._by_id: 'OrderedDict[str, Transaction]' = OrderedDict()
+        self._by_sender: Dict[str, Dict[str, Transaction]] = {}
+        self._pending_spent: Dict[str, int] = {}
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._listeners: List = []
+
+    def add_listener(self, listener) -> None:
+        """Register an object with transaction_added(tx) and transaction_removed(tx) methods"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener) -> None:
+        self._listeners.remove(listener)
+
+    @staticmethod
+    def transaction_size(tx: Transaction) -> int:
+        """Approximate footprint of a transaction in bytes (its serialized size)"""
+        return len(json.dumps(tx.to_dict()))
+
+    def add(self, tx: Transaction) -> bool:
+        """
+        Add a transaction to the pool.
+        Returns:
+            False if it is a duplicate or cannot fit, True otherwise
+        """
+        if tx.transaction_id in self._by_id:
+            return False
+        size = self.transaction_size(tx)
+        if size > self.max_bytes:
+            return False
+
+        self._by_id[tx.transaction_id] = tx
+        self._by_sender.setdefault(tx.sender, {})[tx.transaction_id] = tx
+        self._pending_spent[tx.sender] = self._pending_spent.get(tx.sender, 0) + tx.cost
+        self._sizes[tx.transaction_id] = size
+        self._bytes += size
+
+        # evict the oldest transactions until we are back under the caps
+        while len(self._by_id) > self.max_size or self._bytes > self.max_bytes:
+            self.remove(next(iter(self._by_id)))
+            metrics.MEMPOOL_EVICTED.inc()
+        admitted = tx.transaction_id in self._by_id
+        if admitted:
+            metrics.MEMPOOL_ADDED.inc()
+            for listener in self._listeners:
+                listener.transaction_added(tx)
+        self._update_gauges()
+        return admitted
+
+    # list-style alias, kept so callers can keep treating the pool as a list
+    append = add
+
+    def remove(self, transaction_id: str) -> Optional[Transaction]:
+        """Remove a transaction by id, returning it if it was pending"""
+        tx = self._by_id.pop(transaction_id, None)
+        if tx is None:
+            return None
+        sender_txs = self._by_sender[tx.sender]
+        del sender_txs[transaction_id]
+        if not sender_txs:
+            del self._by_sender[tx.sender]
+            del self._pending_spent[tx.sender]
+        else:
+            self._pending_spent[tx.sender] -= tx.cost
+        self._bytes -= self._sizes.pop(transaction_id)
+        self._update_gauges()
+        for listener in self._listeners:
+            listener.transaction_removed(tx)
+        return tx
+
+    def remove_many(self, transaction_ids: Iterable[str]) -> None:
+        """Remove every listed transaction that is still pending"""
+        for transaction_id in transaction_ids:
+            self.remove(transaction_id)
+
+    def _update_gauges(self) -> None:
+        if metrics.is_enabled():
+            metrics.MEMPOOL_TRANSACTIONS.set(len(self._by_id))
+            metrics.MEMPOOL_BYTES.set(self._bytes)
+
+    def get(self, transaction_id: str) -> Optional[Transaction]:
+        """Look up a pending transaction by id"""
+        return self._by_id.get(transaction_id)
+
+    def size_of(self, transaction_id: str) -> int:
+        """Size in bytes of a pending transaction, as counted against max_bytes"""
+        return self._sizes[transaction_id]
+
+    def senders(self) -> List[str]:
+        """Every address with at least one pending transaction"""
+        return list(self._by_sender)
+
+    def get_by_sender(self, sender: str) -> List[Transaction]:
+        """All pending transactions of a sender, in arrival order"""
+        return list(self._by_sender.get(sender, {}).values())
+
+    def count_by_sender(self, sender: str) -> int:
+        """Number of pending transactions of a sender"""
+        return len(self._by_sender.get(sender, ()))
+
+    def pending_spent(self, sender: str) -> int:
+        """Total amount plus fees a sender has pending in the pool"""
+        return self._pending_spent.get(sender, 0)
+
+    def select(self, limit: Optional[int] = None) -> List[Transaction]:
+        """Return up to `limit` transactions in arrival order (all if None)"""
+        return list(islice(self._by_id.values(), limit))
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def clear(self) -> None:
+        removed = list(self._by_id.values())
+        self._by_id.clear()
+        self._by_sender.clear()
+        self._pending_spent.clear()
+        self._sizes.clear()
+        self._bytes = 0
+        self._update_gauges()
+        for tx in removed:
+            for listener in self._listeners:
+                listener.transaction_removed(tx)
+
+    def __contains__(self, tx: object) -> bool:
+        return isinstance(tx, Transaction) and tx.transaction_id in self._by_id
+
+    def __iter__(self) -> Iterator[Transaction]:
+        return iter(list(self._by_id.values()))
+
+    def __len__(self) -> int:
+        return len(self._by_id)
@@ -0,0 +1,94 @@
+"""
+Merkle commitment to a block's transactions and inclusion proofs.
+
+Leaves and inner nodes are hashed with distinct prefixes (0x00 / 0x01) so an
+inner node can never be passed off as a leaf. A node without a sibling on
+its level is carried up unchanged rather than paired with itself, so two
+different transaction lists never share a root.
+"""
+import hashlib
+import struct
+from datetime import datetime, timedelta
+from typing import List, Sequence, Tuple
+from difficulty import meets_target
+
+# (sibling hash as hex, True if the sibling is on the left)
+ProofStep = Tuple[str, bool]
+
+EMPTY_ROOT = hashlib.sha256(b'').hexdigest()
+
+_EPOCH = datetime(1970, 1, 1)
+# transaction_id, timestamp (us since 1970-01-01), amount, fee
+_LEAF_FIXED = struct.Struct('<32sqqq')
+_U16 = struct.Struct('<H')
+
+def _pack_bytes(raw: bytes) -> bytes:
+    return _U16.pack(len(raw)) + raw
+
+def transaction_leaf(tx) -> bytes:
+    """
+    Leaf hash of a transaction over every field but its (node-local) state,
+    laid out like codec.py, so the block hash commits to amounts, fees and
+    receivers even of unsigned transactions
+    """
+    timestamp = (tx.timestamp - _EPOCH) // timedelta(microseconds=1)
+    signature = bytes.fromhex(tx.signature) if tx.signature else b''
+    return hashlib.sha256(b''.join((
+        b'\x00',
+        _LEAF_FIXED.pack(bytes.fromhex(tx.transaction_id), timestamp, tx.amount, tx.fee),
+        _pack_bytes(tx.sender.encode()),
+        _pack_bytes(tx.receiver.encode()),
+        _pack_bytes(signature),
+    ))).digest()
+
+def _parent(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b'\x01' + left + right).digest()
+
+def _next_level(level: List[bytes]) -> List[bytes]:
+    paired = [_parent(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2:
+        paired.append(level[-1])
+    return paired
+
+def merkle_root(leaves: Sequence[bytes]) -> str:
+    """Root of the tree over the given leaf hashes, as hex"""
+    if not leaves:
+        return EMPTY_ROOT
+    level = list(leaves)
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0].hex()
+
+def merkle_proof(leaves: Sequence[bytes], index: int) -> List[ProofStep]:
+    """The sibling hashes on the path from leaf `index` to the root"""
+    if not 0 <= index < len(leaves):
+        raise IndexError(index)
+    proof: List[ProofStep] = []
+    level = list(leaves)
+    while len(level) > 1:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append((level[sibling].hex(), sibling < index))
+        level = _next_level(level)
+        index //= 2
+    return proof
+
+def verify_proof(leaf: bytes, proof: Sequence[ProofStep], root: str) -> bool:
+    """Check that `leaf` is committed to by `root`"""
+    node = leaf
+    for sibling_hex, sibling_is_left in proof:
+        sibling = bytes.fromhex(sibling_hex)
+        node = _parent(sibling, node) if sibling_is_left else _parent(node, sibling)
+    return node.hex() == root
+
+def verify_inclusion(tx, proof: Sequence[ProofStep], header, target: int) -> bool:
+    """
+    SPV check: the header's hash is genuine, meets its proof-of-work target
+    and commits to the transaction. Only the header (not the block body) is
+    needed. The target comes from the caller's header chain (see
+    difficulty.Retargeting), and the caller must also have established that
+    the header is on the best chain: a valid header alone proves nothing.
+    """
+    if header.compute_hash() != header.hash or not meets_target(header.hash, target):
+        return False
+    return verify_proof(transaction_leaf(tx), proof, header.merkle_root)
@@ -0,0 +1,251 @@
+"""
+Process-wide counters, gauges and latency histograms.
+
+Metrics are disabled by default. Every update first checks a single module
+flag and returns, so instrumented hot paths pay about one function call when
+nothing is collected; timers only read the clock when enabled:
+
+    start = metrics.start_timer()
+    ...
+    metrics.ADD_BLOCK_SECONDS.observe_since(start)
+
+Enable collection with enable(), read it with snapshot() or render() (the
+Prometheus text format), or serve it with start_http_server().
+"""
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+from typing import Dict, List, Optional, Sequence
+
+_enabled = False
+
+# seconds; spans a single signature check up to mining a block
+DEFAULT_BUCKETS = (
+    0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0
+)
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+def is_enabled() -> bool:
+    return _enabled
+
+def start_timer() -> float:
+    """Start time for Histogram.observe_since (0.0 when disabled, without reading the clock)"""
+    return perf_counter() if _enabled else 0.0
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str) -> None:
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    """A monotonically increasing total"""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str) -> None:
+        super().__init__(name, documentation)
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        if not _enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+    def reset(self) -> None:
+        self.value = 0
+
+    def snapshot(self) -> int:
+        return self.value
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name} {self.value}"]
+
+class Gauge(_Metric):
+    """A value that goes up and down, e.g. the mempool depth"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str) -> None:
+        super().__init__(name, documentation)
+        self.value = 0
+
+    def set(self, value: float) -> None:
+        if not _enabled:
+            return
+        self.value = value
+
+    def reset(self) -> None:
+        self.value = 0
+
+    def snapshot(self) -> float:
+        return self.value
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name} {self.value}"]
+
+class Histogram(_Metric):
+    """Distribution of observations over fixed upper bounds (plus count and sum)"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str,
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+        # one slot per bound plus the +Inf overflow slot, not cumulative
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        if not _enabled:
+            return
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[slot] += 1
+            self.count += 1
+            self.sum += value
+
+    def observe_since(self, start: float) -> None:
+        """Record the seconds elapsed since start_timer()"""
+        if not _enabled:
+            return
+        self.observe(perf_counter() - start)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self.count = 0
+            self.sum = 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts, count, total = list(self._counts), self.count, self.sum
+        cumulative, buckets = 0, {}
+        for bound, slot_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += slot_count
+            buckets[bound] = cumulative
+        return {"count": count, "sum": total, "buckets": buckets}
+
+    def _samples(self) -> List[str]:
+        data = self.snapshot()
+        lines = [
+            f'{self.name}_bucket{{le="{"+Inf" if bound == float("inf") else repr(bound)}"}} {cumulative}'
+            for bound, cumulative in data["buckets"].items()
+        ]
+        lines.append(f"{self.name}_sum {data['sum']}")
+        lines.append(f"{self.name}_count {data['count']}")
+        return lines
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def snapshot(self) -> dict:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+    def reset(self) -> None:
+        for metric in self._metrics.values():
+            metric.reset()
+
+REGISTRY = Registry()
+
+def snapshot() -> dict:
+    """Current value of every metric; histograms as count, sum and cumulative buckets"""
+    return REGISTRY.snapshot()
+
+def render() -> str:
+    """Every metric in the Prometheus text exposition format"""
+    return REGISTRY.render()
+
+def reset() -> None:
+    REGISTRY.reset()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # scrapes are frequent; keep them out of stderr
+        pass
+
+def start_http_server(port: int = 9100, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve GET /metrics from a daemon thread. Binds to localhost by default;
+    port 0 picks a free port (see server.server_address). Stop with
+    server.shutdown().
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    return server
+
+# Metrics of the node itself
+
+MINE_HASHES = Counter("mine_hashes_total", "Hash attempts made while mining blocks")
+MINE_SECONDS = Histogram("mine_seconds", "Time to mine a block")
+MINE_HASHRATE = Gauge("mine_hashrate", "Hash attempts per second of the last mined block")
+
+SIGNATURE_VERIFY_SECONDS = Histogram(
+    "signature_verify_seconds", "Latency of verify_transaction_signature, cache hits included"
+)
+SIGNATURE_BATCH_SECONDS = Histogram(
+    "signature_batch_seconds", "Time to verify the signatures of a block in one batch"
+)
+SIGNATURE_FAILURES = Counter("signature_failures_total", "Transactions whose signature did not verify")
+
+VALIDATE_BLOCK_SECONDS = Histogram("validate_block_seconds", "Time spent in validate_block")
+BLOCKS_REJECTED = Counter("blocks_rejected_total", "Blocks that failed validation")
+
+ADD_BLOCK_SECONDS = Histogram("add_block_seconds", "Total time spent in add_block")
+ADD_BLOCK_VALIDATE_SECONDS = Histogram(
+    "add_block_validate_seconds", "Part of add_block spent validating the block or header"
+)
+ADD_BLOCK_CONNECT_SECONDS = Histogram(
+    "add_block_connect_seconds", "Part of add_block spent applying the block to the chain state"
+)
+ADD_BLOCK_REORG_SECONDS = Histogram("add_block_reorg_seconds", "Time spent reorganizing onto a heavier branch")
+BLOCKS_ADDED = Counter("blocks_added_total", "Blocks accepted on the main chain or a side branch")
+CHAIN_HEIGHT = Gauge("chain_height", "Height of the main chain tip")
+
+MEMPOOL_TRANSACTIONS = Gauge("mempool_transactions", "Transactions pending in the mempool")
+MEMPOOL_BYTES = Gauge("mempool_bytes", "Serialized size of the pending transactions")
+MEMPOOL_ADDED = Counter("mempool_added_total", "Transactions admitted to the mempool")
+MEMPOOL_EVICTED = Counter("mempool_evicted_total", "Transactions evicted because the mempool was full")
@@ -0,0 +1,161 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import List, Optional
+from block import Block
+from difficulty import target_bytes, target_from_zeros
+import metrics
+
+# set in every worker process by _init_worker; shared with the parent. The
+# highest run generation that is over (found or cancelled).
+_stopped_run = None
+
+def _init_worker(stopped_run) -> None:
+    global _stopped_run
+    _stopped_run = stopped_run
+
+def _stop_run(stopped_run, generation: int) -> None:
+    with stopped_run.get_lock():
+        if stopped_run.value < generation:
+            stopped_run.value = generation
+
+def _mine_partition(prefix: bytes, limit: bytes, first_nonce: int, stride: int,
+                    check_interval: int, generation: int) -> tuple:
+    """
+    Try nonces first_nonce, first_nonce + stride, ... until one's digest is
+    at most `limit` (the target's bytes) or run `generation` is stopped.
+    Returns:
+        (nonce or None, hash or None, attempts, elapsed seconds)
+    """
+    midstate = hashlib.sha256(prefix)
+    nonce = first_nonce
+    attempts = 0
+    start = time.perf_counter()
+    while True:
+        for _ in range(check_interval):
+            attempt = midstate.copy()
+            attempt.update(str(nonce).encode())
+            attempts += 1
+            if attempt.digest() <= limit:
+                _stop_run(_stopped_run, generation)
+                return nonce, attempt.hexdigest(), attempts, time.perf_counter() - start
+            nonce += stride
+        if _stopped_run.value >= generation:
+            return None, None, attempts, time.perf_counter() - start
+
+@dataclass
+class WorkerStats:
+    worker: int
+    attempts: int
+    elapsed: float
+
+    @property
+    def hashrate(self) -> float:
+        """Hashes per second of this worker"""
+        return self.attempts / self.elapsed if self.elapsed else 0.0
+
+@dataclass
+class MiningResult:
+    found: bool
+    nonce: Optional[int] = None
+    hash: Optional[str] = None
+    elapsed: float = 0.0
+    workers: List[WorkerStats] = field(default_factory=list)
+
+    @property
+    def attempts(self) -> int:
+        return sum(w.attempts for w in self.workers)
+
+    @property
+    def hashrate(self) -> float:
+        """Combined hashes per second over the wall-clock mining time"""
+        return self.attempts / self.elapsed if self.elapsed else 0.0
+
+class ParallelMiner:
+    """
+    Mines blocks on a pool of worker processes.
+
+    The nonce space is interleaved across workers (worker i tries
+    nonce + 1 + i, nonce + 1 + i + n, ...). All workers stop as soon as one of
+    them finds a valid hash, or when cancel() is called, e.g. because a
+    competing block arrived. Each mine() call takes a run generation as soon
+    as it is called, and cancel() stops every run that has one, so a cancel
+    that comes before a run has started its workers is not lost; a run
+    called after cancel() is not affected by it.
+    """
+
+    def __init__(self, workers: Optional[int] = None, check_interval: int = 4096) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.check_interval = check_interval
+        self._stopped_run = multiprocessing.Value('q', 0)
+        self._generation = 0
+        self._generation_lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self._stopped_run,)
+            )
+        return self._pool
+
+    def mine(self, block: Block, difficulty: Optional[int] = None,
+             target: Optional[int] = None) -> MiningResult:
+        """
+        Mine the block in parallel until its hash meets the target, given
+        directly or as `difficulty` leading hex zeros. On success the block's
+        nonce and hash are updated in place; a cancelled run leaves the block
+        untouched.
+        """
+        with self._generation_lock:
+            self._generation += 1
+            generation = self._generation
+        if target is None:
+            target = target_from_zeros(difficulty)
+        limit = target_bytes(target)
+        with self._lock:
+            if self._stopped_run.value >= generation:
+                return MiningResult(found=False)
+            pool = self._get_pool()
+            prefix = block.header_prefix()
+            start = time.perf_counter()
+            futures = {
+                pool.submit(_mine_partition, prefix, limit, block.nonce + 1 + i,
+                            self.workers, self.check_interval, generation): i
+                for i in range(self.workers)
+            }
+            result = MiningResult(found=False)
+            for future in as_completed(futures):
+                nonce, block_hash, attempts, elapsed = future.result()
+                result.workers.append(WorkerStats(futures[future], attempts, elapsed))
+                if nonce is not None and not result.found:
+                    result.found, result.nonce, result.hash = True, nonce, block_hash
+            result.elapsed = time.perf_counter() - start
+            result.workers.sort(key=lambda w: w.worker)
+        metrics.MINE_HASHES.inc(result.attempts)
+        if result.found:
+            metrics.MINE_SECONDS.observe(result.elapsed)
+            metrics.MINE_HASHRATE.set(result.hashrate)
+
+        if result.found:
+            block.nonce = result.nonce
+            block.hash = result.hash
+        return result
+
+    def cancel(self) -> None:
+        """Stop every mining run called so far (safe to call from another thread)"""
+        with self._generation_lock:
+            _stop_run(self._stopped_run, self._generation)
+
+    def shutdown(self) -> None:
+        self.cancel()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
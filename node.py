@@ -0,0 +1,253 @@
+import asyncio
+import struct
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+from block import Block
+from blockchain import Blockchain
+from codec import decode_block, decode_transaction, encode_block, encode_transaction
+from constant import GOSSIP_BATCH_SIZE, PEER_QUEUE_SIZE, SEEN_CAPACITY
+from transaction import Transaction
+import consensus
+
+MSG_TRANSACTION = 1
+MSG_BLOCK = 2
+
+# frame: u32 length, then items of u8 type + u32 length + payload
+_FRAME_HEADER = struct.Struct('<I')
+_ITEM_HEADER = struct.Struct('<BI')
+MAX_FRAME_SIZE = 32 * 1024 * 1024
+
+class SeenSet:
+    """Bounded set of recently seen message ids (oldest forgotten first)"""
+
+    def __init__(self, capacity: int = SEEN_CAPACITY) -> None:
+        self.capacity = capacity
+        self._ids: 'OrderedDict[str, None]' = OrderedDict()
+
+    def add(self, message_id: str) -> bool:
+        """Remember an id; False if it was already known"""
+        if message_id in self._ids:
+            return False
+        self._ids[message_id] = None
+        if len(self._ids) > self.capacity:
+            self._ids.popitem(last=False)
+        return True
+
+    def __contains__(self, message_id: str) -> bool:
+        return message_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+class Peer:
+    """
+    One TCP connection. Outgoing messages go through a bounded queue that a
+    writer task drains into batched frames. When the queue is full, the
+    message is dropped for this peer rather than waited on: a read loop that
+    blocked on a slow peer's queue could stall every peer relaying to it,
+    and peers that fill each other's queues would deadlock.
+    """
+
+    def __init__(self, node: 'Node', reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter) -> None:
+        self.node = node
+        self.reader = reader
+        self.writer = writer
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=node.queue_size)
+        self.address = writer.get_extra_info('peername')
+        self._writer_task = asyncio.create_task(self._write_loop())
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    def send(self, message_type: int, payload: bytes) -> bool:
+        """Queue a message for this peer; False (and counted) if its queue is full"""
+        try:
+            self.queue.put_nowait((message_type, payload))
+        except asyncio.QueueFull:
+            self.node.messages_dropped += 1
+            return False
+        return True
+
+    async def _write_loop(self) -> None:
+        try:
+            while True:
+                items = [await self.queue.get()]
+                while len(items) < self.node.batch_size and not self.queue.empty():
+                    items.append(self.queue.get_nowait())
+                body = b''.join(
+                    _ITEM_HEADER.pack(message_type, len(payload)) + payload
+                    for message_type, payload in items
+                )
+                self.writer.write(_FRAME_HEADER.pack(len(body)) + body)
+                self.node.frames_sent += 1
+                self.node.messages_sent += len(items)
+                await self.writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                (length,) = _FRAME_HEADER.unpack(await self.reader.readexactly(_FRAME_HEADER.size))
+                if length > MAX_FRAME_SIZE:
+                    break
+                body = memoryview(await self.reader.readexactly(length))
+                offset = 0
+                while offset < length:
+                    message_type, size = _ITEM_HEADER.unpack_from(body, offset)
+                    offset += _ITEM_HEADER.size
+                    await self.node._handle(self, message_type, body[offset:offset + size])
+                    offset += size
+        except (struct.error, IndexError, ValueError):
+            # a frame or message that does not decode: the peer is broken or hostile
+            self.node.malformed_frames += 1
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            # the remote side went away (or we are closing): stop writing too
+            self.node._drop_peer(self)
+            self._writer_task.cancel()
+            self.writer.close()
+
+    async def close(self) -> None:
+        self._reader_task.cancel()
+        self._writer_task.cancel()
+        await asyncio.gather(self._reader_task, self._writer_task, return_exceptions=True)
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+class Node:
+    """
+    asyncio gossip node over TCP.
+
+    Transactions and blocks are validated against the node's Blockchain and,
+    if new and accepted, relayed to every other peer. Duplicates are dropped
+    using a bounded seen-set, so each message crosses each link at most once
+    per direction. Only accepted messages are marked as seen: ids come from
+    the wire, so a bogus message carrying a real id, or a block that came
+    before its parent, must not shadow the real one arriving later.
+    Messages for a peer whose queue is full are dropped (see Peer), so a
+    slow peer may miss gossip and has to catch up by sync.
+    """
+
+    def __init__(self, blockchain: Optional[Blockchain] = None, host: str = '127.0.0.1',
+                 port: int = 0, batch_size: int = GOSSIP_BATCH_SIZE,
+                 queue_size: int = PEER_QUEUE_SIZE, seen_capacity: int = SEEN_CAPACITY) -> None:
+        self.blockchain = blockchain if blockchain is not None else Blockchain()
+        self.host = host
+        self.port = port
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.seen = SeenSet(seen_capacity)
+        self.peers: List[Peer] = []
+        self._closed_peers: List[Peer] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # callback(message_type, message) for every newly accepted message
+        self.listeners: List[Callable[[int, object], None]] = []
+        self.messages_sent = 0
+        self.frames_sent = 0
+        self.messages_received = 0
+        self.duplicates_dropped = 0
+        self.messages_dropped = 0
+        # frames that failed to decode; their peer is disconnected
+        self.malformed_frames = 0
+
+    async def start(self) -> Tuple[str, int]:
+        """Start listening; returns the bound (host, port)"""
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._on_connection, self.host, self.port)
+        self.host, self.port = self._server.sockets[0].getsockname()[:2]
+        return self.host, self.port
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for peer in list(self.peers):
+            await peer.close()
+        self.peers.clear()
+        for peer in list(self._closed_peers):
+            await peer.close()
+
+    async def connect(self, host: str, port: int) -> Peer:
+        reader, writer = await asyncio.open_connection(host, port)
+        peer = Peer(self, reader, writer)
+        self.peers.append(peer)
+        return peer
+
+    async def _on_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.peers.append(Peer(self, reader, writer))
+
+    def _drop_peer(self, peer: Peer) -> None:
+        if peer in self.peers:
+            self.peers.remove(peer)
+            # keep it around so stop() can wait for its tasks
+            self._closed_peers.append(peer)
+
+    def _relay(self, message_type: int, payload: bytes, origin: Optional[Peer] = None) -> None:
+        for peer in list(self.peers):
+            if peer is not origin:
+                peer.send(message_type, payload)
+
+    def _notify(self, message_type: int, message: object) -> None:
+        for listener in self.listeners:
+            listener(message_type, message)
+
+    # -- local submission ----------------------------------------------------
+
+    async def broadcast_transaction(self, tx: Transaction) -> bool:
+        """Admit a local transaction to the mempool and gossip it"""
+        if tx.transaction_id in self.seen or not self._accept_transaction(tx):
+            return False
+        self.seen.add(tx.transaction_id)
+        self._relay(MSG_TRANSACTION, encode_transaction(tx))
+        return True
+
+    async def broadcast_block(self, block: Block) -> None:
+        """Gossip a block this node has already added to its chain"""
+        if self.seen.add(block.hash):
+            self._relay(MSG_BLOCK, encode_block(block))
+
+    def attach(self, user) -> None:
+        """Route the user's broadcast_transaction calls through this node"""
+        user.node = self
+
+    def submit_transaction(self, tx: Transaction):
+        """Thread-safe entry point used by User.broadcast_transaction"""
+        return asyncio.run_coroutine_threadsafe(self.broadcast_transaction(tx), self._loop)
+
+    # -- incoming messages ---------------------------------------------------
+
+    def _accept_transaction(self, tx: Transaction) -> bool:
+        self.blockchain.prove_transaction(tx)
+        if tx not in self.blockchain.pending_transactions:
+            return False
+        self._notify(MSG_TRANSACTION, tx)
+        return True
+
+    async def _handle(self, peer: Peer, message_type: int, payload: memoryview) -> None:
+        self.messages_received += 1
+        if message_type == MSG_TRANSACTION:
+            tx, _ = decode_transaction(payload)
+            if tx.transaction_id in self.seen:
+                self.duplicates_dropped += 1
+                return
+            consensus.receive(tx)
+            # validate_transaction checks the id against the fields
+            if self._accept_transaction(tx):
+                self.seen.add(tx.transaction_id)
+                self._relay(MSG_TRANSACTION, bytes(payload), origin=peer)
+        elif message_type == MSG_BLOCK:
+            block, _ = decode_block(payload)
+            if block.hash in self.seen:
+                self.duplicates_dropped += 1
+                return
+            for tx in block.transactions:
+                consensus.receive(tx)
+            # add_block recomputes the hash
+            if self.blockchain.add_block(block):
+                self.seen.add(block.hash)
+                self._notify(MSG_BLOCK, block)
+                self._relay(MSG_BLOCK, bytes(payload), origin=peer)
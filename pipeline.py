@@ -0,0 +1,54 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Iterable, Tuple
+from block import Block
+from blockchain import Blockchain
+
+class BlockPipeline:
+    """
+    Adds a stream of incoming blocks to a chain, overlapping the checks of
+    the next blocks with committing the current one.
+
+    Blockchain.precheck_block (hash against contents, signatures in one
+    batch) does not depend on the chain, so up to `depth` blocks ahead of
+    the one being added are prechecked on a background thread. The calling
+    thread adds each block in order with add_block(prechecked=True), which
+    is left with linkage, the proof-of-work target, balances and the commit.
+
+    Hashing small inputs holds the GIL, so the stages overlap best when the
+    chain's SignatureVerifier has several workers: the precheck thread then
+    waits on the verifier's process pool while blocks are committed.
+    """
+
+    def __init__(self, blockchain: Blockchain, depth: int = 4) -> None:
+        self.blockchain = blockchain
+        self.depth = depth
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="precheck")
+
+    def add_blocks(self, blocks: Iterable[Block]) -> int:
+        """
+        Add the blocks in order, stopping at the first one that is rejected
+        Returns:
+            The number of blocks accepted
+        """
+        queue: Deque[Tuple[Block, Future]] = deque()
+        blocks = iter(blocks)
+        accepted = 0
+        try:
+            while True:
+                for block in blocks:
+                    queue.append((block, self._executor.submit(self.blockchain.precheck_block, block)))
+                    if len(queue) > self.depth:
+                        break
+                if not queue:
+                    return accepted
+                block, precheck = queue.popleft()
+                if not precheck.result() or not self.blockchain.add_block(block, prechecked=True):
+                    return accepted
+                accepted += 1
+        finally:
+            for _, precheck in queue:
+                precheck.cancel()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown()
@@ -0,0 +1,135 @@
+"""
+Signature schemes for transactions.
+
+A scheme generates key pairs, signs and verifies raw message bytes, and
+converts public keys to and from DER (SubjectPublicKeyInfo), which is how
+keys travel between processes and nodes. RSA-PSS (2048-bit, SHA-256) is the
+original scheme; Ed25519 generates keys and signs far faster and has 32-byte
+keys and 64-byte signatures. Keys of both kinds can coexist on one chain:
+the scheme of a key is recognized from its type.
+"""
+import hashlib
+from typing import Dict
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, padding, rsa
+
+class SignatureScheme:
+    """Interface of a signature scheme; see RSAScheme and Ed25519Scheme"""
+    name = ""
+
+    def generate_private_key(self):
+        raise NotImplementedError
+
+    def sign(self, private_key, message: bytes) -> bytes:
+        raise NotImplementedError
+
+    def verify(self, public_key, signature: bytes, message: bytes) -> bool:
+        raise NotImplementedError
+
+    def owns(self, key) -> bool:
+        """True if key (public or private) belongs to this scheme"""
+        raise NotImplementedError
+
+class RSAScheme(SignatureScheme):
+    name = "rsa"
+
+    def __init__(self, key_size: int = 2048) -> None:
+        self.key_size = key_size
+
+    @staticmethod
+    def _padding() -> padding.PSS:
+        return padding.PSS(
+            mgf=padding.MGF1(hashes.SHA256()),
+            salt_length=padding.PSS.MAX_LENGTH
+        )
+
+    def generate_private_key(self):
+        return rsa.generate_private_key(public_exponent=65537, key_size=self.key_size)
+
+    def sign(self, private_key, message: bytes) -> bytes:
+        return private_key.sign(message, self._padding(), hashes.SHA256())
+
+    def verify(self, public_key, signature: bytes, message: bytes) -> bool:
+        try:
+            public_key.verify(signature, message, self._padding(), hashes.SHA256())
+            return True
+        except InvalidSignature:
+            return False
+
+    def owns(self, key) -> bool:
+        return isinstance(key, (rsa.RSAPublicKey, rsa.RSAPrivateKey))
+
+class Ed25519Scheme(SignatureScheme):
+    name = "ed25519"
+
+    def generate_private_key(self):
+        return ed25519.Ed25519PrivateKey.generate()
+
+    def sign(self, private_key, message: bytes) -> bytes:
+        return private_key.sign(message)
+
+    def verify(self, public_key, signature: bytes, message: bytes) -> bool:
+        try:
+            public_key.verify(signature, message)
+            return True
+        except InvalidSignature:
+            return False
+
+    def owns(self, key) -> bool:
+        return isinstance(key, (ed25519.Ed25519PublicKey, ed25519.Ed25519PrivateKey))
+
+RSA = RSAScheme()
+ED25519 = Ed25519Scheme()
+
+SCHEMES: Dict[str, SignatureScheme] = {RSA.name: RSA, ED25519.name: ED25519}
+
+def get_scheme(name: str) -> SignatureScheme:
+    scheme = SCHEMES.get(name)
+    if scheme is None:
+        raise ValueError(f"Unknown signature scheme: {name}")
+    return scheme
+
+def scheme_for_key(key) -> SignatureScheme:
+    """The scheme a public or private key object belongs to"""
+    for scheme in SCHEMES.values():
+        if scheme.owns(key):
+            return scheme
+    raise ValueError(f"Unsupported key type: {type(key).__name__}")
+
+def public_key_pem(public_key) -> bytes:
+    return public_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+def public_key_der(public_key) -> bytes:
+    return public_key.public_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+def load_public_key(der: bytes):
+    return serialization.load_der_public_key(der)
+
+def private_key_pem(private_key) -> bytes:
+    """Unencrypted PKCS#8 PEM of a private key; only for throwaway keys, e.g. simulation users"""
+    return private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    )
+
+def load_private_key(pem: bytes, validate: bool = True):
+    """
+    Load a PEM private key. validate=False skips the RSA consistency checks,
+    which take longer than generating a key; only for keys we wrote ourselves.
+    """
+    return serialization.load_pem_private_key(pem, password=None,
+                                              unsafe_skip_rsa_key_validation=not validate)
+
+def address_from_public_key(public_key) -> str:
+    """Address of a key: RIPEMD-160 of SHA-256 of its PEM encoding, as 0x-prefixed hex"""
+    sha256_hash = hashlib.sha256(public_key_pem(public_key)).digest()
+    ripemd160_hash = hashlib.new('ripemd160', sha256_hash).digest()
+    return '0x' + ripemd160_hash.hex()[:40]
@@ -0,0 +1,273 @@
+"""
+End-to-end load simulation: sustained transactions per second and
+submit-to-confirm latency of one or more in-process nodes.
+
+A run (see run_simulation):
+
+1. starts `nodes` Blockchains behind gossip Nodes connected over localhost,
+   and funds every user with one block;
+2. pre-signs the transfers, so client-side signing does not cap the offered
+   load, and submits them at `rate` per second (Poisson or evenly spaced
+   arrivals), taking the nodes in turn;
+3. mines a block every `block_interval` seconds, taking the nodes in turn,
+   until every accepted transaction is confirmed or `drain` seconds have
+   passed since the last submission.
+
+A transaction is confirmed once every node has accepted a block containing
+it. Blocks come from the timer rather than from the hashrate, so the
+proof-of-work target is fixed.
+
+Generating RSA keys dominates setting up users, so load_users caches the
+users' private keys in a file and only generates the ones it lacks
+(loading a cached key takes about 50 us instead of tens of milliseconds).
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Sequence
+from blockchain import Blockchain
+from constant import DEFAULT_SIGNATURE_SCHEME, SYSTEM
+from difficulty import Retargeting
+from node import MSG_BLOCK, Node
+from signatures import load_private_key
+from transaction import Transaction
+from user import User
+
+# what register_user credits a new user with
+REGISTRATION_REWARD = 100
+
+def load_users(path: str, count: int, scheme: str = DEFAULT_SIGNATURE_SCHEME) -> List[User]:
+    """
+    `count` users of a signature scheme whose private keys are cached in the
+    JSON file at path (scheme name -> PEM keys). Missing keys are generated
+    and the file is rewritten atomically. Keys are stored unencrypted, so
+    the file is for throwaway test identities only.
+    """
+    cache: Dict[str, List[str]] = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            cache = json.load(f)
+    pems = cache.get(scheme, [])
+    # written by this function, so the slow RSA key validation is skipped
+    users = [User(private_key=load_private_key(pem.encode(), validate=False)) for pem in pems[:count]]
+    if len(users) < count:
+        users.extend(User(scheme) for _ in range(count - len(users)))
+        cache[scheme] = pems + [user.export_private_key().decode() for user in users[len(pems):]]
+        with open(path + '.tmp', 'w') as f:
+            json.dump(cache, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+    return users
+
+@dataclass
+class LoadConfig:
+    rate: float = 100.0
+    duration: float = 10.0
+    nodes: int = 1
+    block_interval: float = 1.0
+    # cap on transactions per mined block, on top of the block template limits
+    max_block_transactions: Optional[int] = None
+    # "poisson" (exponential gaps) or "constant" (evenly spaced)
+    arrival: str = "poisson"
+    drain: float = 30.0
+    seed: int = 0
+
+@dataclass
+class SimulationReport:
+    config: LoadConfig
+    users: int
+    submitted: int
+    rejected: int
+    confirmed: int
+    blocks: int
+    # first submission to last submission / to last confirmation
+    submit_elapsed: float
+    elapsed: float
+    # every node ended on the same tip
+    converged: bool
+    latencies: List[float] = field(default_factory=list, repr=False)
+
+    @property
+    def offered_tps(self) -> float:
+        """Rate at which transactions were actually submitted"""
+        return self.submitted / self.submit_elapsed if self.submit_elapsed else 0.0
+
+    @property
+    def tps(self) -> float:
+        """Sustained rate: confirmed transactions per second of the run"""
+        return self.confirmed / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, p: float) -> float:
+        """Nearest-rank percentile (0-100) of the confirmation latencies, in seconds"""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        rank = max(math.ceil(p / 100 * len(ordered)), 1)
+        return ordered[rank - 1]
+
+    def to_dict(self) -> dict:
+        return {
+            "config": asdict(self.config),
+            "users": self.users,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "confirmed": self.confirmed,
+            "blocks": self.blocks,
+            "elapsed": self.elapsed,
+            "offered_tps": self.offered_tps,
+            "tps": self.tps,
+            "latency": {f"p{p}": self.percentile(p) for p in (50, 90, 99, 100)},
+            "converged": self.converged,
+        }
+
+    def format(self) -> str:
+        return "\n".join([
+            f"{self.config.nodes} node(s), {self.users} users, {self.config.arrival} arrivals "
+            f"at {self.config.rate:g}/s for {self.config.duration:g} s, "
+            f"a block every {self.config.block_interval:g} s",
+            f"submitted {self.submitted} ({self.rejected} rejected), confirmed {self.confirmed} "
+            f"in {self.blocks} blocks{'' if self.converged else ', nodes did NOT converge'}",
+            f"offered {self.offered_tps:.1f} tx/s, sustained {self.tps:.1f} tx/s",
+            "latency " + "  ".join(f"p{p} {self.percentile(p) * 1000:.0f} ms" for p in (50, 90, 99, 100)),
+        ])
+
+def _arrival_offsets(config: LoadConfig, count: int, rng: random.Random) -> List[float]:
+    """Seconds after the start at which each transaction is submitted"""
+    if config.arrival == "constant":
+        return [i / config.rate for i in range(count)]
+    if config.arrival != "poisson":
+        raise ValueError(f"Unknown arrival process: {config.arrival}")
+    offsets, offset = [], 0.0
+    for _ in range(count):
+        offsets.append(offset)
+        offset += rng.expovariate(config.rate)
+    return offsets
+
+def _sign_transfers(users: Sequence[User], count: int, rng: random.Random) -> List[Transaction]:
+    """Transfers of 1 from the users in turn to random other users"""
+    transfers = []
+    for i in range(count):
+        sender = i % len(users)
+        receiver = (sender + rng.randrange(1, len(users))) % len(users)
+        transfers.append(users[sender].start_transaction(users[receiver].get_address(), 1))
+    return transfers
+
+async def _start_network(count: int, registry: Dict[str, User]) -> List[Node]:
+    """`count` nodes sharing one user registry, each connected to every other"""
+    nodes = []
+    for _ in range(count):
+        blockchain = Blockchain(retargeting=Retargeting(interval=0))
+        blockchain.user_registry = registry
+        node = Node(blockchain)
+        await node.start()
+        nodes.append(node)
+    for i, node in enumerate(nodes):
+        for other in nodes[i + 1:]:
+            await node.connect(other.host, other.port)
+    while any(len(node.peers) < count - 1 for node in nodes):
+        await asyncio.sleep(0.01)
+    return nodes
+
+async def _fund(nodes: List[Node], users: Sequence[User], amount: int) -> None:
+    """Register the users with `amount` each in one block and wait until every node has it"""
+    origin = nodes[0].blockchain
+    for user in users:
+        origin.register_user(user)
+        if amount > REGISTRATION_REWARD:
+            origin.pending_transactions.append(Transaction(SYSTEM, user.address, amount - REGISTRATION_REWARD))
+    origin.mine_pending_transactions()
+    await nodes[0].broadcast_block(origin.get_last_block())
+    height = len(origin.chain)
+    while any(len(node.blockchain.chain) < height for node in nodes):
+        await asyncio.sleep(0.01)
+
+async def run_simulation(config: LoadConfig, users: Sequence[User]) -> SimulationReport:
+    if len(users) < 2:
+        raise ValueError("The simulation needs at least two users")
+    rng = random.Random(config.seed)
+    count = int(config.rate * config.duration)
+    transfers = _sign_transfers(users, count, rng)
+    offsets = _arrival_offsets(config, count, rng)
+
+    nodes = await _start_network(config.nodes, {user.address: user for user in users})
+    submitted: Dict[str, float] = {}
+    confirmed: Dict[str, float] = {}
+    acceptances: Dict[str, int] = {}
+    blocks = 0
+    try:
+        # each user sends at most ceil(count / users) transfers of 1
+        await _fund(nodes, users, -(-count // len(users)))
+
+        def block_accepted(block) -> None:
+            acceptances[block.hash] = acceptances.get(block.hash, 0) + 1
+            if acceptances[block.hash] < len(nodes):
+                return
+            now = time.perf_counter()
+            for tx in block.transactions:
+                if tx.transaction_id in submitted and tx.transaction_id not in confirmed:
+                    confirmed[tx.transaction_id] = now
+
+        def listener(message_type, message) -> None:
+            if message_type == MSG_BLOCK:
+                block_accepted(message)
+
+        for node in nodes:
+            node.listeners.append(listener)
+
+        async def mine() -> None:
+            nonlocal blocks
+            tick = 0
+            while True:
+                tick += 1
+                await asyncio.sleep(max(start + tick * config.block_interval - time.perf_counter(), 0))
+                blockchain = nodes[tick % len(nodes)].blockchain
+                height = len(blockchain.chain)
+                blockchain.mine_pending_transactions(config.max_block_transactions)
+                if len(blockchain.chain) > height:
+                    blocks += 1
+                    block_accepted(blockchain.get_last_block())
+                    await nodes[tick % len(nodes)].broadcast_block(blockchain.get_last_block())
+
+        start = time.perf_counter()
+        miner = asyncio.create_task(mine())
+        rejected = 0
+        for i, (offset, tx) in enumerate(zip(offsets, transfers)):
+            # always yield, so gossip and mining keep up even when submissions lag
+            await asyncio.sleep(max(start + offset - time.perf_counter(), 0))
+            submitted[tx.transaction_id] = time.perf_counter()
+            if not await nodes[i % len(nodes)].broadcast_transaction(tx):
+                del submitted[tx.transaction_id]
+                rejected += 1
+        submit_elapsed = time.perf_counter() - start
+        deadline = time.perf_counter() + config.drain
+        while len(confirmed) < len(submitted) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+        miner.cancel()
+        await asyncio.gather(miner, return_exceptions=True)
+    finally:
+        for node in nodes:
+            await node.stop()
+
+    elapsed = max(confirmed.values()) - start if confirmed else 0.0
+    tips = {node.blockchain.get_last_block().hash for node in nodes}
+    return SimulationReport(
+        config=config,
+        users=len(users),
+        submitted=len(submitted),
+        rejected=rejected,
+        confirmed=len(confirmed),
+        blocks=blocks,
+        submit_elapsed=submit_elapsed,
+        elapsed=elapsed,
+        converged=len(tips) == 1,
+        latencies=[confirmed[txid] - submitted[txid] for txid in confirmed],
+    )
+
+def simulate(config: LoadConfig, users: Sequence[User]) -> SimulationReport:
+    """Run a simulation in a new event loop"""
+    return asyncio.run(run_simulation(config, users))
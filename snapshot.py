@@ -0,0 +1,35 @@
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Set
+
+@dataclass
+class StateSnapshot:
+    """
+    Account balances after the block at `height` (whose hash is block_hash),
+    and the ids of every transaction up to it, so that a pruned node still
+    refuses to confirm one of them again. Together with the block headers up
+    to that height and the full blocks after it, it replaces the pruned
+    transaction history.
+    """
+    height: int
+    block_hash: str
+    balances: Dict[str, int]
+    transaction_ids: Set[str] = field(default_factory=set)
+
+    def save(self, path: str) -> None:
+        """Atomically write the snapshot as JSON"""
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'height': self.height, 'block_hash': self.block_hash,
+                       'balances': self.balances,
+                       'transaction_ids': sorted(self.transaction_ids)}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path: str) -> 'StateSnapshot':
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data['height'], data['block_hash'], data['balances'],
+                   set(data.get('transaction_ids', [])))
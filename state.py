@@ -0,0 +1,96 @@
+from typing import Dict, Iterable
+from block import Block
+from transaction import Transaction
+
+class AccountState:
+    """Per-address balance index maintained incrementally from blocks"""
+
+    def __init__(self) -> None:
+        self.balances: Dict[str, int] = {}
+
+    def get_balance(self, address: str) -> int:
+        """Get the balance of an address in O(1)"""
+        return self.balances.get(address, 0)
+
+    def _credit(self, address: str, amount: int) -> None:
+        balance = self.balances.get(address, 0) + amount
+        if balance:
+            self.balances[address] = balance
+        else:
+            # keep the index free of zero entries so rebuilt and maintained
+            # indexes compare equal
+            self.balances.pop(address, None)
+
+    def apply_transaction(self, tx: Transaction) -> None:
+        # the fee leaves the sender; it reaches a miner only through a reward transaction
+        self._credit(tx.sender, -tx.cost)
+        self._credit(tx.receiver, tx.amount)
+
+    def apply_block(self, block: Block) -> None:
+        """Apply the transactions of a block on top of the current state"""
+        for tx in block.transactions:
+            self.apply_transaction(tx)
+
+    def begin(self) -> 'StateTransition':
+        """Start applying changes on top of this state without modifying it"""
+        return StateTransition(self)
+
+    def revert_block(self, block: Block) -> None:
+        """Undo the transactions of a block (the inverse of apply_block)"""
+        for tx in reversed(block.transactions):
+            self._credit(tx.receiver, -tx.amount)
+            self._credit(tx.sender, tx.cost)
+
+    @classmethod
+    def from_chain(cls, chain: Iterable[Block]) -> 'AccountState':
+        """Rebuild the state from scratch by replaying every block"""
+        state = cls()
+        for block in chain:
+            state.apply_block(block)
+        return state
+
+class StateTransition:
+    """
+    Working copy of an AccountState for applying one block.
+
+    Only the balances the block touches are copied, into an overlay, so the
+    cost is linear in the block and independent of the number of accounts.
+    Every transfer is checked against the running balance, which already
+    includes the sender's earlier spends in the same block. commit() writes
+    all of the changes to the underlying state; dropping the transition
+    (or discard()) leaves it untouched.
+    """
+
+    def __init__(self, base: AccountState) -> None:
+        self.base = base
+        self._changes: Dict[str, int] = {}
+
+    def get_balance(self, address: str) -> int:
+        balance = self._changes.get(address)
+        return self.base.get_balance(address) if balance is None else balance
+
+    def apply_transaction(self, tx: Transaction, check_balance: bool = True) -> bool:
+        """
+        Apply a transfer; False (and no change) if the sender cannot cover
+        it or its amount or fee is out of range
+        """
+        if not tx.has_valid_amounts():
+            return False
+        sender_balance = self.get_balance(tx.sender)
+        if check_balance and sender_balance < tx.cost:
+            return False
+        self._changes[tx.sender] = sender_balance - tx.cost
+        self._changes[tx.receiver] = self.get_balance(tx.receiver) + tx.amount
+        return True
+
+    def commit(self) -> None:
+        balances = self.base.balances
+        for address, balance in self._changes.items():
+            if balance:
+                balances[address] = balance
+            else:
+                balances.pop(address, None)
+        self._changes = {}
+
+    def discard(self) -> None:
+        self._changes = {}
@@ -0,0 +1,396 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional, Tuple
+from block import Block
+from codec import encode_block, decode_block
+from constant import STORE_SEGMENT_SIZE, STORE_SYNC_EVERY
+from txindex import Location
+
+# index record per height: segment number, offset in segment, payload length
+INDEX_RECORD = struct.Struct('<IQI')
+# segment record header: payload length, crc32 of payload
+RECORD_HEADER = struct.Struct('<II')
+HASH_SIZE = 32
+# transaction record, in chain order: transaction id digest, block height, position in the block
+TX_RECORD = struct.Struct('<32sII')
+# per height: number of transaction records up to and including that block
+TX_END = struct.Struct('<Q')
+
+class BlockStore:
+    """
+    Append-only on-disk block storage.
+
+    Blocks are encoded with the binary codec into numbered segment files
+    (blk00000.dat, ...).
+    index.dat holds one fixed-width record per height and is memory-mapped, so
+    looking up a block by height is a slice of the map plus one read.
+    hashes.dat holds the raw 32-byte block hash per height and backs the
+    hash -> height index, which is built on the first lookup by hash.
+    txids.dat holds a record per transaction (id, height, position) and
+    txends.dat where each block's records end; they back the
+    transaction id -> location index, built on the first lookup by id
+    without decoding any block.
+    Opening a store only checks the tail records, so restart time does not
+    depend on the chain height.
+
+    Writes are flushed on every append and fsynced every `sync_every` appends
+    (segments before indexes). Up to that many appends may be unsynced at a
+    crash, with any of their pages lost, so on open each of the last
+    `sync_every` blocks is checked: the first one whose index record points
+    past the end of its segment, fails its checksum or does not match its
+    stored hash is dropped together with everything after it, and the
+    transaction records of the checked blocks are rewritten from the blocks
+    (all of them, once, for a store written without them). Reopen a store
+    with a `sync_every` no smaller than the one it was written with.
+    """
+
+    def __init__(self, path: str, segment_size: int = STORE_SEGMENT_SIZE,
+                 sync_every: int = STORE_SYNC_EVERY, cache_size: int = 256) -> None:
+        self.path = path
+        self.segment_size = segment_size
+        self.sync_every = sync_every
+        self.cache_size = cache_size
+        os.makedirs(path, exist_ok=True)
+
+        self._index_file = open(os.path.join(path, 'index.dat'), 'a+b')
+        self._hash_file = open(os.path.join(path, 'hashes.dat'), 'a+b')
+        self._txid_file = open(os.path.join(path, 'txids.dat'), 'a+b')
+        self._txend_file = open(os.path.join(path, 'txends.dat'), 'a+b')
+        self._segments: Dict[int, object] = {}
+        self._index_map: Optional[mmap.mmap] = None
+        self._hash_map: Optional[mmap.mmap] = None
+        self._hash_index: Optional[Dict[bytes, int]] = None
+        self._tx_locations: Optional[Dict[bytes, Location]] = None
+        self._tx_count = 0
+        self._cache: 'OrderedDict[int, Block]' = OrderedDict()
+        self._unsynced = 0
+
+        self._count = self._recover()
+        self._remap()
+
+    # -- recovery and mapping ------------------------------------------------
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.path, f'blk{segment:05d}.dat')
+
+    def _segment(self, segment: int):
+        f = self._segments.get(segment)
+        if f is None:
+            f = self._segments[segment] = open(self._segment_path(segment), 'a+b')
+        return f
+
+    def _read_index_record(self, height: int) -> Tuple[int, int, int]:
+        self._index_file.seek(height * INDEX_RECORD.size)
+        return INDEX_RECORD.unpack(self._index_file.read(INDEX_RECORD.size))
+
+    def _read_block(self, height: int) -> Optional[Block]:
+        """The block at a height read straight from its segment, or None if its data or checksum is bad"""
+        segment, offset, length = self._read_index_record(height)
+        path = self._segment_path(segment)
+        if not os.path.exists(path) or os.path.getsize(path) < offset + RECORD_HEADER.size + length:
+            return None
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            stored_length, crc = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+            payload = f.read(length)
+        if stored_length != length or zlib.crc32(payload) != crc:
+            return None
+        return decode_block(payload)[0]
+
+    def _block_intact(self, height: int) -> bool:
+        """Whether the block at a height has its data, checksum and hash on disk"""
+        block = self._read_block(height)
+        self._hash_file.seek(height * HASH_SIZE)
+        return block is not None and block.hash == self._hash_file.read(HASH_SIZE).hex()
+
+    def _recover(self) -> int:
+        """Find the first damaged block since the last sync and cut it off with everything after it"""
+        index_count = os.path.getsize(self._index_file.name) // INDEX_RECORD.size
+        hash_count = os.path.getsize(self._hash_file.name) // HASH_SIZE
+        count = min(index_count, hash_count)
+        # unsynced pages reach the disk in any order, so an intact last
+        # block says nothing about the ones before it
+        checked = max(count - self.sync_every, 0)
+        height = checked
+        while height < count and self._block_intact(height):
+            height += 1
+        self._truncate_files(height)
+        self._recover_transactions(checked, height)
+        return height
+
+    def _tx_end(self, height: int) -> int:
+        """Number of transaction records up to and including the block at a height"""
+        if height < 0:
+            return 0
+        return TX_END.unpack(os.pread(self._txend_file.fileno(), TX_END.size, height * TX_END.size))[0]
+
+    def _recover_transactions(self, synced: int, count: int) -> None:
+        """
+        Keep the transaction records of the blocks below `synced`, which were
+        fsynced with them, and rewrite those of the blocks from there to count
+        """
+        synced = min(synced, os.path.getsize(self._txend_file.name) // TX_END.size)
+        self._tx_count = self._tx_end(synced - 1)
+        self._txid_file.truncate(self._tx_count * TX_RECORD.size)
+        self._txend_file.truncate(synced * TX_END.size)
+        for height in range(synced, count):
+            self._append_transactions(height, self._read_block(height))
+
+    def _truncate_files(self, count: int) -> None:
+        self._index_file.truncate(count * INDEX_RECORD.size)
+        self._hash_file.truncate(count * HASH_SIZE)
+        if count:
+            segment, offset, length = self._read_index_record(count - 1)
+            end = offset + RECORD_HEADER.size + length
+        else:
+            segment, end = 0, 0
+        self._segment(segment).truncate(end)
+        # drop later segments entirely
+        later = segment + 1
+        while os.path.exists(self._segment_path(later)):
+            f = self._segments.pop(later, None)
+            if f is not None:
+                f.close()
+            os.remove(self._segment_path(later))
+            later += 1
+        self._write_segment, self._write_offset = segment, end
+
+    def _remap(self) -> None:
+        for m in (self._index_map, self._hash_map):
+            if m is not None:
+                m.close()
+        self._index_map = self._hash_map = None
+        if self._count:
+            self._index_file.flush()
+            self._hash_file.flush()
+            self._index_map = mmap.mmap(self._index_file.fileno(), self._count * INDEX_RECORD.size,
+                                        access=mmap.ACCESS_READ)
+            self._hash_map = mmap.mmap(self._hash_file.fileno(), self._count * HASH_SIZE,
+                                       access=mmap.ACCESS_READ)
+        self._mapped = self._count
+
+    # -- writes --------------------------------------------------------------
+
+    def append(self, block: Block) -> int:
+        """Append a block at the next height and return that height"""
+        payload = encode_block(block)
+        record_size = RECORD_HEADER.size + len(payload)
+        if self._write_offset and self._write_offset + record_size > self.segment_size:
+            self._write_segment += 1
+            self._write_offset = 0
+
+        f = self._segment(self._write_segment)
+        f.seek(self._write_offset)
+        f.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+        f.write(payload)
+        f.flush()
+
+        self._index_file.seek(0, os.SEEK_END)
+        self._index_file.write(INDEX_RECORD.pack(self._write_segment, self._write_offset, len(payload)))
+        self._index_file.flush()
+        self._hash_file.seek(0, os.SEEK_END)
+        self._hash_file.write(bytes.fromhex(block.hash))
+        self._hash_file.flush()
+
+        height = self._count
+        self._append_transactions(height, block)
+        self._count += 1
+        self._write_offset += record_size
+        if self._hash_index is not None:
+            self._hash_index[bytes.fromhex(block.hash)] = height
+
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every:
+            self.sync()
+        return height
+
+    def _append_transactions(self, height: int, block: Block) -> None:
+        records = [
+            TX_RECORD.pack(bytes.fromhex(tx.transaction_id), height, position)
+            for position, tx in enumerate(block.transactions)
+        ]
+        self._txid_file.seek(0, os.SEEK_END)
+        self._txid_file.write(b''.join(records))
+        self._txid_file.flush()
+        self._tx_count += len(records)
+        self._txend_file.seek(0, os.SEEK_END)
+        self._txend_file.write(TX_END.pack(self._tx_count))
+        self._txend_file.flush()
+        if self._tx_locations is not None:
+            for position, tx in enumerate(block.transactions):
+                self._tx_locations[bytes.fromhex(tx.transaction_id)] = (height, position)
+
+    def _truncate_transactions(self, count: int) -> None:
+        tx_count = self._tx_end(count - 1)
+        if self._tx_locations is not None:
+            dropped = os.pread(self._txid_file.fileno(), (self._tx_count - tx_count) * TX_RECORD.size,
+                               tx_count * TX_RECORD.size)
+            for txid, _, _ in TX_RECORD.iter_unpack(dropped):
+                del self._tx_locations[txid]
+        self._txid_file.truncate(tx_count * TX_RECORD.size)
+        self._txend_file.truncate(count * TX_END.size)
+        self._tx_count = tx_count
+
+    def truncate(self, count: int) -> None:
+        """Drop every block at height >= count"""
+        if count >= self._count:
+            return
+        self.sync()
+        if self._hash_index is not None:
+            for height in range(count, self._count):
+                del self._hash_index[self._hash_at(height)]
+        for height in range(count, self._count):
+            self._cache.pop(height, None)
+        self._count = count
+        self._remap()
+        self._truncate_files(count)
+        self._truncate_transactions(count)
+        self.sync()
+        if self.load_state() is None:
+            # the checkpoint covered blocks that no longer exist
+            self._remove_state()
+
+    def sync(self) -> None:
+        """fsync segment data first, then the indexes that point into it"""
+        for f in self._segments.values():
+            f.flush()
+            os.fsync(f.fileno())
+        for f in (self._index_file, self._hash_file, self._txid_file, self._txend_file):
+            f.flush()
+            os.fsync(f.fileno())
+        self._unsynced = 0
+
+    # -- reads ---------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _hash_at(self, height: int) -> bytes:
+        if height >= self._mapped:
+            self._remap()
+        return self._hash_map[height * HASH_SIZE:(height + 1) * HASH_SIZE]
+
+    def get(self, height: int) -> Block:
+        """Load the block at a height (deserialized on demand, small LRU cache)"""
+        if not 0 <= height < self._count:
+            raise IndexError(height)
+        block = self._cache.get(height)
+        if block is not None:
+            self._cache.move_to_end(height)
+            return block
+
+        if height >= self._mapped:
+            self._remap()
+        start = height * INDEX_RECORD.size
+        segment, offset, length = INDEX_RECORD.unpack(self._index_map[start:start + INDEX_RECORD.size])
+        payload = os.pread(self._segment(segment).fileno(), length, offset + RECORD_HEADER.size)
+        block, _ = decode_block(payload)
+
+        self._cache[height] = block
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return block
+
+    def height_of(self, block_hash: str) -> Optional[int]:
+        """Height of the block with this hash, if stored"""
+        if self._hash_index is None:
+            if self._count > self._mapped:
+                self._remap()
+            raw = self._hash_map[:] if self._hash_map is not None else b''
+            self._hash_index = {
+                raw[i * HASH_SIZE:(i + 1) * HASH_SIZE]: i for i in range(self._count)
+            }
+        return self._hash_index.get(bytes.fromhex(block_hash))
+
+    def get_by_hash(self, block_hash: str) -> Optional[Block]:
+        height = self.height_of(block_hash)
+        return None if height is None else self.get(height)
+
+    def location_of(self, transaction_id: str) -> Optional[Location]:
+        """(height, position) of the stored transaction with this id, if any"""
+        if self._tx_locations is None:
+            raw = os.pread(self._txid_file.fileno(), self._tx_count * TX_RECORD.size, 0)
+            self._tx_locations = {
+                txid: (height, position) for txid, height, position in TX_RECORD.iter_unpack(raw)
+            }
+        try:
+            return self._tx_locations.get(bytes.fromhex(transaction_id))
+        except ValueError:
+            return None
+
+    # -- account state checkpoints -------------------------------------------
+
+    def save_state(self, height: int, balances: Dict[str, int], target: Optional[int] = None) -> None:
+        """
+        Atomically write a checkpoint taken at a height: the account state
+        and the proof-of-work target of the block at that height
+        """
+        self.sync()
+        path = os.path.join(self.path, 'state.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'height': height, 'balances': balances, 'target': target}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    def _remove_state(self) -> None:
+        path = os.path.join(self.path, 'state.json')
+        if os.path.exists(path):
+            os.remove(path)
+
+    def load_state(self) -> Optional[Tuple[int, Dict[str, int], Optional[int]]]:
+        """
+        The latest checkpoint as (height, balances, target), or None if
+        missing or beyond the stored chain. The target is None in
+        checkpoints written without one.
+        """
+        path = os.path.join(self.path, 'state.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        if data['height'] >= self._count:
+            return None
+        return data['height'], data['balances'], data.get('target')
+
+    def close(self) -> None:
+        self.sync()
+        for m in (self._index_map, self._hash_map):
+            if m is not None:
+                m.close()
+        for f in [self._index_file, self._hash_file, self._txid_file, self._txend_file,
+                  *self._segments.values()]:
+            f.close()
+        self._segments.clear()
+
+class StoredChain:
+    """List-like view of a BlockStore, usable as Blockchain.chain"""
+
+    def __init__(self, store: BlockStore) -> None:
+        self.store = store
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self.store.get(i) for i in range(*item.indices(len(self.store)))]
+        if item < 0:
+            item += len(self.store)
+        return self.store.get(item)
+
+    def __iter__(self) -> Iterator[Block]:
+        for height in range(len(self.store)):
+            yield self.store.get(height)
+
+    def append(self, block: Block) -> None:
+        self.store.append(block)
+
+    def pop(self) -> Block:
+        block = self.store.get(len(self.store) - 1)
+        self.store.truncate(len(self.store) - 1)
+        return block
@@ -0,0 +1,203 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+from block import Block, BlockHeader
+from blockchain import Blockchain
+from codec import decode_block, encode_block
+import consensus
+
+class SyncError(Exception):
+    """Raised when the chain cannot be synchronized from the given peers"""
+
+class LocalPeer:
+    """
+    In-process stand-in for a remote peer serving a Blockchain.
+
+    Blocks go through the binary codec, as they would over the wire, so the
+    syncing node never shares objects with the peer. `delay` simulates
+    network latency per request and `fail_every` makes every n-th block
+    request fail, to exercise retries.
+    """
+
+    def __init__(self, blockchain: Blockchain, delay: float = 0.0, fail_every: int = 0) -> None:
+        self.blockchain = blockchain
+        self.delay = delay
+        self.fail_every = fail_every
+        self.requests = 0
+
+    async def get_height(self) -> int:
+        await asyncio.sleep(self.delay)
+        return len(self.blockchain.chain) - 1
+
+    async def get_headers(self, start: int, count: int) -> List[BlockHeader]:
+        await asyncio.sleep(self.delay)
+        chain = self.blockchain.chain
+        return [chain[height].header() for height in range(start, min(start + count, len(chain)))]
+
+    async def get_blocks(self, start: int, count: int) -> List[Block]:
+        self.requests += 1
+        await asyncio.sleep(self.delay)
+        if self.fail_every and self.requests % self.fail_every == 0:
+            raise ConnectionError("simulated peer failure")
+        chain = self.blockchain.chain
+        return [
+            decode_block(encode_block(chain[height]))[0]
+            for height in range(start, min(start + count, len(chain)))
+        ]
+
+@dataclass
+class SyncResult:
+    blocks: int
+    headers_elapsed: float
+    elapsed: float
+
+    @property
+    def blocks_per_second(self) -> float:
+        return self.blocks / self.elapsed if self.elapsed else 0.0
+
+class ChainSync:
+    """
+    Headers-first synchronization of a Blockchain from several peers.
+
+    1. Headers are fetched from the peer with the highest tip and checked
+       for previous_hash linkage, timestamps and proof of work
+       (Blockchain.validate_header) without downloading any transactions.
+    2. Bodies are downloaded in chunks by `window` concurrent workers, spread
+       over all peers. A chunk that fails or times out is retried on the next
+       peer. Workers never run more than `window` chunks ahead of the block
+       being applied, which bounds memory.
+    3. As soon as a block is downloaded, its hash and signatures are checked
+       on a background thread (Blockchain.precheck_block), overlapping with
+       applying earlier blocks. Blocks are matched against their header and
+       applied in order through Blockchain.add_block, which adds the checks
+       that depend on the chain.
+    """
+
+    def __init__(self, blockchain: Blockchain, peers: Sequence, chunk_size: int = 16,
+                 window: int = 8, headers_per_request: int = 2000,
+                 retries: int = 3, timeout: float = 10.0) -> None:
+        if not peers:
+            raise SyncError("No peers to sync from")
+        self.blockchain = blockchain
+        self.peers = list(peers)
+        self.chunk_size = chunk_size
+        self.window = window
+        self.headers_per_request = headers_per_request
+        self.retries = retries
+        self.timeout = timeout
+
+    async def fetch_headers(self) -> List[BlockHeader]:
+        """Download and check the header chain from our tip to the best peer's tip"""
+        heights = await asyncio.gather(*(peer.get_height() for peer in self.peers))
+        best = self.peers[max(range(len(heights)), key=heights.__getitem__)]
+        target = max(heights)
+
+        headers: List[BlockHeader] = []
+        parent = self.blockchain.get_last_block()
+        first = parent.index + 1
+        retargeting = self.blockchain.retargeting
+        # proof-of-work target of the last header checked
+        header_target = self.blockchain.tree.target(parent.hash)
+
+        def timestamp_at(height: int) -> float:
+            if height >= first:
+                return headers[height - first].timestamp
+            return self.blockchain.chain[height].timestamp
+
+        while parent.index < target:
+            batch = await asyncio.wait_for(
+                best.get_headers(parent.index + 1, self.headers_per_request), self.timeout
+            )
+            if not batch:
+                raise SyncError(f"Peer returned no headers after height {parent.index}")
+            for header in batch:
+                header_target = retargeting.next_target(header_target, header.index, timestamp_at)
+                if not self.blockchain.validate_header(header, parent, header_target,
+                                                       timestamp_at=timestamp_at):
+                    raise SyncError(f"Invalid header at height {header.index}")
+                headers.append(header)
+                parent = header
+        return headers
+
+    async def _download(self, start: int, count: int) -> List[Block]:
+        last_error = None
+        for attempt in range(self.retries + 1):
+            peer = self.peers[(start // self.chunk_size + attempt) % len(self.peers)]
+            try:
+                blocks = await asyncio.wait_for(peer.get_blocks(start, count), self.timeout)
+                if len(blocks) == count:
+                    return blocks
+                last_error = SyncError(f"Peer returned {len(blocks)} of {count} blocks at {start}")
+            except (ConnectionError, asyncio.TimeoutError) as e:
+                last_error = e
+        raise SyncError(f"Could not download blocks at height {start}: {last_error}")
+
+    async def run(self) -> SyncResult:
+        start_time = time.perf_counter()
+        headers = await self.fetch_headers()
+        headers_elapsed = time.perf_counter() - start_time
+        if not headers:
+            return SyncResult(0, headers_elapsed, time.perf_counter() - start_time)
+
+        first = headers[0].index
+        chunks = asyncio.Queue()
+        for offset in range(0, len(headers), self.chunk_size):
+            chunks.put_nowait(offset)
+        downloaded: Dict[int, Block] = {}
+        prechecks: Dict[int, asyncio.Future] = {}
+        prechecker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="precheck")
+        loop = asyncio.get_running_loop()
+        errors: List[Exception] = []
+        progress = asyncio.Condition()
+        applied = 0
+
+        async def worker() -> None:
+            while not chunks.empty():
+                offset = chunks.get_nowait()
+                async with progress:
+                    # sliding window: stay within `window` chunks of the apply point
+                    await progress.wait_for(lambda: offset < applied + self.window * self.chunk_size)
+                count = min(self.chunk_size, len(headers) - offset)
+                try:
+                    blocks = await self._download(first + offset, count)
+                except SyncError as e:
+                    errors.append(e)
+                    blocks = []
+                async with progress:
+                    for i, block in enumerate(blocks):
+                        for tx in block.transactions:
+                            consensus.receive(tx)
+                        downloaded[offset + i] = block
+                        prechecks[offset + i] = loop.run_in_executor(
+                            prechecker, self.blockchain.precheck_block, block)
+                    progress.notify_all()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.window)]
+        try:
+            while applied < len(headers):
+                async with progress:
+                    await progress.wait_for(lambda: applied in downloaded or errors)
+                if errors:
+                    raise errors[0]
+                while applied in downloaded:
+                    block = downloaded.pop(applied)
+                    header = headers[applied]
+                    if block.hash != header.hash:
+                        raise SyncError(f"Block body does not match header at height {header.index}")
+                    # a body not matching its hash fails the precheck
+                    if (not await prechecks.pop(applied)
+                            or not self.blockchain.add_block(block, prechecked=True)):
+                        raise SyncError(f"Block at height {header.index} failed validation")
+                    applied += 1
+                async with progress:
+                    progress.notify_all()
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await asyncio.gather(*prechecks.values(), return_exceptions=True)
+            prechecker.shutdown()
+
+        return SyncResult(len(headers), headers_elapsed, time.perf_counter() - start_time)
@@ -0,0 +1,202 @@
+import heapq
+from typing import Callable, Dict, List, Set, Tuple
+from constant import BLOCK_MAX_BYTES, BLOCK_MAX_TRANSACTIONS, SYSTEM
+from mempool import Mempool
+from transaction import Transaction
+
+def fee_rate(tx: Transaction, size: int) -> float:
+    """Fee paid per serialized byte"""
+    return tx.fee / size if size else 0.0
+
+class BlockTemplate:
+    """
+    The transactions of the next block, chosen from the mempool by fee rate
+    within a byte and a transaction-count limit.
+
+    A sender's transactions are only taken in arrival order: selection works
+    on a heap of each sender's next transaction, so a high-fee transaction
+    never jumps ahead of its sender's earlier ones. A transaction that does
+    not fit, or that its sender's confirmed balance cannot cover, ends the
+    selection for that sender. Only a transaction's own fee counts, not a
+    fee that a later transaction pays for an earlier one (no ancestor
+    packages).
+
+    The template listens to the mempool and is updated in place: an arriving
+    transaction that follows its sender's selected ones is appended, and
+    when the template is full it displaces the lowest-fee-rate transactions
+    that are last of their sender. The template is only rebuilt from the
+    whole mempool, lazily, after a selected transaction leaves the pool or
+    invalidate() is called. `version` changes whenever the contents change.
+    """
+
+    def __init__(self, mempool: Mempool, balance_of: Callable[[str], int],
+                 max_bytes: int = BLOCK_MAX_BYTES,
+                 max_transactions: int = BLOCK_MAX_TRANSACTIONS) -> None:
+        self.mempool = mempool
+        self.balance_of = balance_of
+        self.max_bytes = max_bytes
+        self.max_transactions = max_transactions
+        self.version = 0
+        self.rebuilds = 0
+        self._dirty = True
+        self._reset()
+        mempool.add_listener(self)
+
+    def close(self) -> None:
+        """Stop following the mempool"""
+        self.mempool.remove_listener(self)
+
+    def invalidate(self) -> None:
+        """Force a rebuild, e.g. because confirmed balances changed"""
+        self._dirty = True
+
+    def _reset(self) -> None:
+        # selected transactions in block order (dicts keep insertion order)
+        self._selected: Dict[str, Transaction] = {}
+        # per sender: ids of its selected transactions in order, and what they spend
+        self._by_sender: Dict[str, List[str]] = {}
+        self._spent: Dict[str, int] = {}
+        # senders whose next transaction was left out; nothing later can follow
+        self._stopped: Set[str] = set()
+        # (fee rate, txid) of selected transactions that were last of their
+        # sender when pushed; stale entries are skipped when popped
+        self._tails: List[Tuple[float, str]] = []
+        self._bytes = 0
+        self._fees = 0
+
+    def _covered(self, tx: Transaction) -> bool:
+        if tx.sender == SYSTEM:
+            return True
+        return self._spent.get(tx.sender, 0) + tx.cost <= self.balance_of(tx.sender)
+
+    def _take(self, tx: Transaction, size: int) -> None:
+        self._selected[tx.transaction_id] = tx
+        self._by_sender.setdefault(tx.sender, []).append(tx.transaction_id)
+        self._spent[tx.sender] = self._spent.get(tx.sender, 0) + tx.cost
+        self._bytes += size
+        self._fees += tx.fee
+        heapq.heappush(self._tails, (fee_rate(tx, size), tx.transaction_id))
+
+    def _drop_tail(self, tx: Transaction) -> None:
+        """Unselect the last selected transaction of its sender"""
+        size = self.mempool.size_of(tx.transaction_id)
+        del self._selected[tx.transaction_id]
+        sender_ids = self._by_sender[tx.sender]
+        sender_ids.pop()
+        self._spent[tx.sender] -= tx.cost
+        if sender_ids:
+            previous = self._selected[sender_ids[-1]]
+            heapq.heappush(self._tails, (fee_rate(previous, self.mempool.size_of(previous.transaction_id)),
+                                         previous.transaction_id))
+        else:
+            del self._by_sender[tx.sender]
+            del self._spent[tx.sender]
+        self._bytes -= size
+        self._fees -= tx.fee
+        self._stopped.add(tx.sender)
+
+    def _is_tail(self, transaction_id: str) -> bool:
+        tx = self._selected.get(transaction_id)
+        return tx is not None and self._by_sender[tx.sender][-1] == transaction_id
+
+    def _make_room(self, tx: Transaction, rate: float, size: int) -> bool:
+        """
+        Unselect tail transactions paying a lower fee rate than `rate` until
+        one more transaction of `size` bytes fits. Tails of tx's own sender
+        are never taken, so tx still follows them. Nothing changes on failure.
+        """
+        evicted: List[Tuple[float, str]] = []
+        kept: List[Tuple[float, str]] = []
+        count, used = len(self._selected), self._bytes
+        while count >= self.max_transactions or used + size > self.max_bytes:
+            while self._tails and not self._is_tail(self._tails[0][1]):
+                heapq.heappop(self._tails)
+            if not self._tails or self._tails[0][0] >= rate:
+                for entry in evicted + kept:
+                    heapq.heappush(self._tails, entry)
+                return False
+            entry = heapq.heappop(self._tails)
+            if self._selected[entry[1]].sender == tx.sender:
+                kept.append(entry)
+                continue
+            evicted.append(entry)
+            count -= 1
+            used -= self.mempool.size_of(entry[1])
+        for entry in kept:
+            heapq.heappush(self._tails, entry)
+        for _, transaction_id in evicted:
+            self._drop_tail(self._selected[transaction_id])
+        return True
+
+    def refresh(self) -> None:
+        """Rebuild the selection from the whole mempool"""
+        self._reset()
+        queues = {sender: self.mempool.get_by_sender(sender) for sender in self.mempool.senders()}
+        heap = []
+        for sender, queue in queues.items():
+            size = self.mempool.size_of(queue[0].transaction_id)
+            heapq.heappush(heap, (-fee_rate(queue[0], size), queue[0].timestamp, sender, 0, size))
+
+        while heap and len(self._selected) < self.max_transactions:
+            _, _, sender, position, size = heapq.heappop(heap)
+            tx = queues[sender][position]
+            if self._bytes + size > self.max_bytes or not self._covered(tx):
+                self._stopped.add(sender)
+                continue
+            self._take(tx, size)
+            if position + 1 < len(queues[sender]):
+                following = queues[sender][position + 1]
+                size = self.mempool.size_of(following.transaction_id)
+                heapq.heappush(heap, (-fee_rate(following, size), following.timestamp,
+                                      sender, position + 1, size))
+        # senders still queued when the count limit was reached were cut off too
+        self._stopped.update(sender for _, _, sender, _, _ in heap)
+
+        self._dirty = False
+        self.version += 1
+        self.rebuilds += 1
+
+    def transaction_added(self, tx: Transaction) -> None:
+        if self._dirty:
+            return
+        follows_sender = (
+            tx.sender not in self._stopped
+            # every earlier pending transaction of the sender is selected
+            and len(self._by_sender.get(tx.sender, ())) == self.mempool.count_by_sender(tx.sender) - 1
+        )
+        if not follows_sender:
+            # its sender's queue is cut off before it, so it cannot be selected
+            return
+        size = self.mempool.size_of(tx.transaction_id)
+        if not self._covered(tx) or not self._make_room(tx, fee_rate(tx, size), size):
+            self._stopped.add(tx.sender)
+            return
+        self._take(tx, size)
+        self.version += 1
+
+    def transaction_removed(self, tx: Transaction) -> None:
+        if tx.transaction_id in self._selected or tx.sender in self._stopped:
+            self._dirty = True
+
+    def transactions(self) -> List[Transaction]:
+        """The selected transactions, in an order valid for a block"""
+        if self._dirty:
+            self.refresh()
+        return list(self._selected.values())
+
+    @property
+    def size_bytes(self) -> int:
+        if self._dirty:
+            self.refresh()
+        return self._bytes
+
+    @property
+    def fees(self) -> int:
+        if self._dirty:
+            self.refresh()
+        return self._fees
+
+    def __len__(self) -> int:
+        if self._dirty:
+            self.refresh()
+        return len(self._selected)
@@ -3,6 +3,9 @@ import time
 from blockchain import Blockchain
 from user import User
 from block import Block
+from constant import REWARD, SYSTEM, TransactionState
+from merkle import verify_inclusion
+from transaction import Transaction
 
 class TestBlockchainFramework(unittest.TestCase):
     def setUp(self):
@@ -99,5 +102,293 @@ class TestBlockchainFramework(unittest.TestCase):
         new_block.mine(difficulty=2)
         self.assertTrue(self.blockchain.validate_block(new_block))
 
+    def test_midstate_mining_matches_compute_hash(self):
+        """Test the hash found by midstate mining is the block's full hash"""
+        tx = self.user1.start_transaction(self.user2.get_address(), 5)
+        new_block = Block(
+            index=len(self.blockchain.chain),
+            transactions=[tx],
+            timestamp=time.time(),
+            previous_hash=self.blockchain.get_last_block().hash
+        )
+        new_block.mine(difficulty=3)
+        self.assertTrue(new_block.hash.startswith('000'))
+        self.assertEqual(new_block.hash, new_block.compute_hash())
+
+    def test_balance_index_consistency(self):
+        """Test the maintained balance index matches a rebuild from the chain"""
+        tx = self.user1.start_transaction(self.user2.get_address(), 10)
+        self.blockchain.pending_transactions.append(tx)
+        self.blockchain.mine_pending_transactions()
+
+        self.assertEqual(len(self.blockchain.chain), 3)
+        self.assertTrue(self.blockchain.verify_state())
+
+    def test_remove_last_block_rolls_back_balances(self):
+        """Test removing the tip undoes its balance changes"""
+        tx = self.user1.start_transaction(self.user2.get_address(), 30)
+        self.blockchain.pending_transactions.append(tx)
+        self.blockchain.mine_pending_transactions()
+        self.assertEqual(self.blockchain.get_balance(self.user1.get_address()), 70)
+
+        removed = self.blockchain.remove_last_block()
+        self.assertIn(tx, removed.transactions)
+        self.assertEqual(self.blockchain.get_balance(self.user1.get_address()), 100)
+        self.assertEqual(self.blockchain.get_balance(self.user2.get_address()), 100)
+        self.assertTrue(self.blockchain.verify_state())
+
+    def test_transaction_lookup_and_history(self):
+        """Test confirmed transactions can be found by id and by address"""
+        tx = self.user1.start_transaction(self.user2.get_address(), 10)
+        self.blockchain.pending_transactions.append(tx)
+        self.blockchain.mine_pending_transactions()
+
+        found, location = self.blockchain.get_transaction(tx.transaction_id)
+        self.assertIs(found, tx)
+        self.assertEqual(location, (2, 0))
+
+        history, cursor = self.blockchain.get_history(self.user1.get_address())
+        self.assertEqual([entry for entry, _ in history][-1], tx)
+        self.assertIsNone(cursor)
+
+        self.blockchain.remove_last_block()
+        self.assertIsNone(self.blockchain.get_transaction(tx.transaction_id))
+
+    def test_confirmation_depth(self):
+        """Test a transaction is fully confirmed only after five more blocks"""
+        tx = self.user1.start_transaction(self.user2.get_address(), 10)
+        self.blockchain.pending_transactions.append(tx)
+        self.blockchain.mine_pending_transactions()
+        self.assertEqual(tx.state, TransactionState.FIRST_CONFIRMED)
+
+        for i in range(5):
+            self.assertEqual(tx.state, TransactionState.FIRST_CONFIRMED)
+            self.blockchain.register_user(User())
+            self.blockchain.mine_pending_transactions()
+        self.assertEqual(tx.state, TransactionState.FULLY_CONFIRMED)
+
+    def test_fees_are_paid_to_the_miner(self):
+        """Test the sender pays amount plus fee and the miner collects the fees"""
+        cheap = self.user1.start_transaction(self.user2.get_address(), 10, fee=1)
+        rich = self.user2.start_transaction(self.user1.get_address(), 10, fee=5)
+        self.blockchain.prove_transaction(cheap)
+        self.blockchain.prove_transaction(rich)
+        self.blockchain.mine_pending_transactions(miner_address="0xminer")
+
+        block = self.blockchain.get_last_block()
+        self.assertEqual([tx.transaction_id for tx in block.transactions[1:]],
+                         [rich.transaction_id, cheap.transaction_id])
+        self.assertEqual(self.blockchain.get_balance("0xminer"), 6)
+        self.assertEqual(self.blockchain.get_balance(self.user1.get_address()), 100 - 11 + 10)
+        self.assertEqual(self.blockchain.get_balance(self.user2.get_address()), 100 - 15 + 10)
+        self.assertTrue(self.blockchain.verify_state())
+
+    def test_reward_capped_at_fees(self):
+        """Test a block may pay its miner at most its fees, once, in its first transaction"""
+        def block_of(*transactions):
+            block = Block(len(self.blockchain.chain), transactions, time.time(),
+                          self.blockchain.get_last_block().hash)
+            block.mine(difficulty=2)
+            return block
+
+        def spend():
+            return self.user1.start_transaction(self.user2.get_address(), 10, fee=2)
+
+        self.assertFalse(self.blockchain.add_block(block_of(Transaction(REWARD, "0xminer", 10 ** 9))))
+        self.assertFalse(self.blockchain.add_block(block_of(Transaction(REWARD, "0xminer", 3), spend())))
+        self.assertFalse(self.blockchain.add_block(block_of(spend(), Transaction(REWARD, "0xminer", 2))))
+        self.assertFalse(self.blockchain.add_block(block_of(
+            Transaction(REWARD, "0xminer", 1), Transaction(REWARD, "0xminer", 1), spend())))
+        self.assertFalse(self.blockchain.validate_transaction(Transaction(REWARD, "0xminer", 1)))
+        self.assertEqual(self.blockchain.get_balance("0xminer"), 0)
+
+        self.assertTrue(self.blockchain.add_block(block_of(Transaction(REWARD, "0xminer", 2), spend())))
+        self.assertEqual(self.blockchain.get_balance("0xminer"), 2)
+        self.assertTrue(self.blockchain.validate_chain().valid)
+
+    def test_negative_fee_rejected(self):
+        """Test a transaction with a negative fee, which would credit its sender, is never accepted"""
+        minting = self.user1.start_transaction(self.user2.get_address(), 10, fee=-1000)
+        self.blockchain.prove_transaction(minting)
+        self.assertEqual(minting.state, TransactionState.FAILED)
+        self.assertNotIn(minting, self.blockchain.pending_transactions)
+
+        minting = self.user1.start_transaction(self.user2.get_address(), 10, fee=-1000)
+        block = Block(len(self.blockchain.chain), [minting], time.time(),
+                      self.blockchain.get_last_block().hash)
+        block.mine(difficulty=2)
+        self.assertFalse(self.blockchain.add_block(block))
+        self.assertEqual(self.blockchain.get_balance(self.user1.get_address()), 100)
+
+    def test_non_positive_amount_rejected(self):
+        """Test a transfer of a negative or zero amount is never accepted, and a chain holding one is invalid"""
+        for amount in (-500, 0):
+            self.assertFalse(self.blockchain.validate_transaction(
+                self.user1.start_transaction(self.user2.get_address(), amount)))
+
+        pulling = self.user1.start_transaction(self.user2.get_address(), -500)
+        block = Block(len(self.blockchain.chain), [pulling], time.time(),
+                      self.blockchain.get_last_block().hash)
+        block.mine(difficulty=2)
+        self.assertFalse(self.blockchain.add_block(block))
+        self.assertEqual(self.blockchain.get_balance(self.user2.get_address()), 100)
+
+        # a block that bypassed add_block still fails validation of the chain
+        self.blockchain._connect_block(block)
+        self.assertFalse(self.blockchain.validate_chain().valid)
+
+    def test_reward_within_template_limits(self):
+        """Test the reward takes the place of a template transaction when the template is full"""
+        self.blockchain.template.max_transactions = 2
+        for amount in range(1, 4):
+            self.blockchain.prove_transaction(self.user1.start_transaction(self.user2.get_address(), amount, fee=1))
+        self.blockchain.mine_pending_transactions(miner_address="0xminer")
+        block = self.blockchain.get_last_block()
+        self.assertEqual([tx.sender for tx in block.transactions], [REWARD, self.user1.get_address()])
+        self.assertEqual(self.blockchain.get_balance("0xminer"), 1)
+        self.assertEqual(len(self.blockchain.pending_transactions), 2)
+
+    def test_block_size_limit(self):
+        """Test a mempool larger than the template limit is mined over several blocks"""
+        self.blockchain.template.max_transactions = 2
+        for amount in range(1, 6):
+            self.blockchain.prove_transaction(self.user1.start_transaction(self.user2.get_address(), amount))
+        self.blockchain.mine_pending_transactions()
+        self.assertEqual(len(self.blockchain.get_last_block().transactions), 2)
+        self.assertEqual(len(self.blockchain.pending_transactions), 3)
+        self.blockchain.mine_pending_transactions()
+        self.blockchain.mine_pending_transactions()
+        self.assertEqual(len(self.blockchain.pending_transactions), 0)
+
+    def test_intra_block_overdraft_rejected(self):
+        """Test two spends that each fit the balance but not together are rejected as a block"""
+        balances = dict(self.blockchain.state.balances)
+        spends = [self.user1.start_transaction(self.user2.get_address(), 60) for _ in range(2)]
+        block = Block(len(self.blockchain.chain), spends, time.time(), self.blockchain.get_last_block().hash)
+        block.mine(difficulty=2)
+        self.assertFalse(self.blockchain.add_block(block))
+        self.assertEqual(self.blockchain.state.balances, balances)
+
+        spends = [self.user1.start_transaction(self.user2.get_address(), 40, fee=10) for _ in range(2)]
+        block = Block(len(self.blockchain.chain), spends, time.time(), self.blockchain.get_last_block().hash)
+        block.mine(difficulty=2)
+        self.assertTrue(self.blockchain.add_block(block))
+        self.assertEqual(self.blockchain.get_balance(self.user1.get_address()), 0)
+        self.assertTrue(self.blockchain.verify_state())
+
+    def test_duplicate_transaction_rejected(self):
+        """Test a transaction is applied only once, within a block and across the chain"""
+        tx = self.user1.start_transaction(self.user2.get_address(), 30)
+        block = Block(len(self.blockchain.chain), [tx, tx], time.time(), self.blockchain.get_last_block().hash)
+        block.mine(difficulty=2)
+        self.assertFalse(self.blockchain.add_block(block))
+        self.assertEqual(self.blockchain.get_balance(self.user1.get_address()), 100)
+
+        self.blockchain.prove_transaction(tx)
+        self.blockchain.mine_pending_transactions()
+        copy = Transaction.restore(tx.transaction_id, tx.timestamp, tx.sender, tx.receiver,
+                                   tx.amount, TransactionState.SIGNED, tx.signature)
+        block = Block(len(self.blockchain.chain), [copy], time.time(), self.blockchain.get_last_block().hash)
+        block.mine(difficulty=2)
+        self.assertFalse(self.blockchain.add_block(block))
+        self.assertEqual(self.blockchain.get_balance(self.user1.get_address()), 70)
+
+    def test_confirmed_transaction_not_readmitted(self):
+        """Test a resubmitted copy of a confirmed transaction stays out of the mempool"""
+        tx = self.user1.start_transaction(self.user2.get_address(), 30)
+        self.blockchain.prove_transaction(tx)
+        self.blockchain.mine_pending_transactions()
+        copy = Transaction.from_dict(tx.to_dict())
+        copy.state = TransactionState.STARTED
+        self.blockchain.prove_transaction(copy)
+        self.assertNotIn(copy, self.blockchain.pending_transactions)
+        self.assertEqual(copy.state, TransactionState.STARTED)
+
+    def test_badly_signed_transaction_left_out_of_mined_block(self):
+        """Test signatures are checked before mining and a forged transaction is dropped"""
+        good = self.user1.start_transaction(self.user2.get_address(), 5)
+        other = self.user1.start_transaction(self.user2.get_address(), 6)
+        forged = Transaction.restore(other.transaction_id, other.timestamp, other.sender, other.receiver,
+                                     other.amount, other.state, good.signature)
+        self.blockchain.pending_transactions.append(good)
+        self.blockchain.pending_transactions.append(forged)
+        self.blockchain.mine_pending_transactions()
+
+        block = self.blockchain.get_last_block()
+        self.assertEqual([tx.transaction_id for tx in block.transactions], [good.transaction_id])
+        self.assertNotIn(forged, self.blockchain.pending_transactions)
+        self.assertTrue(self.blockchain.validate_chain().valid)
+
+    def test_prechecked_block_still_checked_against_chain(self):
+        """Test a prechecked block is still rejected for overdrafts and bad linkage"""
+        spends = [self.user1.start_transaction(self.user2.get_address(), 60) for _ in range(2)]
+        block = Block(len(self.blockchain.chain), spends, time.time(), self.blockchain.get_last_block().hash)
+        block.mine(difficulty=2)
+        self.assertTrue(self.blockchain.precheck_block(block))
+        self.assertFalse(self.blockchain.add_block(block, prechecked=True))
+
+        spend = self.user1.start_transaction(self.user2.get_address(), 10)
+        block = Block(len(self.blockchain.chain) + 1, [spend], time.time(), self.blockchain.get_last_block().hash)
+        block.mine(difficulty=2)
+        self.assertFalse(self.blockchain.add_block(block, prechecked=True))
+
+        block = Block(len(self.blockchain.chain), [spend], time.time(), self.blockchain.get_last_block().hash)
+        block.mine(difficulty=2)
+        block.transactions.append(self.user1.start_transaction(self.user2.get_address(), 1))
+        self.assertFalse(self.blockchain.precheck_block(block))
+
+    def test_transaction_with_mismatched_id_rejected(self):
+        """Test a copy of a verified transaction with other fields is neither admitted nor mined"""
+        user3 = User()
+        self.blockchain.register_user(user3)
+        self.blockchain.mine_pending_transactions()
+        tx = self.user1.start_transaction(self.user2.get_address(), 10)
+        self.blockchain.prove_transaction(tx)
+        copy = Transaction.restore(tx.transaction_id, tx.timestamp, tx.sender, user3.get_address(),
+                                   90, TransactionState.SIGNED, tx.signature)
+        self.assertFalse(copy.has_valid_id())
+        self.assertFalse(self.blockchain.validate_transaction(copy))
+
+        block = Block(len(self.blockchain.chain), [copy], time.time(), self.blockchain.get_last_block().hash)
+        block.mine(difficulty=2)
+        self.assertFalse(self.blockchain.add_block(block))
+        self.assertEqual(self.blockchain.get_balance(user3.get_address()), 100)
+
+    def test_inclusion_proof(self):
+        """Test a light client can check inclusion with just the header and a proof"""
+        txs = [self.user1.start_transaction(self.user2.get_address(), i) for i in range(1, 6)]
+        for tx in txs:
+            self.blockchain.pending_transactions.append(tx)
+        self.blockchain.mine_pending_transactions()
+
+        header, proof = self.blockchain.get_inclusion_proof(txs[3].transaction_id)
+        self.assertEqual(header.hash, self.blockchain.get_last_block().hash)
+        target = self.blockchain.tree.target(header.hash)
+        self.assertTrue(verify_inclusion(txs[3], proof, header, target))
+        self.assertFalse(verify_inclusion(txs[2], proof, header, target))
+
+        # a genuine hash without the proof of work proves nothing
+        header.nonce = 0
+        header.hash = header.compute_hash()
+        while int(header.hash, 16) <= target:
+            header.nonce += 1
+            header.hash = header.compute_hash()
+        self.assertFalse(verify_inclusion(txs[3], proof, header, target))
+
+    def test_block_hash_commits_to_unsigned_amounts(self):
+        """Test changing the amount of a system transaction changes the block hash"""
+        self.blockchain.register_user(User())
+        self.blockchain.mine_pending_transactions()
+        block = self.blockchain.get_last_block()
+        grant = block.transactions[0]
+        self.assertEqual(grant.sender, SYSTEM)
+        forged = Transaction.restore(grant.transaction_id, grant.timestamp, grant.sender, grant.receiver,
+                                     10 ** 9, grant.state, grant.signature)
+        relayed = Block.restore(block.index, [forged], block.timestamp, block.previous_hash,
+                                block.nonce, block.hash)
+        self.assertNotEqual(relayed.compute_hash(), block.hash)
+        self.blockchain.remove_last_block()
+        self.assertFalse(self.blockchain.add_block(relayed))
+
 if __name__ == '__main__':
     unittest.main()
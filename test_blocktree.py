@@ -0,0 +1,130 @@
+import time
+import unittest
+from block import Block
+from blockchain import Blockchain
+from blocktree import BlockTree
+from constant import DIFFICULTY, SYSTEM, TransactionState
+from transaction import Transaction
+from user import User
+
+def mine_on(parent, transactions):
+    block = Block(parent.index + 1, transactions, time.time(), parent.hash)
+    block.mine(DIFFICULTY)
+    return block
+
+def branch(parent, length, receiver="miner"):
+    blocks = []
+    for i in range(length):
+        parent = mine_on(parent, [Transaction(SYSTEM, receiver, 1)])
+        blocks.append(parent)
+    return blocks
+
+class TestBlockTree(unittest.TestCase):
+    def setUp(self):
+        self.root = Block(0, [Transaction("genesis", "genesis", 0)], time.time(), "0")
+        self.tree = BlockTree(self.root, max_depth=3)
+
+    def test_fork_point_and_path(self):
+        main = branch(self.root, 3)
+        side = branch(main[0], 3, "other")
+        for block in main + side:
+            self.assertTrue(self.tree.add(block))
+
+        self.assertEqual(self.tree.fork_point(main[-1].hash, side[-1].hash).hash, main[0].hash)
+        self.assertEqual(self.tree.path(main[0].hash, side[-1].hash), side)
+        self.assertGreater(self.tree.work(side[-1].hash), self.tree.work(main[-1].hash))
+
+    def test_unknown_parent_rejected(self):
+        orphan = branch(branch(self.root, 1)[0], 1)[0]
+        self.assertFalse(self.tree.add(orphan))
+
+    def test_remove_drops_descendants(self):
+        blocks = branch(self.root, 3)
+        for block in blocks:
+            self.tree.add(block)
+        self.tree.remove(blocks[1].hash)
+        self.assertIn(blocks[0].hash, self.tree)
+        self.assertNotIn(blocks[2].hash, self.tree)
+
+    def test_prune(self):
+        main = branch(self.root, 6)
+        side = branch(main[0], 1, "other")
+        for block in main + side:
+            self.tree.add(block)
+        self.tree.prune(main[-1].hash)
+
+        self.assertNotIn(self.root.hash, self.tree)
+        self.assertNotIn(side[0].hash, self.tree)
+        self.assertIn(main[2].hash, self.tree)
+        self.assertEqual(self.tree.fork_point(main[-1].hash, main[3].hash).hash, main[3].hash)
+
+class TestReorg(unittest.TestCase):
+    def setUp(self):
+        self.blockchain = Blockchain()
+        self.user1, self.user2 = User(), User()
+        self.blockchain.register_user(self.user1)
+        self.blockchain.register_user(self.user2)
+        self.blockchain.mine_pending_transactions()
+        self.fork_base = self.blockchain.get_last_block()
+
+    def test_heavier_branch_wins(self):
+        tx = self.user1.start_transaction(self.user2.get_address(), 40)
+        self.blockchain.pending_transactions.append(tx)
+        self.blockchain.mine_pending_transactions()
+        self.assertEqual(self.blockchain.get_balance(self.user1.get_address()), 60)
+        tip = self.blockchain.get_last_block().hash
+
+        side = branch(self.fork_base, 2)
+        self.assertTrue(self.blockchain.add_block(side[0]))
+        # equal work: the first-seen branch stays
+        self.assertEqual(self.blockchain.get_last_block().hash, tip)
+
+        self.assertTrue(self.blockchain.add_block(side[1]))
+        self.assertEqual(self.blockchain.get_last_block().hash, side[1].hash)
+        self.assertEqual(self.blockchain.get_balance(self.user1.get_address()), 100)
+        self.assertEqual(self.blockchain.get_balance("miner"), 2)
+        self.assertTrue(self.blockchain.verify_state())
+        # the rolled-back transaction is pending again
+        self.assertIn(tx, self.blockchain.pending_transactions)
+        self.assertEqual(tx.state, TransactionState.SIGNED)
+        self.assertIsNone(self.blockchain.get_transaction(tx.transaction_id))
+
+        self.blockchain.mine_pending_transactions()
+        self.assertEqual(self.blockchain.get_balance(self.user1.get_address()), 60)
+
+    def test_conflicting_transaction_canceled(self):
+        tx = self.user1.start_transaction(self.user2.get_address(), 80)
+        self.blockchain.pending_transactions.append(tx)
+        self.blockchain.mine_pending_transactions()
+
+        spend = self.user1.start_transaction(self.user2.get_address(), 70)
+        side = [mine_on(self.fork_base, [spend])]
+        side.append(mine_on(side[0], [Transaction(SYSTEM, "miner", 1)]))
+        for block in side:
+            self.assertTrue(self.blockchain.add_block(block))
+
+        self.assertEqual(self.blockchain.get_last_block().hash, side[1].hash)
+        self.assertEqual(spend.state, TransactionState.FIRST_CONFIRMED)
+        self.assertEqual(tx.state, TransactionState.CANCELED)
+        self.assertNotIn(tx, self.blockchain.pending_transactions)
+
+    def test_invalid_branch_restores_chain(self):
+        tx = self.user1.start_transaction(self.user2.get_address(), 10)
+        self.blockchain.pending_transactions.append(tx)
+        self.blockchain.mine_pending_transactions()
+        tip = self.blockchain.get_last_block().hash
+
+        overspend = self.user1.start_transaction(self.user2.get_address(), 500)
+        side = [mine_on(self.fork_base, [overspend])]
+        side.append(mine_on(side[0], [Transaction(SYSTEM, "miner", 1)]))
+        self.blockchain.add_block(side[0])
+        self.assertFalse(self.blockchain.add_block(side[1]))
+
+        self.assertEqual(self.blockchain.get_last_block().hash, tip)
+        self.assertEqual(tx.state, TransactionState.FIRST_CONFIRMED)
+        self.assertEqual(self.blockchain.get_balance(self.user1.get_address()), 90)
+        self.assertNotIn(side[0].hash, self.blockchain.tree)
+        self.assertTrue(self.blockchain.verify_state())
+
+if __name__ == '__main__':
+    unittest.main()
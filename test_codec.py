@@ -0,0 +1,71 @@
+import json
+import time
+import unittest
+from block import Block
+from codec import decode_block, decode_transaction, encode_block, encode_transaction
+from constant import TransactionState
+from transaction import Transaction
+from user import User
+
+class TestCodec(unittest.TestCase):
+    def assertSameTransaction(self, decoded, tx):
+        self.assertEqual(decoded.to_dict(), tx.to_dict())
+
+    def test_transaction_round_trip(self):
+        user = User()
+        tx = user.start_transaction("0xreceiver", 42)
+        decoded, end = decode_transaction(encode_transaction(tx))
+        self.assertSameTransaction(decoded, tx)
+        self.assertEqual(end, len(encode_transaction(tx)))
+
+    def test_unsigned_transaction_round_trip(self):
+        tx = Transaction("sender", "receiver", 7)
+        tx.state = TransactionState.FULLY_CONFIRMED
+        decoded, _ = decode_transaction(encode_transaction(tx))
+        self.assertSameTransaction(decoded, tx)
+        self.assertIsNone(decoded.signature)
+
+    def test_block_round_trip_from_memoryview(self):
+        genesis = Block(0, [Transaction("genesis", "genesis", 0)], time.time(), "0")
+        block = Block(1, [Transaction("a", "b", i) for i in range(3)], time.time(), genesis.hash)
+        block.mine(2)
+
+        buf = bytearray(b'junk') + encode_block(genesis) + encode_block(block)
+        view = memoryview(buf)
+        decoded_genesis, offset = decode_block(view, 4)
+        decoded, end = decode_block(view, offset)
+
+        self.assertEqual(end, len(buf))
+        self.assertEqual(decoded_genesis.previous_hash, "0")
+        self.assertEqual(decoded.to_dict(), block.to_dict())
+        self.assertEqual(decoded.compute_hash(), block.hash)
+
+    def test_smaller_than_json(self):
+        user = User()
+        tx = user.start_transaction("0xreceiver", 42)
+        self.assertLess(len(encode_transaction(tx)), len(json.dumps(tx.to_dict())) // 2)
+
+    def test_fee_round_trip(self):
+        tx = User().start_transaction("0xreceiver", 42, fee=7)
+        decoded, _ = decode_transaction(encode_transaction(tx))
+        self.assertEqual(decoded.fee, 7)
+        self.assertEqual(decoded.signing_message(), tx.signing_message())
+
+    def test_decodes_version_1(self):
+        tx = User().start_transaction("0xreceiver", 42)
+        encoded = encode_transaction(tx)
+        # version 1 has no fee field (8 bytes after the amount)
+        fixed = 1 + 32 + 8 + 1 + 8
+        v1 = b'\x01' + encoded[1:fixed] + encoded[fixed + 8:]
+        decoded, end = decode_transaction(v1)
+        self.assertEqual(end, len(v1))
+        self.assertSameTransaction(decoded, tx)
+
+    def test_rejects_unknown_version(self):
+        encoded = bytearray(encode_transaction(Transaction("a", "b", 1)))
+        encoded[0] = 99
+        with self.assertRaises(ValueError):
+            decode_transaction(encoded)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from blockchain import Blockchain
+from columnar import np
+from user import User
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestColumnarStore(unittest.TestCase):
+    def setUp(self):
+        self.blockchain = Blockchain()
+        self.users = [User() for _ in range(4)]
+        for user in self.users:
+            self.blockchain.register_user(user)
+        self.blockchain.mine_pending_transactions()
+        self.columns = self.blockchain.columns
+
+    def transfer(self, sender, receiver, amount, fee=0):
+        tx = self.users[sender].start_transaction(self.users[receiver].get_address(), amount, fee)
+        self.blockchain.prove_transaction(tx)
+        self.blockchain.mine_pending_transactions()
+
+    def test_balances_match_account_state(self):
+        self.transfer(0, 1, 30)
+        self.transfer(1, 2, 70, fee=2)
+        self.transfer(3, 0, 5)
+        self.assertEqual(self.columns.balances(), self.blockchain.state.balances)
+        self.assertEqual(len(self.columns), sum(len(b.transactions) for b in self.blockchain.chain))
+
+    def test_follows_removed_blocks(self):
+        self.transfer(0, 1, 30)
+        self.blockchain.remove_last_block()
+        self.assertEqual(self.columns.balances(), self.blockchain.state.balances)
+
+    def test_top_holders(self):
+        self.transfer(0, 1, 30)
+        self.transfer(2, 1, 10)
+        top = self.columns.top_holders(2, exclude=["SYSTEM"])
+        self.assertEqual(top, [(self.users[1].get_address(), 140), (self.users[3].get_address(), 100)])
+
+    def test_volume(self):
+        self.transfer(0, 1, 30)
+        self.transfer(1, 2, 7)
+        chain = self.blockchain.chain
+        self.assertEqual(self.columns.volume(), 400 + 30 + 7)
+        self.assertEqual(self.columns.volume(start=chain[2].timestamp), 37)
+        self.assertEqual(self.columns.volume(start=chain[2].timestamp, end=chain[3].timestamp), 30)
+
+        periods = self.columns.volume_by_period(3600, start=chain[1].timestamp)
+        self.assertEqual(periods, [(chain[1].timestamp, 437)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import time
+import unittest
+from block import Block
+from confirmation import ConfirmationTracker
+from constant import TransactionState
+from transaction import Transaction
+
+def make_block(index):
+    tx = Transaction("alice", "bob", index + 1)
+    tx.state = TransactionState.SIGNED
+    return Block(index, [tx], time.time(), "0")
+
+class TestConfirmationTracker(unittest.TestCase):
+    def setUp(self):
+        self.tracker = ConfirmationTracker(depth=5)
+        self.events = []
+        self.tracker.subscribe(lambda tx, old, new: self.events.append((tx.transaction_id, old, new)))
+
+    def test_promotes_at_depth(self):
+        blocks = [make_block(i) for i in range(1, 8)]
+        first = blocks[0].transactions[0]
+
+        for block in blocks[:5]:
+            self.tracker.block_added(block)
+        self.assertEqual(first.state, TransactionState.FIRST_CONFIRMED)
+
+        self.tracker.block_added(blocks[5])
+        self.assertEqual(first.state, TransactionState.FULLY_CONFIRMED)
+        self.assertEqual(blocks[1].transactions[0].state, TransactionState.FIRST_CONFIRMED)
+
+        self.tracker.block_added(blocks[6])
+        self.assertEqual(blocks[1].transactions[0].state, TransactionState.FULLY_CONFIRMED)
+        self.assertEqual(self.events[-1][2], TransactionState.FULLY_CONFIRMED)
+
+    def test_removed_block_is_canceled(self):
+        block = make_block(1)
+        self.tracker.block_added(block)
+        self.tracker.block_removed(block)
+
+        tx = block.transactions[0]
+        self.assertEqual(tx.state, TransactionState.CANCELED)
+        self.assertEqual(self.events, [
+            (tx.transaction_id, TransactionState.SIGNED, TransactionState.FIRST_CONFIRMED),
+            (tx.transaction_id, TransactionState.FIRST_CONFIRMED, TransactionState.CANCELED),
+        ])
+
+    def test_per_transaction_subscription(self):
+        block = make_block(1)
+        other = make_block(2)
+        tx = block.transactions[0]
+        seen = []
+        listener = lambda tx, old, new: seen.append(new)
+        self.tracker.subscribe(listener, tx.transaction_id)
+
+        self.tracker.block_added(block)
+        self.tracker.block_added(other)
+        self.assertEqual(seen, [TransactionState.FIRST_CONFIRMED])
+
+        self.tracker.unsubscribe(listener, tx.transaction_id)
+        self.tracker.block_removed(other)
+        self.tracker.block_removed(block)
+        self.assertEqual(seen, [TransactionState.FIRST_CONFIRMED])
+
+if __name__ == '__main__':
+    unittest.main()
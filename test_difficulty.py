@@ -0,0 +1,126 @@
+import hashlib
+import time
+import unittest
+from block import Block
+from blockchain import Blockchain
+from constant import SYSTEM
+from difficulty import (MAX_TARGET, Retargeting, block_work, meets_target, retarget,
+                        target_from_zeros)
+from transaction import Transaction
+from validation import ChainValidator
+
+class TestTargets(unittest.TestCase):
+    def test_zeros_target_matches_prefix_rule(self):
+        hashes = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(5000)]
+        hashes += ['0' * 64, '00' + 'f' * 62, '0' * 3 + '1' + '0' * 60]
+        for zeros in range(1, 5):
+            target = target_from_zeros(zeros)
+            for block_hash in hashes:
+                self.assertEqual(meets_target(block_hash, target), block_hash.startswith('0' * zeros))
+
+    def test_block_work(self):
+        self.assertEqual(block_work(target_from_zeros(2)), 16 ** 2)
+        self.assertEqual(block_work(MAX_TARGET), 1)
+        # work is inversely proportional to the target
+        self.assertEqual(block_work(target_from_zeros(2) // 2), 2 * 16 ** 2)
+
+    def test_retarget_scales_and_clamps(self):
+        target = target_from_zeros(2)
+        self.assertEqual(retarget(target, 50, 100), target // 2)
+        self.assertEqual(retarget(target, 150, 100), target * 3 // 2)
+        self.assertEqual(retarget(target, 1, 100), target // 4)
+        self.assertEqual(retarget(target, -20, 100), target // 4)
+        self.assertEqual(retarget(target, 1000, 100), target * 4)
+        self.assertEqual(retarget(MAX_TARGET, 1000, 100), MAX_TARGET)
+        self.assertEqual(retarget(1, 1, 100), 1)
+
+class TestRetargeting(unittest.TestCase):
+    def test_target_changes_only_at_boundaries(self):
+        rules = Retargeting(initial_target=1 << 200, interval=10, block_interval=60)
+        # every block took 30 seconds instead of 60
+        timestamp_at = lambda height: height * 30.0
+        self.assertEqual(rules.next_target(1 << 200, 9, timestamp_at), 1 << 200)
+        self.assertEqual(rules.next_target(1 << 200, 10, timestamp_at), 1 << 199)
+        self.assertEqual(rules.next_target(1 << 199, 11, timestamp_at), 1 << 199)
+        self.assertEqual(rules.target_at(25, timestamp_at), 1 << 198)
+        self.assertEqual(Retargeting(interval=0).target_at(1000, timestamp_at), Retargeting().initial_target)
+        # replaying from a known target only reads the windows after it
+        for known_height in (10, 14):
+            self.assertEqual(rules.target_at(25, timestamp_at, known_height, 1 << 199), 1 << 198)
+        self.assertEqual(rules.target_at(19, timestamp_at, 19, 1 << 150), 1 << 150)
+
+    def test_block_interval_converges_at_any_hashrate(self):
+        rules = Retargeting(interval=10, block_interval=60)
+        for hashrate in (1.0, 1e3, 1e6):
+            target, timestamps = rules.initial_target, [0.0]
+            for height in range(1, 200):
+                target = rules.next_target(target, height, timestamps.__getitem__)
+                # each block takes its expected number of attempts at this hashrate
+                timestamps.append(timestamps[-1] + block_work(target) / hashrate)
+            average = (timestamps[-1] - timestamps[-11]) / 10
+            self.assertAlmostEqual(average, 60, delta=1, msg=f"hashrate {hashrate}")
+
+    def test_timestamp_bounds(self):
+        rules = Retargeting(median_time_span=5, max_future_drift=60)
+        # out of order, as miners' clocks allow; the median of 20..24 is 22
+        timestamps = [0.0, 10.0, 20.0, 24.0, 21.0, 23.0, 22.0]
+        self.assertEqual(rules.median_time_past(7, timestamps.__getitem__), 22.0)
+        self.assertEqual(rules.median_time_past(1, timestamps.__getitem__), 0.0)
+        self.assertFalse(rules.timestamp_valid(22.0, 7, timestamps.__getitem__, now=100.0))
+        self.assertTrue(rules.timestamp_valid(22.5, 7, timestamps.__getitem__, now=100.0))
+        self.assertTrue(rules.timestamp_valid(160.0, 7, timestamps.__getitem__, now=100.0))
+        self.assertFalse(rules.timestamp_valid(160.5, 7, timestamps.__getitem__, now=100.0))
+
+class TestBlockchainRetargeting(unittest.TestCase):
+    def setUp(self):
+        # blocks here take milliseconds, so the first retarget is clamped
+        self.rules = Retargeting(interval=3, block_interval=60)
+        self.blockchain = Blockchain(retargeting=self.rules)
+        for _ in range(2):
+            self.mine()
+
+    def mine(self):
+        self.blockchain.pending_transactions.append(Transaction(SYSTEM, "miner", 1))
+        self.blockchain.mine_pending_transactions()
+
+    def test_target_tightens_after_fast_blocks(self):
+        tip = self.blockchain.get_last_block()
+        self.assertEqual(self.blockchain.next_target(tip), self.rules.initial_target // 4)
+
+        self.mine()
+        tip = self.blockchain.get_last_block()
+        self.assertEqual(tip.index, 3)
+        self.assertTrue(meets_target(tip.hash, self.rules.initial_target // 4))
+        self.assertGreater(self.blockchain.tree.work(tip.hash) - self.blockchain.tree.work(tip.previous_hash),
+                           block_work(self.rules.initial_target))
+        self.assertTrue(self.blockchain.validate_chain().valid)
+
+    def test_block_at_stale_target_rejected(self):
+        tip = self.blockchain.get_last_block()
+        hard = self.blockchain.next_target(tip)
+        block = Block(tip.index + 1, [Transaction(SYSTEM, "miner", 1)], time.time(), tip.hash)
+        while True:
+            block.mine(target=self.rules.initial_target)
+            if not meets_target(block.hash, hard):
+                break
+            block.nonce += 1
+            block.hash = block.compute_hash()
+
+        self.assertFalse(self.blockchain.add_block(block))
+        self.assertEqual(self.blockchain.get_last_block().hash, tip.hash)
+
+    def test_block_timestamps_bounded(self):
+        tip = self.blockchain.get_last_block()
+        target = self.blockchain.next_target(tip)
+        for timestamp in (time.time() + 3600, self.blockchain.chain[1].timestamp):
+            block = Block(tip.index + 1, [Transaction(SYSTEM, "miner", 1)], timestamp, tip.hash)
+            block.mine(target=target)
+            self.assertFalse(self.blockchain.add_block(block))
+
+            chain = list(self.blockchain.chain) + [block]
+            result = ChainValidator(self.blockchain.public_key_of, retargeting=self.rules).validate(chain)
+            self.assertIn("timestamp out of range", result.error)
+        self.assertEqual(self.blockchain.get_last_block().hash, tip.hash)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from mempool import Mempool
+from transaction import Transaction
+
+class TestMempool(unittest.TestCase):
+    def setUp(self):
+        self.mempool = Mempool()
+
+    def test_add_and_index(self):
+        tx1 = Transaction("alice", "bob", 10)
+        tx2 = Transaction("alice", "carol", 5)
+        tx3 = Transaction("bob", "carol", 7)
+        for tx in (tx1, tx2, tx3):
+            self.assertTrue(self.mempool.add(tx))
+
+        self.assertEqual(len(self.mempool), 3)
+        self.assertIn(tx2, self.mempool)
+        self.assertIs(self.mempool.get(tx3.transaction_id), tx3)
+        self.assertEqual(self.mempool.get_by_sender("alice"), [tx1, tx2])
+        self.assertEqual(self.mempool.pending_spent("alice"), 15)
+        self.assertEqual(self.mempool.pending_spent("bob"), 7)
+
+    def test_duplicate_rejected(self):
+        tx = Transaction("alice", "bob", 10)
+        self.assertTrue(self.mempool.add(tx))
+        self.assertFalse(self.mempool.add(tx))
+        self.assertEqual(len(self.mempool), 1)
+        self.assertEqual(self.mempool.pending_spent("alice"), 10)
+
+    def test_remove_updates_totals(self):
+        tx1 = Transaction("alice", "bob", 10)
+        tx2 = Transaction("alice", "bob", 20)
+        self.mempool.add(tx1)
+        self.mempool.add(tx2)
+
+        self.assertIs(self.mempool.remove(tx1.transaction_id), tx1)
+        self.assertIsNone(self.mempool.remove(tx1.transaction_id))
+        self.assertEqual(self.mempool.pending_spent("alice"), 20)
+        self.mempool.remove(tx2.transaction_id)
+        self.assertEqual(self.mempool.pending_spent("alice"), 0)
+        self.assertEqual(self.mempool.size_bytes, 0)
+
+    def test_size_cap_evicts_oldest(self):
+        mempool = Mempool(max_size=2)
+        txs = [Transaction("alice", "bob", i) for i in range(3)]
+        for tx in txs:
+            mempool.add(tx)
+
+        self.assertNotIn(txs[0], mempool)
+        self.assertEqual(mempool.select(), txs[1:])
+        self.assertEqual(mempool.pending_spent("alice"), 3)
+
+    def test_byte_cap_evicts_oldest(self):
+        tx_size = Mempool.transaction_size(Transaction("alice", "bob", 1))
+        mempool = Mempool(max_bytes=tx_size * 2 + 1)
+        txs = [Transaction("alice", "bob", i) for i in range(1, 4)]
+        for tx in txs:
+            mempool.add(tx)
+
+        self.assertEqual(len(mempool), 2)
+        self.assertLessEqual(mempool.size_bytes, mempool.max_bytes)
+
+    def test_select_limit(self):
+        txs = [Transaction("alice", "bob", i) for i in range(5)]
+        for tx in txs:
+            self.mempool.add(tx)
+        self.assertEqual(self.mempool.select(2), txs[:2])
+        self.assertEqual(self.mempool.select(), txs)
+
+if __name__ == '__main__':
+    unittest.main()
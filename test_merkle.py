@@ -0,0 +1,36 @@
+import hashlib
+import unittest
+from merkle import EMPTY_ROOT, merkle_proof, merkle_root, verify_proof
+
+def leaves(count):
+    return [hashlib.sha256(str(i).encode()).digest() for i in range(count)]
+
+class TestMerkle(unittest.TestCase):
+    def test_proofs_for_every_leaf(self):
+        for count in range(1, 12):
+            items = leaves(count)
+            root = merkle_root(items)
+            for index, leaf in enumerate(items):
+                proof = merkle_proof(items, index)
+                self.assertTrue(verify_proof(leaf, proof, root), (count, index))
+                self.assertLessEqual(len(proof), count.bit_length())
+
+    def test_wrong_leaf_or_root_rejected(self):
+        items = leaves(5)
+        root = merkle_root(items)
+        proof = merkle_proof(items, 2)
+        self.assertFalse(verify_proof(items[3], proof, root))
+        self.assertFalse(verify_proof(items[2], proof, merkle_root(leaves(6))))
+
+    def test_odd_leaf_not_duplicated(self):
+        items = leaves(3)
+        self.assertNotEqual(merkle_root(items), merkle_root(items + items[-1:]))
+
+    def test_single_and_empty(self):
+        item = leaves(1)
+        self.assertEqual(merkle_root(item), item[0].hex())
+        self.assertEqual(merkle_proof(item, 0), [])
+        self.assertEqual(merkle_root([]), EMPTY_ROOT)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import urllib.request
+import metrics
+from blockchain import Blockchain
+from user import User
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        metrics.enable()
+
+    def tearDown(self):
+        metrics.disable()
+        metrics.reset()
+
+    def test_disabled_updates_are_dropped(self):
+        metrics.disable()
+        metrics.MEMPOOL_ADDED.inc()
+        metrics.MEMPOOL_TRANSACTIONS.set(5)
+        metrics.MINE_SECONDS.observe(0.1)
+        self.assertEqual(metrics.start_timer(), 0.0)
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["mempool_added_total"], 0)
+        self.assertEqual(snapshot["mempool_transactions"], 0)
+        self.assertEqual(snapshot["mine_seconds"]["count"], 0)
+
+    def test_histogram_buckets_are_cumulative(self):
+        for value in (0.00002, 0.0003, 0.0003, 20.0):
+            metrics.VALIDATE_BLOCK_SECONDS.observe(value)
+        data = metrics.snapshot()["validate_block_seconds"]
+        self.assertEqual(data["count"], 4)
+        self.assertAlmostEqual(data["sum"], 20.00062)
+        self.assertEqual(data["buckets"][0.00001], 0)
+        self.assertEqual(data["buckets"][0.00005], 1)
+        self.assertEqual(data["buckets"][0.0005], 3)
+        self.assertEqual(data["buckets"][10.0], 3)
+        self.assertEqual(data["buckets"][float("inf")], 4)
+
+    def test_prometheus_text(self):
+        metrics.BLOCKS_ADDED.inc(3)
+        metrics.SIGNATURE_VERIFY_SECONDS.observe(0.002)
+        text = metrics.render()
+        self.assertIn("# TYPE blocks_added_total counter\nblocks_added_total 3\n", text)
+        self.assertIn('signature_verify_seconds_bucket{le="0.005"} 1', text)
+        self.assertIn('signature_verify_seconds_bucket{le="+Inf"} 1', text)
+        self.assertIn("signature_verify_seconds_count 1", text)
+
+    def test_http_endpoint(self):
+        server = metrics.start_http_server(port=0)
+        try:
+            metrics.CHAIN_HEIGHT.set(7)
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                body = response.read().decode()
+            self.assertIn("chain_height 7", body)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_blockchain_is_instrumented(self):
+        blockchain = Blockchain()
+        sender, receiver = User(), User()
+        blockchain.register_user(sender)
+        blockchain.register_user(receiver)
+        self.assertEqual(metrics.snapshot()["mempool_transactions"], 2)
+        blockchain.mine_pending_transactions()
+        tx = sender.start_transaction(receiver.get_address(), 10)
+        blockchain.prove_transaction(tx)
+        blockchain.mine_pending_transactions()
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["blocks_added_total"], 2)
+        self.assertEqual(snapshot["chain_height"], 2)
+        self.assertEqual(snapshot["mempool_added_total"], 3)
+        self.assertEqual(snapshot["mempool_transactions"], 0)
+        self.assertGreater(snapshot["mine_hashes_total"], 0)
+        self.assertEqual(snapshot["mine_seconds"]["count"], 2)
+        self.assertEqual(snapshot["add_block_seconds"]["count"], 2)
+        self.assertEqual(snapshot["validate_block_seconds"]["count"], 2)
+        self.assertEqual(snapshot["signature_verify_seconds"]["count"], 1)
+        self.assertEqual(snapshot["signature_batch_seconds"]["count"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
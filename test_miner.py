@@ -0,0 +1,68 @@
+import threading
+import time
+import unittest
+from block import Block
+from blockchain import Blockchain
+from miner import ParallelMiner
+from transaction import Transaction
+from user import User
+
+class TestParallelMiner(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.miner = ParallelMiner(workers=2, check_interval=256)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.miner.shutdown()
+
+    def test_mine_finds_valid_hash(self):
+        block = Block(1, [Transaction("alice", "bob", 10)], time.time(), "0")
+        result = self.miner.mine(block, 3)
+
+        self.assertTrue(result.found)
+        self.assertTrue(block.hash.startswith('000'))
+        self.assertEqual(block.hash, block.compute_hash())
+        self.assertEqual(len(result.workers), 2)
+        self.assertGreater(result.hashrate, 0)
+
+    def test_cancel_stops_workers(self):
+        block = Block(1, [Transaction("alice", "bob", 10)], time.time(), "0")
+        original_hash = block.hash
+        threading.Timer(0.2, self.miner.cancel).start()
+        # unreachable difficulty, so only cancellation can end the run
+        result = self.miner.mine(block, 64)
+
+        self.assertFalse(result.found)
+        self.assertEqual(block.hash, original_hash)
+        self.assertGreater(result.attempts, 0)
+
+    def test_cancel_before_run_starts(self):
+        block = Block(1, [Transaction("alice", "bob", 10)], time.time(), "0")
+        results = []
+        generation = self.miner._generation
+        # hold the run lock so mine() is called but cannot start its workers yet
+        with self.miner._lock:
+            thread = threading.Thread(target=lambda: results.append(self.miner.mine(block, 64)))
+            thread.start()
+            while self.miner._generation == generation:
+                time.sleep(0.001)
+            self.miner.cancel()
+        thread.join(timeout=10)
+
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(results[0].found)
+        # a run called after the cancel is not affected by it
+        self.assertTrue(self.miner.mine(block, 2).found)
+
+    def test_blockchain_uses_parallel_miner(self):
+        blockchain = Blockchain()
+        user = User()
+        blockchain.register_user(user)
+        blockchain.mine_pending_transactions(miner=self.miner)
+
+        self.assertEqual(len(blockchain.chain), 2)
+        self.assertEqual(blockchain.get_balance(user.get_address()), 100)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+import asyncio
+import pytest
+from blockchain import Blockchain
+from codec import encode_block, encode_transaction
+from constant import SYSTEM
+from node import _FRAME_HEADER, _ITEM_HEADER, MSG_BLOCK, MSG_TRANSACTION, Node, SeenSet
+from transaction import Transaction
+from user import User
+
+async def wait_for(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not reached in time")
+        await asyncio.sleep(0.01)
+
+@pytest.fixture
+def users():
+    return [User(), User()]
+
+async def start_network(users, count):
+    """Start `count` nodes connected in a line, sharing one user registry"""
+    registry = {user.address: user for user in users}
+    nodes = []
+    for _ in range(count):
+        blockchain = Blockchain()
+        blockchain.user_registry = registry
+        nodes.append(Node(blockchain))
+    for node in nodes:
+        await node.start()
+    for left, right in zip(nodes, nodes[1:]):
+        await left.connect(right.host, right.port)
+    await wait_for(lambda: all(len(node.peers) == (1 if i in (0, count - 1) else 2)
+                               for i, node in enumerate(nodes)))
+    return nodes
+
+async def fund(nodes, users):
+    """Mine the registration rewards on the first node and wait for the block everywhere"""
+    origin = nodes[0].blockchain
+    for user in users:
+        origin.register_user(user)
+    origin.mine_pending_transactions()
+    await nodes[0].broadcast_block(origin.get_last_block())
+    await wait_for(lambda: all(len(node.blockchain.chain) == 2 for node in nodes))
+
+def test_seen_set_is_bounded():
+    seen = SeenSet(capacity=2)
+    assert seen.add("a")
+    assert not seen.add("a")
+    seen.add("b")
+    seen.add("c")
+    assert "a" not in seen
+    assert len(seen) == 2
+
+class TestNode:
+    @pytest.mark.asyncio
+    async def test_block_and_transaction_gossip(self, users):
+        nodes = await start_network(users, 4)
+        try:
+            await fund(nodes, users)
+            sender, receiver = users
+            nodes[0].attach(sender)
+            tx = sender.start_transaction(receiver.get_address(), 25)
+            await asyncio.wrap_future(nodes[0].submit_transaction(tx))
+
+            await wait_for(lambda: all(
+                node.blockchain.pending_transactions.get(tx.transaction_id) is not None
+                for node in nodes
+            ))
+            assert all(node.blockchain.get_balance(sender.get_address()) == 100 for node in nodes)
+
+            # the last node mines it and the block travels back along the line
+            last = nodes[-1].blockchain
+            last.mine_pending_transactions()
+            await nodes[-1].broadcast_block(last.get_last_block())
+            await wait_for(lambda: all(
+                node.blockchain.get_balance(sender.get_address()) == 75 for node in nodes
+            ))
+            assert all(len(node.blockchain.pending_transactions) == 0 for node in nodes)
+        finally:
+            for node in nodes:
+                await node.stop()
+
+    @pytest.mark.asyncio
+    async def test_duplicates_dropped(self, users):
+        nodes = await start_network(users, 3)
+        # close the line into a ring so every message arrives twice
+        await nodes[2].connect(nodes[0].host, nodes[0].port)
+        try:
+            await fund(nodes, users)
+            seen = []
+            nodes[1].listeners.append(lambda kind, message: seen.append(kind))
+            dropped = sum(node.duplicates_dropped for node in nodes)
+            tx = users[0].start_transaction(users[1].get_address(), 5)
+            await nodes[0].broadcast_transaction(tx)
+
+            await wait_for(lambda: all(tx in node.blockchain.pending_transactions for node in nodes))
+            await wait_for(lambda: sum(node.duplicates_dropped for node in nodes) > dropped)
+            assert seen.count(MSG_TRANSACTION) == 1
+            assert MSG_BLOCK not in seen
+        finally:
+            for node in nodes:
+                await node.stop()
+
+    @pytest.mark.asyncio
+    async def test_rejected_messages_not_marked_seen(self, users):
+        nodes = await start_network(users, 2)
+        try:
+            await fund(nodes, users)
+            origin, receiver = nodes[0], nodes[1]
+
+            def delivered(count):
+                expected = receiver.messages_received + count
+                return lambda: receiver.messages_received == expected
+
+            # a forged transaction carrying the id of a real one
+            tx = users[0].start_transaction(users[1].get_address(), 5)
+            forged = Transaction.restore(tx.transaction_id, tx.timestamp, tx.sender, tx.receiver,
+                                         50, tx.state, tx.signature)
+            arrived = delivered(1)
+            origin._relay(MSG_TRANSACTION, encode_transaction(forged))
+            await wait_for(arrived)
+            origin._relay(MSG_TRANSACTION, encode_transaction(tx))
+            await wait_for(lambda: tx in receiver.blockchain.pending_transactions)
+
+            # a block that arrives before its parent is accepted once the parent is in
+            chain = origin.blockchain
+            for amount in (1, 2):
+                chain.pending_transactions.append(Transaction(SYSTEM, users[0].get_address(), amount))
+                chain.mine_pending_transactions()
+            parent, child = chain.chain[-2], chain.chain[-1]
+            arrived = delivered(1)
+            origin._relay(MSG_BLOCK, encode_block(child))
+            await wait_for(arrived)
+            assert len(receiver.blockchain.chain) == 2
+            origin._relay(MSG_BLOCK, encode_block(parent))
+            origin._relay(MSG_BLOCK, encode_block(child))
+            await wait_for(lambda: receiver.blockchain.get_last_block().hash == child.hash)
+        finally:
+            for node in nodes:
+                await node.stop()
+
+    @pytest.mark.asyncio
+    async def test_malformed_frame_drops_peer(self, users):
+        node = Node(Blockchain())
+        try:
+            await node.start()
+            reader, writer = await asyncio.open_connection(node.host, node.port)
+            await wait_for(lambda: len(node.peers) == 1)
+            # an item claiming to be a block, with a body that is not one
+            body = _ITEM_HEADER.pack(MSG_BLOCK, 3) + b'\x02\x00\x00'
+            writer.write(_FRAME_HEADER.pack(len(body)) + body)
+            await writer.drain()
+            await wait_for(lambda: not node.peers)
+            assert node.malformed_frames == 1
+            assert await reader.read() == b''
+            writer.close()
+        finally:
+            await node.stop()
+
+    @pytest.mark.asyncio
+    async def test_full_peer_queue_drops_instead_of_blocking(self, users):
+        nodes = [Node(Blockchain(), queue_size=2) for _ in range(2)]
+        try:
+            for node in nodes:
+                await node.start()
+            await nodes[0].connect(nodes[1].host, nodes[1].port)
+            await wait_for(lambda: len(nodes[1].peers) == 1)
+            received = nodes[1].messages_received
+            # no await in between, so the writer task cannot drain the queue
+            for amount in range(1, 6):
+                tx = users[0].start_transaction(users[1].get_address(), amount)
+                nodes[0]._relay(MSG_TRANSACTION, encode_transaction(tx))
+            assert nodes[0].messages_dropped == 3
+            await wait_for(lambda: nodes[1].messages_received == received + 2)
+        finally:
+            for node in nodes:
+                await node.stop()
+
+    @pytest.mark.asyncio
+    async def test_user_broadcast_requires_node(self, users):
+        tx = users[0].start_transaction(users[1].get_address(), 5)
+        with pytest.raises(RuntimeError):
+            users[0].broadcast_transaction(tx)
@@ -0,0 +1,57 @@
+import unittest
+from blockchain import Blockchain
+from codec import decode_block, encode_block
+from pipeline import BlockPipeline
+from transaction import Transaction
+from user import User
+import consensus
+
+def received(block):
+    """A copy of the block as another node decodes it"""
+    copy, _ = decode_block(encode_block(block))
+    for tx in copy.transactions:
+        consensus.receive(tx)
+    return copy
+
+class TestBlockPipeline(unittest.TestCase):
+    def setUp(self):
+        self.source = Blockchain()
+        self.user1, self.user2 = User(), User()
+        self.source.register_user(self.user1)
+        self.source.register_user(self.user2)
+        self.source.mine_pending_transactions()
+        for amount in range(1, 7):
+            self.source.prove_transaction(self.user1.start_transaction(self.user2.get_address(), amount))
+            self.source.prove_transaction(self.user2.start_transaction(self.user1.get_address(), amount))
+            self.source.mine_pending_transactions()
+        self.blocks = [received(self.source.chain[h]) for h in range(1, len(self.source.chain))]
+        self.node = Blockchain()
+        self.node.user_registry = dict(self.source.user_registry)
+        self.pipeline = BlockPipeline(self.node, depth=2)
+
+    def tearDown(self):
+        self.pipeline.shutdown()
+
+    def test_adds_blocks_in_order(self):
+        self.assertEqual(self.pipeline.add_blocks(self.blocks), len(self.blocks))
+        self.assertEqual(self.node.get_last_block().hash, self.source.get_last_block().hash)
+        self.assertEqual(self.node.state.balances, self.source.state.balances)
+        self.assertTrue(self.node.validate_chain().valid)
+
+    def test_stops_at_invalid_block(self):
+        tx = self.blocks[3].transactions[0]
+        # same contents, except for a signature over another transaction
+        other = self.blocks[4].transactions[0]
+        self.blocks[3].transactions[0] = Transaction.restore(
+            tx.transaction_id, tx.timestamp, tx.sender, tx.receiver, tx.amount, tx.state, other.signature)
+        self.blocks[3].hash = self.blocks[3].compute_hash()
+        self.blocks[3].mine(difficulty=2)
+        self.assertFalse(self.node.precheck_block(self.blocks[3]))
+
+        self.assertEqual(self.pipeline.add_blocks(self.blocks), 3)
+        self.assertEqual(self.node.get_last_block().hash, self.blocks[2].hash)
+        # the pipeline is reusable after a rejection
+        self.assertEqual(self.pipeline.add_blocks([]), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+from block import Block, BlockHeader
+from blockchain import Blockchain
+from codec import decode_block, decode_transaction, encode_block, encode_transaction
+from snapshot import StateSnapshot
+from user import User
+from validation import ChainValidator
+import consensus
+
+class TestPruning(unittest.TestCase):
+    def setUp(self):
+        self.blockchain = Blockchain()
+        self.blockchain.tree.max_depth = 2
+        self.user1, self.user2 = User(), User()
+        self.blockchain.register_user(self.user1)
+        self.blockchain.register_user(self.user2)
+        self.blockchain.mine_pending_transactions()
+        self.txs = []
+        for amount in range(1, 8):
+            tx = self.user1.start_transaction(self.user2.get_address(), amount)
+            self.blockchain.prove_transaction(tx)
+            self.blockchain.mine_pending_transactions()
+            self.txs.append(tx)
+
+    def test_prune_keeps_headers_and_state(self):
+        balances = dict(self.blockchain.state.balances)
+        snapshot = self.blockchain.prune(depth=3)
+
+        self.assertEqual(snapshot.height, 5)
+        self.assertEqual(snapshot.block_hash, self.blockchain.chain[5].hash)
+        self.assertTrue(all(isinstance(self.blockchain.chain[h], BlockHeader) for h in range(6)))
+        self.assertFalse(any(isinstance(self.blockchain.chain[h], BlockHeader) for h in range(6, 9)))
+        self.assertEqual(self.blockchain.state.balances, balances)
+        self.assertEqual(snapshot.balances[self.user1.get_address()], 100 - sum(range(1, 5)))
+        self.assertTrue(self.blockchain.verify_state())
+        result = self.blockchain.validate_chain()
+        self.assertTrue(result.valid, result.error)
+
+        self.assertIsNone(self.blockchain.get_transaction(self.txs[0].transaction_id))
+        self.assertIsNotNone(self.blockchain.get_transaction(self.txs[-1].transaction_id))
+        history, _ = self.blockchain.get_history(self.user1.get_address())
+        self.assertEqual(len(history), 3)
+
+        # mining goes on on top of the pruned chain
+        self.blockchain.prove_transaction(self.user2.start_transaction(self.user1.get_address(), 1))
+        self.blockchain.mine_pending_transactions()
+        self.assertEqual(len(self.blockchain.chain), 10)
+
+    def test_pruned_transaction_not_replayed(self):
+        full = Blockchain()
+        full.user_registry = self.blockchain.user_registry
+        for height in range(1, len(self.blockchain.chain)):
+            block = decode_block(encode_block(self.blockchain.chain[height]))[0]
+            for tx in block.transactions:
+                consensus.receive(tx)
+            self.assertTrue(full.add_block(block))
+        self.blockchain.prune(depth=3)
+
+        # a copy of a transaction confirmed in a pruned block, as received from a peer
+        replay = decode_transaction(encode_transaction(self.txs[0]))[0]
+        consensus.receive(replay)
+        self.blockchain.prove_transaction(replay)
+        self.assertNotIn(replay, self.blockchain.pending_transactions)
+
+        tip = self.blockchain.get_last_block()
+        block = Block(tip.index + 1, [replay], tip.timestamp + 1, tip.hash)
+        block.mine(target=self.blockchain.next_target(tip))
+        # pruned and full nodes agree
+        self.assertFalse(self.blockchain.add_block(block))
+        self.assertFalse(full.add_block(block))
+        self.assertEqual(self.blockchain.get_balance(self.user1.get_address()),
+                         full.get_balance(self.user1.get_address()))
+
+        result = ChainValidator(self.blockchain.public_key_of).validate(
+            list(self.blockchain.chain) + [block], self.blockchain.snapshot)
+        self.assertFalse(result.valid)
+        self.assertIn("duplicate transaction", result.error)
+
+    def test_prune_depth_must_cover_reorgs(self):
+        with self.assertRaises(ValueError):
+            self.blockchain.prune(depth=1)
+        with self.assertRaises(ValueError):
+            Blockchain(prune_depth=1)
+
+    def test_never_removes_into_pruned_blocks(self):
+        self.blockchain.prune(depth=3)
+        for _ in range(3):
+            self.assertIsNotNone(self.blockchain.remove_last_block())
+        self.assertIsNone(self.blockchain.remove_last_block())
+        self.assertEqual(len(self.blockchain.chain), 6)
+        # the header tip can still be built on
+        self.blockchain.prove_transaction(self.user2.start_transaction(self.user1.get_address(), 1))
+        self.blockchain.mine_pending_transactions()
+        self.assertEqual(len(self.blockchain.chain), 7)
+
+    def test_bootstrap_from_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "snapshot.json")
+            self.blockchain.snapshot_path = path
+            self.blockchain.prune(depth=3)
+            snapshot = StateSnapshot.load(path)
+
+        chain = self.blockchain.chain
+        headers = [chain[h] for h in range(snapshot.height + 1)]
+        # blocks go through the codec as they would over the wire
+        blocks = [decode_block(encode_block(chain[h]))[0] for h in range(snapshot.height + 1, len(chain))]
+        node = Blockchain.from_snapshot(snapshot, headers, blocks, user_registry=self.blockchain.user_registry)
+        self.assertIn(self.txs[0].transaction_id, snapshot.transaction_ids)
+
+        self.assertEqual(node.get_last_block().hash, self.blockchain.get_last_block().hash)
+        self.assertEqual(node.state.balances, self.blockchain.state.balances)
+        self.assertTrue(node.verify_state())
+        self.assertTrue(node.validate_chain().valid)
+
+    def test_bootstrap_rejects_mismatched_snapshot(self):
+        snapshot = self.blockchain.prune(depth=3)
+        headers = [self.blockchain.chain[h] for h in range(snapshot.height)]
+        with self.assertRaises(ValueError):
+            Blockchain.from_snapshot(snapshot, headers, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import consensus
+from blockchain import Blockchain
+from signatures import ED25519, RSA, address_from_public_key, get_scheme, public_key_der, scheme_for_key
+from user import User
+from verifier import SignatureVerifier
+
+class TestSignatureSchemes(unittest.TestCase):
+    def test_sign_and_verify(self):
+        for scheme in (RSA, ED25519):
+            private_key = scheme.generate_private_key()
+            public_key = private_key.public_key()
+            signature = scheme.sign(private_key, b"message")
+            self.assertTrue(scheme.verify(public_key, signature, b"message"), scheme.name)
+            self.assertFalse(scheme.verify(public_key, signature, b"other"), scheme.name)
+            self.assertIs(scheme_for_key(public_key), scheme)
+            self.assertIs(scheme_for_key(private_key), scheme)
+
+    def test_unknown_scheme(self):
+        with self.assertRaises(ValueError):
+            get_scheme("dsa")
+
+    def test_consensus_helpers(self):
+        for scheme in ("rsa", "ed25519"):
+            user = User(scheme)
+            signature = consensus.create_signature("txn", user._private_key)
+            self.assertTrue(consensus.verify_signature(signature, "txn", user._public_key))
+            self.assertFalse(consensus.verify_signature(signature, "txm", user._public_key))
+            self.assertFalse(consensus.verify_signature("zz", "txn", user._public_key))
+
+    def test_mixed_schemes_on_one_chain(self):
+        blockchain = Blockchain()
+        rsa_user, ed_user = User("rsa"), User("ed25519")
+        self.assertEqual(address_from_public_key(ed_user._public_key), ed_user.get_address())
+        blockchain.register_user(rsa_user)
+        blockchain.register_user(ed_user)
+        blockchain.mine_pending_transactions()
+
+        blockchain.prove_transaction(rsa_user.start_transaction(ed_user.get_address(), 10))
+        blockchain.prove_transaction(ed_user.start_transaction(rsa_user.get_address(), 20))
+        self.assertEqual(len(blockchain.pending_transactions), 2)
+        blockchain.mine_pending_transactions()
+        self.assertEqual(blockchain.get_balance(rsa_user.get_address()), 110)
+        self.assertEqual(blockchain.get_balance(ed_user.get_address()), 90)
+
+        txs = [rsa_user.start_transaction("0xr", 1), ed_user.start_transaction("0xr", 1)]
+        results = SignatureVerifier().verify_batch([(tx, blockchain.public_key_of(tx.sender)) for tx in txs])
+        self.assertEqual(results, [True, True])
+
+class TestPublicKeyCache(unittest.TestCase):
+    def test_key_objects_are_cached(self):
+        blockchain = Blockchain()
+        user = User()
+        blockchain.register_user(user)
+        self.assertIs(blockchain.public_key_of(user.get_address()), user._public_key)
+        self.assertIsNone(blockchain.public_key_of("0xunknown"))
+
+    def test_register_public_key(self):
+        blockchain = Blockchain()
+        user, other = User(), User()
+        der = public_key_der(user._public_key)
+        with self.assertRaises(ValueError):
+            blockchain.register_public_key(other.get_address(), der)
+        blockchain.register_public_key(user.get_address(), der)
+        key = blockchain.public_key_of(user.get_address())
+        self.assertIs(blockchain.public_key_of(user.get_address()), key)
+        tx = user.start_transaction(other.get_address(), 1)
+        self.assertTrue(blockchain.verify_transaction_signature(tx))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import json
+import os
+import tempfile
+import unittest
+from simulation import LoadConfig, SimulationReport, load_users, simulate
+
+class TestLoadUsers(unittest.TestCase):
+    def test_keys_are_cached_and_extended(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "keys.json")
+            first = load_users(path, 2)
+            again = load_users(path, 2)
+            self.assertEqual([u.get_address() for u in again], [u.get_address() for u in first])
+
+            more = load_users(path, 3)
+            self.assertEqual([u.get_address() for u in more[:2]], [u.get_address() for u in first])
+            with open(path) as f:
+                self.assertEqual(len(json.load(f)["rsa"]), 3)
+
+            # a cached user signs like the original
+            tx = more[0].start_transaction(more[1].get_address(), 1)
+            self.assertTrue(first[0].verify_transaction(tx))
+
+class TestSimulation(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.users = load_users(os.path.join(cls.directory.name, "keys.json"), 4)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def run_load(self, nodes):
+        config = LoadConfig(rate=100, duration=0.3, nodes=nodes, block_interval=0.1,
+                            arrival="constant", drain=5)
+        return simulate(config, self.users)
+
+    def test_single_node(self):
+        report = self.run_load(1)
+        self.assertEqual(report.submitted, 30)
+        self.assertEqual(report.rejected, 0)
+        self.assertEqual(report.confirmed, 30)
+        self.assertGreater(report.blocks, 0)
+        self.assertGreater(report.tps, 0)
+        self.assertEqual(len(report.latencies), 30)
+        self.assertLessEqual(report.percentile(50), report.percentile(99))
+
+    def test_nodes_converge(self):
+        report = self.run_load(3)
+        self.assertEqual(report.confirmed, report.submitted)
+        self.assertTrue(report.converged)
+        data = report.to_dict()
+        self.assertEqual(data["config"]["nodes"], 3)
+        self.assertEqual(set(data["latency"]), {"p50", "p90", "p99", "p100"})
+
+    def test_percentile(self):
+        report = SimulationReport(LoadConfig(), 2, 4, 0, 4, 1, 1.0, 1.0, True,
+                                  latencies=[0.4, 0.1, 0.3, 0.2])
+        self.assertEqual(report.percentile(50), 0.2)
+        self.assertEqual(report.percentile(99), 0.4)
+        self.assertEqual(report.percentile(0), 0.1)
+
+if __name__ == '__main__':
+    unittest.main()
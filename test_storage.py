@@ -0,0 +1,205 @@
+import os
+import tempfile
+import time
+import unittest
+from block import Block
+from codec import decode_transaction, encode_transaction
+from blockchain import Blockchain
+from constant import SYSTEM
+from difficulty import Retargeting
+from storage import BlockStore, INDEX_RECORD
+from transaction import Transaction
+from user import User
+
+def make_chain(length):
+    blocks = [Block(0, [Transaction("genesis", "genesis", 0)], time.time(), "0")]
+    for i in range(1, length):
+        blocks.append(Block(i, [Transaction("alice", "bob", i)], time.time(), blocks[-1].hash))
+    return blocks
+
+class TestBlockStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_append_and_reopen(self):
+        blocks = make_chain(10)
+        store = BlockStore(self.path, segment_size=1024, sync_every=3)
+        for block in blocks:
+            store.append(block)
+        store.close()
+
+        store = BlockStore(self.path)
+        self.assertEqual(len(store), 10)
+        self.assertTrue(os.path.exists(os.path.join(self.path, 'blk00001.dat')))
+        for block in blocks:
+            loaded = store.get(block.index)
+            self.assertEqual(loaded.hash, block.hash)
+            self.assertEqual(loaded.transactions[0].transaction_id, block.transactions[0].transaction_id)
+        self.assertEqual(store.height_of(blocks[7].hash), 7)
+        self.assertEqual(store.get_by_hash(blocks[3].hash).index, 3)
+        self.assertIsNone(store.height_of('00' * 32))
+        store.close()
+
+    def test_truncate(self):
+        blocks = make_chain(6)
+        store = BlockStore(self.path)
+        for block in blocks:
+            store.append(block)
+        self.assertEqual(store.height_of(blocks[5].hash), 5)
+        store.truncate(4)
+
+        self.assertEqual(len(store), 4)
+        self.assertIsNone(store.height_of(blocks[5].hash))
+        self.assertEqual(store.append(blocks[4]), 4)
+        store.close()
+        self.assertEqual(len(BlockStore(self.path)), 5)
+
+    def test_recovers_from_torn_write(self):
+        blocks = make_chain(4)
+        store = BlockStore(self.path)
+        for block in blocks:
+            store.append(block)
+        store.close()
+
+        # simulate a crash mid-append: an index record whose data never made it
+        with open(os.path.join(self.path, 'index.dat'), 'ab') as f:
+            f.write(INDEX_RECORD.pack(0, 10 ** 6, 100))
+        with open(os.path.join(self.path, 'hashes.dat'), 'ab') as f:
+            f.write(b'\x00' * 32)
+
+        store = BlockStore(self.path)
+        self.assertEqual(len(store), 4)
+        self.assertEqual(store.get(3).hash, blocks[3].hash)
+        store.close()
+
+    def test_transaction_locations(self):
+        blocks = make_chain(6)
+        store = BlockStore(self.path, sync_every=2)
+        for block in blocks:
+            store.append(block)
+        txid = blocks[4].transactions[0].transaction_id
+        self.assertEqual(store.location_of(txid), (4, 0))
+        store.truncate(4)
+        self.assertIsNone(store.location_of(txid))
+        self.assertIsNone(store.location_of('not a transaction id'))
+        store.append(blocks[4])
+        store.close()
+
+        store = BlockStore(self.path, sync_every=2)
+        self.assertEqual(store.location_of(txid), (4, 0))
+        self.assertIsNone(store.location_of(blocks[5].transactions[0].transaction_id))
+        store.close()
+
+    def test_transaction_records_rebuilt_when_missing(self):
+        blocks = make_chain(5)
+        store = BlockStore(self.path)
+        for block in blocks:
+            store.append(block)
+        store.close()
+        # a store written before the transaction records existed
+        os.remove(os.path.join(self.path, 'txids.dat'))
+        os.remove(os.path.join(self.path, 'txends.dat'))
+
+        store = BlockStore(self.path)
+        for block in blocks:
+            self.assertEqual(store.location_of(block.transactions[0].transaction_id), (block.index, 0))
+        store.close()
+
+    def test_recovers_from_lost_page_before_tail(self):
+        blocks = make_chain(8)
+        store = BlockStore(self.path, sync_every=4)
+        for block in blocks:
+            store.append(block)
+        store.close()
+
+        # an unsynced block in the middle lost its data while the last one survived
+        with open(os.path.join(self.path, 'index.dat'), 'rb') as f:
+            f.seek(5 * INDEX_RECORD.size)
+            _, offset, length = INDEX_RECORD.unpack(f.read(INDEX_RECORD.size))
+        with open(os.path.join(self.path, 'blk00000.dat'), 'r+b') as f:
+            f.seek(offset + length)
+            f.write(b'\xff')
+
+        store = BlockStore(self.path, sync_every=4)
+        self.assertEqual(len(store), 5)
+        self.assertEqual(store.get(4).hash, blocks[4].hash)
+        self.assertIsNone(store.location_of(blocks[6].transactions[0].transaction_id))
+        self.assertEqual(store.append(blocks[5]), 5)
+        store.close()
+
+    def test_recovers_from_lost_hash(self):
+        blocks = make_chain(4)
+        store = BlockStore(self.path)
+        for block in blocks:
+            store.append(block)
+        store.close()
+
+        with open(os.path.join(self.path, 'hashes.dat'), 'r+b') as f:
+            f.seek(2 * 32)
+            f.write(b'\x00' * 32)
+
+        store = BlockStore(self.path)
+        self.assertEqual(len(store), 2)
+        self.assertIsNone(store.height_of(blocks[2].hash))
+        store.close()
+
+class TestBlockchainWithStore(unittest.TestCase):
+    def test_restart_restores_chain_and_balances(self):
+        with tempfile.TemporaryDirectory() as path:
+            blockchain = Blockchain(store=BlockStore(path))
+            user1, user2 = User(), User()
+            blockchain.register_user(user1)
+            blockchain.register_user(user2)
+            blockchain.mine_pending_transactions()
+            spend = user1.start_transaction(user2.get_address(), 30)
+            blockchain.pending_transactions.append(spend)
+            blockchain.mine_pending_transactions()
+            tip = blockchain.get_last_block().hash
+            blockchain.store.close()
+
+            restarted = Blockchain(store=BlockStore(path))
+            restarted.user_registry = blockchain.user_registry
+            self.assertEqual(len(restarted.chain), 3)
+            self.assertEqual(restarted.get_last_block().hash, tip)
+            self.assertEqual(restarted.get_balance(user1.get_address()), 70)
+            self.assertEqual(restarted.get_balance(user2.get_address()), 130)
+            self.assertTrue(restarted.verify_state())
+
+            # replays are refused from the store's index, without rebuilding one from the blocks
+            restarted.prove_transaction(decode_transaction(encode_transaction(spend))[0])
+            self.assertEqual(len(restarted.pending_transactions), 0)
+            self.assertEqual(restarted.get_transaction(spend.transaction_id)[1], (2, 0))
+            restarted.pending_transactions.append(Transaction(SYSTEM, "miner", 1))
+            restarted.mine_pending_transactions()
+            self.assertEqual(len(restarted.chain), 4)
+            self.assertIsNone(restarted._tx_index)
+            restarted.store.close()
+
+    def test_restart_takes_target_from_checkpoint(self):
+        rules = Retargeting(interval=4, block_interval=60)
+        with tempfile.TemporaryDirectory() as path:
+            blockchain = Blockchain(store=BlockStore(path), retargeting=rules)
+            for _ in range(6):
+                blockchain.pending_transactions.append(Transaction(SYSTEM, "miner", 1))
+                blockchain.mine_pending_transactions()
+            tip = blockchain.get_last_block()
+            target = blockchain.tree.target(tip.hash)
+            self.assertNotEqual(target, rules.initial_target)
+            blockchain.store.close()
+
+            # without a checkpoint the target is replayed from the chain
+            restarted = Blockchain(store=BlockStore(path), retargeting=rules)
+            self.assertEqual(restarted.tree.target(tip.hash), target)
+            restarted.store.save_state(tip.index, restarted.state.balances, target // 3)
+            restarted.store.close()
+
+            restarted = Blockchain(store=BlockStore(path), retargeting=rules)
+            self.assertEqual(restarted.tree.target(tip.hash), target // 3)
+            restarted.store.close()
+
+if __name__ == '__main__':
+    unittest.main()
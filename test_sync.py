@@ -0,0 +1,71 @@
+import pytest
+from blockchain import Blockchain
+from sync import ChainSync, LocalPeer, SyncError
+from user import User
+
+@pytest.fixture(scope="module")
+def source():
+    """A chain of 40 blocks with signed transactions, plus its users"""
+    blockchain = Blockchain()
+    users = [User(), User()]
+    for user in users:
+        blockchain.register_user(user)
+    blockchain.mine_pending_transactions()
+    for i in range(40):
+        sender, receiver = users[i % 2], users[(i + 1) % 2]
+        blockchain.pending_transactions.append(sender.start_transaction(receiver.get_address(), 1))
+        blockchain.mine_pending_transactions()
+    return blockchain
+
+def fresh_node(source):
+    blockchain = Blockchain()
+    blockchain.user_registry = dict(source.user_registry)
+    return blockchain
+
+class TestChainSync:
+    @pytest.mark.asyncio
+    async def test_sync_from_multiple_peers(self, source):
+        node = fresh_node(source)
+        peers = [LocalPeer(source, delay=0.001) for _ in range(3)]
+        result = await ChainSync(node, peers, chunk_size=4, window=3).run()
+
+        assert result.blocks == len(source.chain) - 1
+        assert node.get_last_block().hash == source.get_last_block().hash
+        assert node.state.balances == source.state.balances
+        assert all(peer.requests > 0 for peer in peers)
+
+    @pytest.mark.asyncio
+    async def test_retries_failed_requests(self, source):
+        node = fresh_node(source)
+        peers = [LocalPeer(source, fail_every=2), LocalPeer(source)]
+        await ChainSync(node, peers, chunk_size=5, window=2).run()
+        assert node.get_last_block().hash == source.get_last_block().hash
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_retries(self, source):
+        node = fresh_node(source)
+        with pytest.raises(SyncError):
+            await ChainSync(node, [LocalPeer(source, fail_every=1)], retries=2).run()
+
+    @pytest.mark.asyncio
+    async def test_rejects_bad_header_chain(self, source):
+        node = fresh_node(source)
+        peer = LocalPeer(source)
+        original = peer.get_headers
+
+        async def tampered(start, count):
+            headers = await original(start, count)
+            headers[len(headers) // 2].nonce += 1
+            return headers
+        peer.get_headers = tampered
+
+        with pytest.raises(SyncError):
+            await ChainSync(node, [peer]).run()
+        assert len(node.chain) == 1
+
+    @pytest.mark.asyncio
+    async def test_already_synced(self, source):
+        node = fresh_node(source)
+        await ChainSync(node, [LocalPeer(source)]).run()
+        result = await ChainSync(node, [LocalPeer(source)]).run()
+        assert result.blocks == 0
@@ -0,0 +1,91 @@
+import unittest
+from constant import SYSTEM
+from mempool import Mempool
+from template import BlockTemplate
+from transaction import Transaction
+
+class TestBlockTemplate(unittest.TestCase):
+    def setUp(self):
+        self.mempool = Mempool()
+        self.balances = {"alice": 1000, "bob": 1000, "carol": 1000}
+        self.template = BlockTemplate(self.mempool, lambda a: self.balances.get(a, 0))
+
+    def add(self, sender, amount, fee=0):
+        tx = Transaction(sender, "receiver", amount, fee)
+        self.mempool.add(tx)
+        return tx
+
+    def test_orders_by_fee_rate(self):
+        low = self.add("alice", 1, fee=1)
+        high = self.add("bob", 2, fee=50)
+        mid = self.add("carol", 3, fee=10)
+        self.assertEqual(self.template.transactions(), [high, mid, low])
+        self.assertEqual(self.template.fees, 61)
+
+    def test_keeps_sender_order(self):
+        first = self.add("alice", 1, fee=0)
+        second = self.add("alice", 2, fee=100)
+        other = self.add("bob", 3, fee=10)
+        self.assertEqual(self.template.transactions(), [other, first, second])
+
+        self.template.max_transactions = 1
+        self.template.invalidate()
+        self.assertEqual(self.template.transactions(), [other])
+
+    def test_byte_limit(self):
+        txs = [self.add("alice", i + 1) for i in range(5)]
+        size = self.mempool.size_of(txs[0].transaction_id)
+        self.template.max_bytes = size * 3 + size // 2
+        self.assertEqual(self.template.transactions(), txs[:3])
+        self.assertLessEqual(self.template.size_bytes, self.template.max_bytes)
+
+    def test_stops_sender_at_balance(self):
+        self.balances["alice"] = 100
+        first = self.add("alice", 60, fee=5)
+        self.add("alice", 30, fee=6)
+        later = self.add("alice", 1)
+        minted = self.add(SYSTEM, 10 ** 6)
+        self.assertEqual(self.template.transactions(), [first, minted])
+        self.assertNotIn(later, self.template.transactions())
+
+    def test_appends_incrementally(self):
+        first = self.add("alice", 1, fee=5)
+        self.template.transactions()
+        rebuilds = self.template.rebuilds
+        second = self.add("alice", 2, fee=1)
+        other = self.add("bob", 3)
+        self.assertEqual(self.template.transactions(), [first, second, other])
+        self.assertEqual(self.template.rebuilds, rebuilds)
+
+    def test_higher_fee_displaces_when_full(self):
+        self.template.max_transactions = 2
+        self.add("alice", 1, fee=1)
+        middle = self.add("bob", 2, fee=2)
+        self.assertEqual(len(self.template), 2)
+        rebuilds = self.template.rebuilds
+        rich = self.add("carol", 3, fee=100)
+        self.assertEqual(self.template.transactions(), [middle, rich])
+        self.assertEqual(self.template.rebuilds, rebuilds)
+        # a cheaper arrival than everything selected changes nothing
+        self.add("carol", 4, fee=0)
+        self.assertEqual(self.template.transactions(), [middle, rich])
+
+    def test_displacement_keeps_sender_order(self):
+        self.template.max_transactions = 2
+        first = self.add("alice", 1, fee=1)
+        second = self.add("alice", 2, fee=1)
+        self.assertEqual(self.template.transactions(), [first, second])
+        # alice's own transactions are never displaced by her next one
+        self.add("alice", 3, fee=100)
+        self.assertEqual(self.template.transactions(), [first, second])
+
+    def test_removal_rebuilds(self):
+        first = self.add("alice", 1)
+        self.template.max_transactions = 1
+        second = self.add("bob", 2)
+        self.assertEqual(self.template.transactions(), [first])
+        self.mempool.remove(first.transaction_id)
+        self.assertEqual(self.template.transactions(), [second])
+
+if __name__ == '__main__':
+    unittest.main()
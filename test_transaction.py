@@ -32,5 +32,35 @@ class TestTransaction(unittest.TestCase):
         self.assertEqual(transaction_dict["state"], self.transaction.state.value)
         self.assertIsNone(transaction_dict["signature"])
 
+    def test_signed_fields_are_frozen(self):
+        for field in ("sender", "receiver", "amount", "timestamp", "transaction_id"):
+            with self.assertRaises(AttributeError):
+                setattr(self.transaction, field, None)
+        with self.assertRaises(AttributeError):
+            self.transaction.extra = 1
+
+    def test_state_and_signature_are_mutable(self):
+        self.transaction.state = TransactionState.SIGNED
+        self.transaction.signature = "ab"
+        self.assertEqual(self.transaction.to_dict()["state"], "signed")
+        self.assertEqual(self.transaction.to_dict()["signature"], "ab")
+
+    def test_signing_message(self):
+        message = self.transaction.signing_message()
+        self.assertEqual(message, f"{self.sender}{self.receiver}{self.amount}{self.transaction.timestamp}".encode())
+        self.assertTrue(self.transaction.has_valid_id())
+
+    def test_fee_is_signed(self):
+        self.assertEqual(self.transaction.fee, 0)
+        self.assertEqual(self.transaction.cost, self.amount)
+        with_fee = Transaction(self.sender, self.receiver, self.amount, fee=3)
+        self.assertEqual(with_fee.cost, self.amount + 3)
+        self.assertTrue(with_fee.signing_message().endswith(b"|fee=3"))
+        self.assertEqual(Transaction.from_dict(with_fee.to_dict()).fee, 3)
+
+    def test_from_dict_round_trip(self):
+        restored = Transaction.from_dict(self.transaction.to_dict())
+        self.assertEqual(restored.to_dict(), self.transaction.to_dict())
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,53 @@
+import time
+import unittest
+from block import Block
+from transaction import Transaction
+from txindex import TransactionIndex
+
+class TestTransactionIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = TransactionIndex()
+        self.blocks = []
+        amount = 1
+        for height in range(4):
+            txs = []
+            for _ in range(3):
+                txs.append(Transaction("alice", "bob" if amount % 2 else "carol", amount))
+                amount += 1
+            block = Block(height, txs, time.time(), "0")
+            self.blocks.append(block)
+            self.index.add_block(block)
+
+    def test_get_location(self):
+        tx = self.blocks[2].transactions[1]
+        self.assertEqual(self.index.get_location(tx.transaction_id), (2, 1))
+        self.assertIsNone(self.index.get_location("missing"))
+
+    def test_history_pagination(self):
+        pages = []
+        cursor = None
+        while True:
+            page, cursor = self.index.get_history("alice", cursor, limit=5)
+            pages.append(page)
+            if cursor is None:
+                break
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+        flat = [location for page in pages for location in page]
+        self.assertEqual(flat, [(h, p) for h in range(4) for p in range(3)])
+
+        bob, _ = self.index.get_history("bob")
+        self.assertEqual(bob, [(0, 0), (0, 2), (1, 1), (2, 0), (2, 2), (3, 1)])
+        self.assertEqual(self.index.get_history("nobody"), ([], None))
+
+    def test_remove_block_unwinds(self):
+        removed = self.blocks.pop()
+        self.index.remove_block(removed)
+
+        self.assertIsNone(self.index.get_location(removed.transactions[0].transaction_id))
+        rebuilt = TransactionIndex.from_chain(self.blocks)
+        for address in ("alice", "bob", "carol"):
+            self.assertEqual(self.index.get_history(address, limit=100),
+                             rebuilt.get_history(address, limit=100))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import time
+import unittest
+from block import Block
+from blockchain import Blockchain
+from constant import DIFFICULTY
+from transaction import Transaction
+from user import User
+from validation import ChainValidator
+
+def mine_on(parent, transactions):
+    block = Block(parent.index + 1, transactions, time.time(), parent.hash)
+    block.mine(DIFFICULTY)
+    return block
+
+class TestChainValidator(unittest.TestCase):
+    def setUp(self):
+        self.blockchain = Blockchain()
+        self.user1, self.user2 = User(), User()
+        self.blockchain.register_user(self.user1)
+        self.blockchain.register_user(self.user2)
+        self.blockchain.mine_pending_transactions()
+        for amount in range(1, 4):
+            tx = self.user1.start_transaction(self.user2.get_address(), amount)
+            self.blockchain.prove_transaction(tx)
+            self.blockchain.mine_pending_transactions()
+
+    def forged(self):
+        """A transfer carrying the signature of a different transaction"""
+        tx = self.user1.start_transaction(self.user2.get_address(), 5)
+        other = self.user1.start_transaction(self.user2.get_address(), 6)
+        return Transaction.restore(tx.transaction_id, tx.timestamp, tx.sender, tx.receiver,
+                                   tx.amount, tx.state, other.signature)
+
+    def test_valid_chain(self):
+        result = self.blockchain.validate_chain()
+        self.assertTrue(result.valid, result.error)
+        self.assertEqual(result.blocks, 5)
+        self.assertEqual(result.signatures_checked, 3)
+        self.assertEqual(result.signatures_skipped, 0)
+
+    def test_assume_valid_skips_signatures_up_to_checkpoint(self):
+        result = self.blockchain.validate_chain(assume_valid=self.blockchain.chain[3].hash)
+        self.assertTrue(result.valid, result.error)
+        self.assertEqual(result.signatures_skipped, 2)
+        self.assertEqual(result.signatures_checked, 1)
+
+    def test_unknown_checkpoint_checks_everything(self):
+        result = self.blockchain.validate_chain(assume_valid="00" * 32)
+        self.assertTrue(result.valid)
+        self.assertEqual(result.signatures_checked, 3)
+
+    def test_invalid_signature(self):
+        chain = list(self.blockchain.chain)
+        chain.append(mine_on(chain[-1], [self.forged()]))
+        validator = ChainValidator(self.blockchain.public_key_of)
+        result = validator.validate(chain)
+        self.assertFalse(result.valid)
+        self.assertIn("block 5: invalid signature", result.error)
+        # below the checkpoint the signature is trusted
+        self.assertTrue(ChainValidator(self.blockchain.public_key_of, assume_valid=chain[-1].hash).validate(chain).valid)
+
+    def test_overdraft_within_a_block(self):
+        chain = list(self.blockchain.chain)
+        balance = self.blockchain.get_balance(self.user1.get_address())
+        spends = [self.user1.start_transaction(self.user2.get_address(), balance // 2 + 1) for _ in range(2)]
+        chain.append(mine_on(chain[-1], spends))
+        result = ChainValidator(self.blockchain.public_key_of).validate(chain)
+        self.assertFalse(result.valid)
+        self.assertIn("overdraft", result.error)
+
+    def test_replayed_transaction(self):
+        chain = list(self.blockchain.chain)
+        chain.append(mine_on(chain[-1], [chain[-1].transactions[0]]))
+        result = ChainValidator(self.blockchain.public_key_of).validate(chain)
+        self.assertFalse(result.valid)
+        self.assertIn("block 5: duplicate transaction", result.error)
+
+    def test_negative_fee(self):
+        chain = list(self.blockchain.chain)
+        chain.append(mine_on(chain[-1], [self.user1.start_transaction(self.user2.get_address(), 1, fee=-1000)]))
+        result = ChainValidator(self.blockchain.public_key_of).validate(chain)
+        self.assertFalse(result.valid)
+        self.assertIn("block 5: invalid amount or fee", result.error)
+
+    def test_negative_amount(self):
+        chain = list(self.blockchain.chain)
+        chain.append(mine_on(chain[-1], [self.user1.start_transaction(self.user2.get_address(), -500)]))
+        result = ChainValidator(self.blockchain.public_key_of).validate(chain)
+        self.assertFalse(result.valid)
+        self.assertIn("block 5: invalid amount or fee", result.error)
+
+    def test_broken_linkage(self):
+        chain = list(self.blockchain.chain)
+        chain[2], chain[3] = chain[3], chain[2]
+        result = ChainValidator(self.blockchain.public_key_of).validate(chain)
+        self.assertFalse(result.valid)
+        self.assertIn("block 2", result.error)
+
+    def test_tampered_balance_index(self):
+        self.blockchain.state.balances[self.user2.get_address()] += 1
+        result = self.blockchain.validate_chain()
+        self.assertFalse(result.valid)
+        self.assertIn("balance index", result.error)
+
+if __name__ == '__main__':
+    unittest.main()
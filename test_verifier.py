@@ -0,0 +1,73 @@
+import unittest
+from transaction import Transaction
+from user import User
+from verifier import SignatureVerifier
+
+class TestSignatureVerifier(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.user = User()
+        cls.other = User()
+
+    def setUp(self):
+        self.verifier = SignatureVerifier(workers=1)
+
+    def tearDown(self):
+        self.verifier.shutdown()
+
+    def test_verify_and_cache(self):
+        tx = self.user.start_transaction(self.other.get_address(), 10)
+        self.assertTrue(self.verifier.verify(tx, self.user._public_key))
+        self.assertEqual(self.verifier.misses, 1)
+        self.assertTrue(self.verifier.verify(tx, self.user._public_key))
+        self.assertEqual(self.verifier.hits, 1)
+
+    def test_invalid_signature_not_cached(self):
+        tx = self.user.start_transaction(self.other.get_address(), 10)
+        tx.signature = self.other.start_transaction(self.user.get_address(), 10).signature
+        self.assertFalse(self.verifier.verify(tx, self.user._public_key))
+        self.assertFalse(self.verifier.verify(tx, self.user._public_key))
+        self.assertEqual(self.verifier.hits, 0)
+
+    def test_copy_with_other_fields_misses_cache(self):
+        tx = self.user.start_transaction(self.other.get_address(), 10)
+        self.assertTrue(self.verifier.verify(tx, self.user._public_key))
+        # same id and signature, different receiver and amount
+        copy = Transaction.restore(tx.transaction_id, tx.timestamp, tx.sender, self.user.get_address(),
+                                   90, tx.state, tx.signature)
+        self.assertFalse(self.verifier.verify(copy, self.user._public_key))
+        self.assertFalse(self.verifier.verify_batch([(copy, self.user._public_key)])[0])
+
+    def test_unsigned_transaction(self):
+        tx = self.user.start_transaction(self.other.get_address(), 10)
+        tx.signature = None
+        self.assertFalse(self.verifier.verify(tx, self.user._public_key))
+
+    def test_verify_batch(self):
+        txs = [self.user.start_transaction(self.other.get_address(), i) for i in range(1, 6)]
+        txs[2].signature = txs[3].signature
+        items = [(tx, self.user._public_key) for tx in txs]
+
+        self.assertEqual(self.verifier.verify_batch(items), [True, True, False, True, True])
+        # the valid ones are now cached
+        self.verifier.verify_batch(items)
+        self.assertEqual(self.verifier.hits, 4)
+
+    def test_verify_batch_on_pool(self):
+        verifier = SignatureVerifier(workers=2, batch_size=2)
+        try:
+            txs = [self.user.start_transaction(self.other.get_address(), i) for i in range(1, 8)]
+            txs[5].signature = txs[0].signature
+            results = verifier.verify_batch([(tx, self.user._public_key) for tx in txs])
+            self.assertEqual(results, [True] * 5 + [False, True])
+        finally:
+            verifier.shutdown()
+
+    def test_cache_is_bounded(self):
+        verifier = SignatureVerifier(workers=1, cache_size=2)
+        txs = [self.user.start_transaction(self.other.get_address(), i) for i in range(1, 4)]
+        verifier.verify_batch([(tx, self.user._public_key) for tx in txs])
+        self.assertEqual(len(verifier._cache), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,28 +1,121 @@
 from constant import TransactionState
 from datetime import datetime
+from typing import Optional
 import hashlib
 
 class Transaction:
-    def __init__(self, sender: str, receiver: str, amount: int) -> None:
-        self.timestamp = datetime.now()
-        self.transaction_id = hashlib.sha256(f"{sender}{receiver}{amount}{self.timestamp}".encode()).hexdigest()
-        self.sender = sender
-        self.receiver = receiver
-        self.amount = amount
+    """
+    A transfer between two addresses.
+
+    The signed fields (sender, receiver, amount, fee, timestamp) and the id
+    derived from them are read-only. The fee is optional and paid by the
+    sender on top of the amount. Only the lifecycle state and the signature can
+    change. The id is computed once; the signing bytes and to_dict() are
+    rebuilt on each call rather than kept on every transaction, since holding
+    them would cost more memory than the fields themselves.
+    """
+
+    __slots__ = (
+        '_transaction_id', '_timestamp', '_sender', '_receiver', '_amount', '_fee',
+        'state', 'signature'
+    )
+
+    def __init__(self, sender: str, receiver: str, amount: int, fee: int = 0) -> None:
+        self._timestamp = datetime.now()
+        self._sender = sender
+        self._receiver = receiver
+        self._amount = amount
+        self._fee = fee
+        self._transaction_id = hashlib.sha256(self.signing_message()).hexdigest()
         self.state = TransactionState.STARTED
         self.signature = None
 
+    @property
+    def transaction_id(self) -> str:
+        return self._transaction_id
+
+    @property
+    def timestamp(self) -> datetime:
+        return self._timestamp
+
+    @property
+    def sender(self) -> str:
+        return self._sender
+
+    @property
+    def receiver(self) -> str:
+        return self._receiver
+
+    @property
+    def amount(self) -> int:
+        return self._amount
+
+    @property
+    def fee(self) -> int:
+        return self._fee
+
+    @property
+    def cost(self) -> int:
+        """Total debited from the sender: the amount plus the fee"""
+        return self._amount + self._fee
+
+    def signing_message(self) -> bytes:
+        """The canonical bytes covered by the signature (and hashed into the id)"""
+        message = f"{self._sender}{self._receiver}{self._amount}{self._timestamp}"
+        if self._fee:
+            # fee-less transactions keep the message (and id) they always had
+            message += f"|fee={self._fee}"
+        return message.encode()
+
+    def has_valid_amounts(self) -> bool:
+        """Whether the amount is positive and the fee is not negative (else the sender would be credited)"""
+        return self._amount > 0 and self._fee >= 0
+
+    def has_valid_id(self) -> bool:
+        """Whether transaction_id is the hash of the signed fields (false for a tampered copy)"""
+        return hashlib.sha256(self.signing_message()).hexdigest() == self._transaction_id
+
     def __str__(self) -> str:
         return str(str(self.transaction_id)) + " " + str(self.timestamp) + " " + str(self.sender) + " " + str(self.receiver) + " " + str(self.amount) + " " + str(self.state)
-    
+
     def to_dict(self) -> dict:
         return {
-            "transaction_id": self.transaction_id,
-            "timestamp": self.timestamp.isoformat(),
-            "sender": self.sender,
-            "receiver": self.receiver,
-            "amount": self.amount,
+            "transaction_id": self._transaction_id,
+            "timestamp": self._timestamp.isoformat(),
+            "sender": self._sender,
+            "receiver": self._receiver,
+            "amount": self._amount,
+            "fee": self._fee,
             "state": self.state.value,
-            "signature": self.signature
+            "signature": self.signature,
         }
-    
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Transaction':
+        """Rebuild a transaction from its to_dict() form"""
+        return cls.restore(
+            transaction_id=data["transaction_id"],
+            timestamp=datetime.fromisoformat(data["timestamp"]),
+            sender=data["sender"],
+            receiver=data["receiver"],
+            amount=data["amount"],
+            state=TransactionState(data["state"]),
+            signature=data["signature"],
+            fee=data.get("fee", 0)
+        )
+
+    @classmethod
+    def restore(cls, transaction_id: str, timestamp: datetime, sender: str, receiver: str,
+                amount: int, state: TransactionState, signature: Optional[str],
+                fee: int = 0) -> 'Transaction':
+        """Recreate a stored or received transaction without assigning a new timestamp/id"""
+        transaction = cls.__new__(cls)
+        transaction._timestamp = timestamp
+        transaction._transaction_id = transaction_id
+        transaction._sender = sender
+        transaction._receiver = receiver
+        transaction._amount = amount
+        transaction._fee = fee
+        transaction.state = state
+        transaction.signature = signature
+        return transaction
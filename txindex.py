@@ -0,0 +1,76 @@
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+from block import Block
+
+# (block height, position of the transaction inside the block)
+Location = Tuple[int, int]
+
+class TransactionIndex:
+    """
+    transaction_id -> location and address -> ordered list of locations,
+    maintained block by block as the chain grows and shrinks.
+
+    Histories are appended in chain order, so each list is sorted and a page
+    starting after a cursor is found by bisection.
+    """
+
+    def __init__(self) -> None:
+        self._locations: Dict[str, Location] = {}
+        self._history: Dict[str, List[Location]] = {}
+
+    def add_block(self, block: Block) -> None:
+        for position, tx in enumerate(block.transactions):
+            location = (block.index, position)
+            self._locations[tx.transaction_id] = location
+            self._history.setdefault(tx.sender, []).append(location)
+            if tx.receiver != tx.sender:
+                self._history.setdefault(tx.receiver, []).append(location)
+
+    def remove_block(self, block: Block) -> None:
+        """Unwind the tip block; its entries are the last ones in every list"""
+        for tx in reversed(block.transactions):
+            self._locations.pop(tx.transaction_id, None)
+            for address in {tx.sender, tx.receiver}:
+                history = self._history[address]
+                history.pop()
+                if not history:
+                    del self._history[address]
+
+    def prune(self, blocks: Iterable[Block], height: int) -> None:
+        """Forget the given blocks, which are all of the blocks up to `height` not pruned yet"""
+        addresses = set()
+        for block in blocks:
+            for tx in block.transactions:
+                self._locations.pop(tx.transaction_id, None)
+                addresses.add(tx.sender)
+                addresses.add(tx.receiver)
+        for address in addresses:
+            history = self._history.get(address)
+            if history is None:
+                continue
+            # the pruned entries are the oldest ones, at the front of the list
+            del history[:bisect_left(history, (height + 1,))]
+            if not history:
+                del self._history[address]
+
+    def get_location(self, transaction_id: str) -> Optional[Location]:
+        return self._locations.get(transaction_id)
+
+    def get_history(self, address: str, cursor: Optional[Location] = None,
+                    limit: int = 50) -> Tuple[List[Location], Optional[Location]]:
+        """
+        Return up to `limit` locations after `cursor` (from the start if None),
+        oldest first, plus the cursor for the next page (None when exhausted).
+        """
+        history = self._history.get(address, [])
+        start = 0 if cursor is None else bisect_right(history, tuple(cursor))
+        page = history[start:start + limit]
+        next_cursor = page[-1] if page and start + limit < len(history) else None
+        return page, next_cursor
+
+    @classmethod
+    def from_chain(cls, chain: Iterable[Block]) -> 'TransactionIndex':
+        index = cls()
+        for block in chain:
+            index.add_block(block)
+        return index
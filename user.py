@@ -1,28 +1,28 @@
 from typing import Dict, Optional
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
-from cryptography.hazmat.primitives import serialization
 from transaction import Transaction
 import hashlib
-from constant import TransactionState
+from constant import DEFAULT_SIGNATURE_SCHEME, TransactionState
+from signatures import get_scheme, private_key_pem, public_key_pem, scheme_for_key
 
 class User:
     _users: Dict[str, 'User'] = {}  # Class variable to store all users
 
-    def __init__(self):
-        # Get private and public key
-        self._private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=2048
-        )
+    def __init__(self, scheme: str = DEFAULT_SIGNATURE_SCHEME, private_key=None):
+        # Get private and public key; an existing key (e.g. loaded from disk) keeps its own scheme
+        if private_key is None:
+            self.scheme = get_scheme(scheme)
+            self._private_key = self.scheme.generate_private_key()
+        else:
+            self.scheme = scheme_for_key(private_key)
+            self._private_key = private_key
         self._public_key = self._private_key.public_key()
         
-        # Generate address from public key
-        public_key_bytes = self._public_key.public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
-        )
-        self.address = self._generate_address(public_key_bytes)
+        # Generate address from public key; the PEM is kept for get_public_key
+        self._public_key_pem = public_key_pem(self._public_key)
+        self.address = self._generate_address(self._public_key_pem)
+
+        # Node used by broadcast_transaction (see Node.attach)
+        self.node = None
 
         # Add user to class variable
         User._users[self.address] = self
@@ -40,57 +40,44 @@ class User:
 
     def get_public_key(self) -> str:
         """Return the user's public key as hex string"""
-        return self._public_key.public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
-        ).hex()
+        return self._public_key_pem.hex()
+
+    def export_private_key(self) -> bytes:
+        """Return the user's private key as unencrypted PEM (see User(private_key=...))"""
+        return private_key_pem(self._private_key)
 
-    def start_transaction(self, receiver_address: str, amount: int) -> Optional[Transaction]:
+    def start_transaction(self, receiver_address: str, amount: int, fee: int = 0) -> Optional[Transaction]:
         """
         Start a new transaction if user has sufficient balance
         Args:
             receiver_address: Receiver's blockchain address
             amount: Amount to transfer
+            fee: Optional fee offered to the miner, paid on top of the amount
         Returns:
             Transaction object if successful, None otherwise
         """
-        transaction = Transaction(self.address, receiver_address, amount)
+        transaction = Transaction(self.address, receiver_address, amount, fee)
         self.sign_transaction(transaction)
         return transaction
 
     def sign_transaction(self, transaction: Transaction) -> None:
         """Sign a transaction with the user's private key"""
-        txn_message = f"{transaction.sender}{transaction.receiver}{transaction.amount}{transaction.timestamp}"
-        signature = self._private_key.sign(
-            txn_message.encode(),
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
-        )
+        signature = self.scheme.sign(self._private_key, transaction.signing_message())
         transaction.state = TransactionState.SIGNED
         transaction.signature = signature.hex()
     
     def verify_transaction(self, transaction: Transaction) -> bool:
         """Verify a transaction with the user's public key"""
         public_key = self._users[transaction.sender]._public_key
-        message = f"{transaction.sender}{transaction.receiver}{transaction.amount}{transaction.timestamp}"
         try:
-            public_key.verify(
-                bytes.fromhex(transaction.signature),
-                message.encode(),
-                padding.PSS(
-                    mgf=padding.MGF1(hashes.SHA256()),
-                    salt_length=padding.PSS.MAX_LENGTH
-                ),
-                hashes.SHA256()
+            return scheme_for_key(public_key).verify(
+                public_key, bytes.fromhex(transaction.signature), transaction.signing_message()
             )
-            return True
         except Exception:
             return False
     
     def broadcast_transaction(self, transaction: Transaction) -> None:
-        """Broadcast a transaction to the network"""
-        # TODO: Implement broadcasting
-        pass
\ No newline at end of file
+        """Broadcast a transaction to the network through the user's node"""
+        if self.node is None:
+            raise RuntimeError("User is not attached to a node")
+        self.node.submit_transaction(transaction)
\ No newline at end of file
@@ -0,0 +1,188 @@
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Set, Tuple
+from block import Block
+from constant import REWARD, SYSTEM, VALIDATION_BATCH_SIZE
+from difficulty import Retargeting, meets_target
+from snapshot import StateSnapshot
+from state import AccountState
+from transaction import Transaction
+from verifier import SignatureVerifier
+
+class ChainValidationError(Exception):
+    """Raised internally when a block breaks a rule; reported in ValidationResult"""
+
+    def __init__(self, height: int, reason: str) -> None:
+        super().__init__(f"block {height}: {reason}")
+        self.height = height
+
+def reward_error(transactions: Sequence[Transaction]) -> Optional[str]:
+    """
+    Why a block's fee reward breaks the rules, or None if it is fine: a
+    block may start with one REWARD transaction paying at most the fees of
+    the block's other transactions, and have no other
+    """
+    rewards = [position for position, tx in enumerate(transactions) if tx.sender == REWARD]
+    if not rewards:
+        return None
+    if rewards != [0]:
+        return "reward is not the only first transaction"
+    reward = transactions[0]
+    if reward.fee or not 0 < reward.amount <= sum(tx.fee for tx in transactions[1:]):
+        return "reward exceeds the block's fees"
+    return None
+
+@dataclass
+class ValidationResult:
+    valid: bool
+    blocks: int = 0
+    signatures_checked: int = 0
+    signatures_skipped: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    # balances rebuilt while validating (only meaningful when valid)
+    state: Optional[AccountState] = None
+
+    @property
+    def blocks_per_second(self) -> float:
+        return self.blocks / self.elapsed if self.elapsed else 0.0
+
+class ChainValidator:
+    """
+    Validates a whole chain in a single streaming pass.
+
+    Blocks are read in order (one at a time, so a StoredChain is never fully
+    loaded) and checked for index, previous_hash linkage, timestamp, hash
+    and proof of work against the target `retargeting` derives for them.
+    Balances are applied transaction by transaction to a fresh
+    AccountState, rejecting any transfer its sender cannot cover at that
+    point, any amount or fee out of range and any transaction id seen
+    before. Signatures are collected and verified in batches of
+    `batch_size` through the verifier, which spreads a batch over its
+    process pool.
+
+    With `assume_valid` set to the hash of a block on the chain, signatures
+    of that block and everything below it are not checked: the hash chain up
+    to the checkpoint commits to them already (Merkle leaves cover every
+    field of a transaction, signature included). Everything else is still
+    validated, so startup time is dominated by the hashes and the
+    signatures above the checkpoint.
+    """
+
+    def __init__(self, public_key_of: Callable[[str], object],
+                 verifier: Optional[SignatureVerifier] = None,
+                 assume_valid: Optional[str] = None, batch_size: int = VALIDATION_BATCH_SIZE,
+                 retargeting: Optional[Retargeting] = None) -> None:
+        self.public_key_of = public_key_of
+        self.verifier = verifier or SignatureVerifier()
+        self.assume_valid = assume_valid
+        self.batch_size = batch_size
+        self.retargeting = retargeting or Retargeting()
+
+    def _checkpoint_height(self, chain: Sequence[Block]) -> int:
+        """Height of the assume-valid block, or -1 if unset or not on this chain"""
+        if self.assume_valid is None:
+            return -1
+        store = getattr(chain, 'store', None)
+        if store is not None:
+            height = store.height_of(self.assume_valid)
+            return -1 if height is None else height
+        for height in range(len(chain)):
+            if chain[height].hash == self.assume_valid:
+                return height
+        return -1
+
+    def _check_header(self, block: Block, parent: Optional[Block], height: int, target: int,
+                      timestamp_at: Callable[[int], float]) -> None:
+        if block.index != height:
+            raise ChainValidationError(height, f"index is {block.index}")
+        if block.compute_hash() != block.hash:
+            raise ChainValidationError(height, "hash does not match contents")
+        if parent is None:
+            # the genesis block is fixed rather than mined
+            return
+        if block.previous_hash != parent.hash:
+            raise ChainValidationError(height, "previous_hash does not link to the parent")
+        if not self.retargeting.timestamp_valid(block.timestamp, height, timestamp_at):
+            raise ChainValidationError(height, "timestamp out of range")
+        if not meets_target(block.hash, target):
+            raise ChainValidationError(height, "insufficient proof of work")
+
+    def _verify(self, pending: List[Tuple[int, Transaction, object]], result: ValidationResult) -> None:
+        results = self.verifier.verify_batch([(tx, key) for _, tx, key in pending])
+        result.signatures_checked += len(pending)
+        for (height, tx, _), valid in zip(pending, results):
+            if not valid:
+                raise ChainValidationError(height, f"invalid signature on {tx.transaction_id}")
+        pending.clear()
+
+    def validate(self, chain: Sequence[Block], snapshot: Optional[StateSnapshot] = None) -> ValidationResult:
+        """
+        Validate the chain from genesis. For a pruned chain, pass the snapshot
+        it was pruned at: blocks up to its height are checked as headers only,
+        and balances and the transaction ids already used start from the
+        snapshot's.
+        """
+        start = time.perf_counter()
+        result = ValidationResult(valid=False)
+        state = AccountState()
+        checkpoint = self._checkpoint_height(chain)
+        pending: List[Tuple[int, Transaction, object]] = []
+        headers_only = -1
+        if snapshot is not None:
+            state.balances = dict(snapshot.balances)
+            headers_only = snapshot.height
+        def timestamp_at(h: int) -> float:
+            return chain[h].timestamp
+
+        # ids of the transactions validated so far (or pruned), to catch replays
+        seen: Set[str] = set() if snapshot is None else set(snapshot.transaction_ids)
+        parent = None
+        target = self.retargeting.initial_target
+        try:
+            if snapshot is not None and (snapshot.height >= len(chain)
+                                         or chain[snapshot.height].hash != snapshot.block_hash):
+                raise ChainValidationError(snapshot.height, "does not match the state snapshot")
+            for height in range(len(chain)):
+                block = chain[height]
+                target = self.retargeting.next_target(target, height, timestamp_at)
+                self._check_header(block, parent, height, target, timestamp_at)
+                parent = block
+                if height <= headers_only:
+                    result.blocks += 1
+                    continue
+                check_signatures = height > checkpoint
+                error = reward_error(block.transactions)
+                if error is not None:
+                    raise ChainValidationError(height, error)
+                for tx in block.transactions:
+                    if check_signatures and not tx.has_valid_id():
+                        raise ChainValidationError(height, f"id of {tx.transaction_id} does not match its fields")
+                    if tx.transaction_id in seen:
+                        raise ChainValidationError(height, f"duplicate transaction {tx.transaction_id}")
+                    seen.add(tx.transaction_id)
+                    if height > 0 and not tx.has_valid_amounts():
+                        # only the fixed genesis transaction moves nothing
+                        raise ChainValidationError(height, f"invalid amount or fee in {tx.transaction_id}")
+                    if height > 0 and tx.sender not in (SYSTEM, REWARD):
+                        public_key = self.public_key_of(tx.sender)
+                        if public_key is None or tx.signature is None:
+                            raise ChainValidationError(height, f"unverifiable sender of {tx.transaction_id}")
+                        if state.get_balance(tx.sender) < tx.cost:
+                            raise ChainValidationError(height, f"overdraft by {tx.transaction_id}")
+                        if check_signatures:
+                            pending.append((height, tx, public_key))
+                        else:
+                            result.signatures_skipped += 1
+                    state.apply_transaction(tx)
+                if len(pending) >= self.batch_size:
+                    self._verify(pending, result)
+                result.blocks += 1
+            self._verify(pending, result)
+        except ChainValidationError as e:
+            result.error = str(e)
+        else:
+            result.valid = True
+            result.state = state
+        result.elapsed = time.perf_counter() - start
+        return result
@@ -0,0 +1,138 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+from transaction import Transaction
+from constant import SIGNATURE_CACHE_SIZE, SIGNATURE_WORKERS
+from signatures import load_public_key, public_key_der, scheme_for_key
+
+# public keys deserialized in this (worker) process, keyed by DER bytes
+_loaded_keys: Dict[bytes, object] = {}
+
+def _verify_one(public_key, signature: bytes, message: bytes) -> bool:
+    return scheme_for_key(public_key).verify(public_key, signature, message)
+
+def _verify_batch(items: List[Tuple[bytes, bytes, bytes]]) -> List[bool]:
+    """Verify (public key DER, signature, message) triples in a worker process"""
+    results = []
+    for key_der, signature, message in items:
+        public_key = _loaded_keys.get(key_der)
+        if public_key is None:
+            public_key = _loaded_keys[key_der] = load_public_key(key_der)
+        results.append(_verify_one(public_key, signature, message))
+    return results
+
+class SignatureVerifier:
+    """
+    Transaction signature verification (for any scheme in signatures.py)
+    with an LRU cache of successful verifications keyed by (digest of the
+    signed bytes, signature, public key).
+
+    verify_batch() splits the uncached signatures of e.g. a block into
+    batches and checks them on a process pool when more than one worker is
+    configured; with a single worker everything is verified inline. The
+    cache is locked, so several threads may verify at once (see pipeline.py).
+    """
+
+    def __init__(self, workers: int = SIGNATURE_WORKERS, batch_size: int = 64,
+                 cache_size: int = SIGNATURE_CACHE_SIZE) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[tuple, None]' = OrderedDict()
+        # address -> DER of its public key (the address is derived from the key)
+        self._key_der: Dict[str, bytes] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _der(self, address: str, public_key) -> bytes:
+        der = self._key_der.get(address)
+        if der is None:
+            der = self._key_der[address] = public_key_der(public_key)
+        return der
+
+    def _cache_key(self, tx: Transaction, public_key) -> tuple:
+        # the digest of the signed bytes rather than transaction_id, which a
+        # restored or decoded copy may carry over to different fields
+        return (hashlib.sha256(tx.signing_message()).digest(), tx.signature,
+                self._der(tx.sender, public_key))
+
+    def _lookup(self, key: tuple) -> bool:
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def _remember(self, key: tuple) -> None:
+        with self._lock:
+            self._cache[key] = None
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def verify(self, tx: Transaction, public_key) -> bool:
+        """Verify a single transaction signature, consulting the cache first"""
+        if not tx.signature:
+            return False
+        key = self._cache_key(tx, public_key)
+        if self._lookup(key):
+            return True
+        try:
+            valid = _verify_one(public_key, bytes.fromhex(tx.signature), tx.signing_message())
+        except ValueError:
+            # malformed hex signature
+            return False
+        if valid:
+            self._remember(key)
+        return valid
+
+    def verify_batch(self, items: Sequence[Tuple[Transaction, object]]) -> List[bool]:
+        """Verify many (transaction, public key) pairs; results are in input order"""
+        results: List[bool] = [False] * len(items)
+        todo = []
+        for i, (tx, public_key) in enumerate(items):
+            if not tx.signature:
+                continue
+            key = self._cache_key(tx, public_key)
+            if self._lookup(key):
+                results[i] = True
+                continue
+            try:
+                signature = bytes.fromhex(tx.signature)
+            except ValueError:
+                continue
+            todo.append((i, key, signature, tx.signing_message()))
+
+        if self.workers > 1 and len(todo) > self.batch_size:
+            batches = [todo[n:n + self.batch_size] for n in range(0, len(todo), self.batch_size)]
+            pool = self._get_pool()
+            futures = [
+                pool.submit(_verify_batch, [(key[2], sig, msg) for _, key, sig, msg in batch])
+                for batch in batches
+            ]
+            outcomes = [valid for future in futures for valid in future.result()]
+        else:
+            outcomes = _verify_batch([(key[2], sig, msg) for _, key, sig, msg in todo])
+
+        for (i, key, _, _), valid in zip(todo, outcomes):
+            results[i] = valid
+            if valid:
+                self._remember(key)
+        return results
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None